@@ -4,6 +4,9 @@ import numpy as np
 from datetime import datetime, timedelta
 import sys
 import os
+import time
+import uuid
+import logging
 
 # Ensure the root directory is in the path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -14,11 +17,21 @@ try:
     import utils.data_loader as dl
     import utils.metrics as mt
     import utils.visualizations as vz
+    import utils.risk as rk
+    import utils.stats_cache as sc
+    import utils.instrumentation as ins
+    import utils.jobs as jobs
 except ImportError:
     # If utils folder doesn't exist or isn't a package, try direct imports
     import data_loader as dl
     import metrics as mt
     import visualizations as vz
+    import risk as rk
+    import stats_cache as sc
+    import instrumentation as ins
+    import jobs
+
+logger = logging.getLogger(__name__)
 
 # Page Config
 st.set_page_config(
@@ -27,6 +40,80 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_resource
+def get_stats_cache():
+    """
+    Derived-statistics cache shared by all sessions and reruns.
+    """
+    return sc.StatsCache()
+
+@st.cache_resource
+def get_job_manager():
+    """
+    Background job pool shared by all sessions, so identical jobs run once.
+    """
+    return jobs.JobManager()
+
+def session_job(role, kind, *args, start=True, **kwargs):
+    """
+    Returns this session's job for one role (e.g. 'frontier'). The job the session held
+    for the role with other inputs is released, which cancels it unless another session
+    waits for the same result. With start=False a job is only returned if the session
+    already started one with these inputs.
+    """
+    manager = get_job_manager()
+    owner = st.session_state.setdefault('session_id', uuid.uuid4().hex)
+    owned = st.session_state.setdefault('jobs', {})
+    key = jobs.job_key(kind, *args, **kwargs)
+    previous = owned.get(role)
+    if previous is not None and previous != key:
+        manager.release(previous, owner)
+        del owned[role]
+    if previous != key and not start:
+        return None
+    owned[role] = key
+    return manager.submit(kind, *args, owner=owner, **kwargs)
+
+def show_job_status(job, label):
+    """
+    Shows a progress bar while the job runs (or an error if it failed) and returns the
+    result merged so far, None if there is nothing to draw yet.
+    """
+    if job.status == jobs.FAILED:
+        st.error(f"{label} failed. Please check your inputs and try again.")
+        logger.error("%s job failed: %r", job.kind, job.error)
+        return None
+    if not job.done():
+        st.progress(job.progress, text=f"{label} ({job.completed}/{job.total})")
+    return job.partial()
+
+def follow_jobs(watched, poll_seconds=0.25):
+    """
+    Draws every (job, render) pair and redraws it as more chunks finish, until all jobs
+    are done. A widget change interrupts the loop with a rerun, which releases the jobs
+    whose inputs changed.
+    """
+    shown = {}
+    while watched:
+        for item in list(watched):
+            job, render = item
+            finished = job.done()
+            state = (job.completed, job.status)
+            if shown.get(id(item)) != state:
+                shown[id(item)] = state
+                render(job)
+            if finished:
+                watched.remove(item)
+        if watched:
+            time.sleep(poll_seconds)
+
+def render_chart(fig, name):
+    """
+    Displays a Plotly figure; its serialization is timed as a diagnostics stage.
+    """
+    with ins.stage(f"render.{name}"):
+        st.plotly_chart(fig, use_container_width=True)
+
 # Custom CSS for "Premium" feel
 st.markdown("""
 <style>
@@ -69,6 +156,27 @@ end_date = col2.date_input("End Date", value=datetime.today())
 # Risk Free Rate
 rf_rate = st.sidebar.number_input("Risk Free Rate (%)", value=4.5, step=0.1) / 100
 
+# Base Currency
+base_currency = st.sidebar.selectbox("Base Currency", ["USD", "ZAR", "EUR", "GBP"], help="Prices of listings in other currencies (e.g. FSR.JO in ZAR) are converted at daily FX rates.")
+
+# Calendar Alignment
+alignment_policies = {
+    'Forward-fill Holidays': 'ffill',
+    'All Trading Days (Pairwise)': 'union',
+    'Common Trading Days Only': 'intersection',
+}
+alignment_choice = st.sidebar.selectbox("Calendar Alignment", list(alignment_policies), help="Mixing exchanges (e.g. JSE and NASDAQ) leaves gaps on each market's holidays. Forward-filling keeps those dates: each asset's returns are measured on its own trading days and covariances use the dates both assets traded. 'Common Trading Days Only' keeps just the dates on which every asset traded.")
+max_fill_days = st.sidebar.number_input("Max Forward-fill Days", min_value=1, max_value=10, value=3, step=1, help="With 'Forward-fill Holidays', dates on which an asset has been untraded for longer (e.g. a suspension) are dropped.")
+
+# Covariance Estimator
+cov_methods = {
+    'Sample': 'sample',
+    'Ledoit-Wolf Shrinkage': 'ledoit_wolf',
+    'Constant Correlation Shrinkage': 'constant_correlation',
+    'PCA Factor Model (5 factors)': 'factor',
+}
+cov_choice = st.sidebar.selectbox("Covariance Estimator", list(cov_methods), help="Shrinkage and factor estimators are more stable for many tickers or short histories.")
+
 # Benchmark (Proxy)
 benchmark_ticker = st.sidebar.text_input("Benchmark Ticker", value="QQQ")
 
@@ -79,6 +187,23 @@ with st.sidebar.expander("Customize Weights"):
     for t in tickers:
         input_weights[t] = st.number_input(f"Weight for {t}", min_value=0.0, value=1.0, step=0.5, key=f"w_{t}")
 
+# Backtest Settings
+with st.sidebar.expander("Backtest Settings"):
+    rebalance_labels = {
+        'Monthly': 'monthly',
+        'Quarterly': 'quarterly',
+        'Buy & Hold': 'none',
+        'Drift Threshold': 'threshold',
+    }
+    rebalance_choice = st.selectbox("Rebalancing", list(rebalance_labels))
+    drift_threshold = st.number_input("Drift Threshold (%)", min_value=0.5, value=5.0, step=0.5, help="Used by 'Drift Threshold' rebalancing.") / 100
+    cost_bps = st.number_input("Transaction Cost (bps)", min_value=0.0, value=10.0, step=1.0)
+
+# Diagnostics
+with st.sidebar.expander("Diagnostics"):
+    show_diagnostics = st.checkbox("Show Stage Timings", help="Records wall time, input shapes and cache hits of every pipeline stage in this run.")
+    trace_memory = st.checkbox("Track Peak Memory", help="Adds peak memory per stage. Slows the analysis down noticeably.")
+
 # Analyze Button Logic
 if st.sidebar.button("Analyze Portfolio"):
     # Security: Limit number of tickers to prevent resource exhaustion
@@ -87,23 +212,55 @@ if st.sidebar.button("Analyze Portfolio"):
     else:
         st.session_state['analyzed'] = True
 
+refresh_clicked = st.sidebar.button("Refresh Latest Prices", help="Re-downloads the most recent stored bars, picking up late or revised prices.")
+
 if st.session_state.get('analyzed', False):
+    # Stage records cover this run only; every rerun starts a fresh recording
+    if show_diagnostics:
+        ins.begin_recording(memory=trace_memory)
     try:
         with st.spinner("Fetching Market Data..."):
             # 1. Fetch Data
-            df_prices = dl.fetch_historical_data(tickers, start_date=start_date, end_date=end_date)
-            df_benchmark = dl.fetch_historical_data([benchmark_ticker], start_date=start_date, end_date=end_date)
+            # Portfolio and benchmark are fetched together in one scheduled batch
+            fetch_list = list(dict.fromkeys(tickers + [benchmark_ticker]))
+            fx_pairs = dl.fx_pair_tickers(fetch_list, base_currency)
+            if refresh_clicked:
+                # Cached results derived from revised prices are dropped by the refresh
+                changes = dl.refresh_prices(fetch_list + fx_pairs, cache=get_stats_cache())
+                revised = [t for t, changed_from in changes.items() if changed_from is not None]
+                if revised:
+                    st.caption(f"Updated prices for: {', '.join(revised)}")
+            df_all, fetch_report = dl.fetch_historical_data(fetch_list, start_date=start_date, end_date=end_date, return_report=True)
+            
+            # Convert all listings and the benchmark into the base currency (FX series are fetched once and stored)
+            # The key does not cover the FX rates, so the entry is tagged with its pairs for refresh_prices
+            raw_available = df_all.notna().any()
+            df_all, ticker_currencies = get_stats_cache().get_or_compute(
+                'fx_converted', sc.fingerprint(df_all, base_currency),
+                lambda: dl.convert_to_base_currency(df_all, base_currency), tags=fx_pairs
+            )
+            fx_missing = [t for t in df_all.columns if raw_available[t] and df_all[t].isna().all()]
+            if fx_missing:
+                st.warning(f"Exchange rates unavailable for: {', '.join(fx_missing)}")
+            
+            df_prices = df_all[tickers].dropna(axis=1, how='all')
+            
+            if fetch_report['failed']:
+                st.warning(f"No data could be fetched for: {', '.join(fetch_report['failed'])}")
+                # Log the reasons for debugging
+                logger.warning("Fetch failures: %s", fetch_report['failed'])
             
             if df_prices.empty:
                 st.error("No data found for the specified tickers. Please checks the tickers and date range.")
             else:
-                # Align dates
-                common_index = df_prices.index.intersection(df_benchmark.index)
-                df_prices = df_prices.loc[common_index]
-                df_benchmark = df_benchmark.loc[common_index]
-                
-                # Drop tickers that failed to fetch (all NaNs)
-                df_prices.dropna(axis=1, how='all', inplace=True)
+                # Align portfolio and benchmark on one calendar
+                # (tickers that failed to fetch are all NaN and dropped by align_prices)
+                aligned_columns = list(dict.fromkeys(df_prices.columns.tolist() + [benchmark_ticker]))
+                df_aligned, observed = mt.align_prices(df_all[aligned_columns], policy=alignment_policies[alignment_choice], max_fill_days=max_fill_days)
+                df_prices = df_aligned[df_prices.columns]
+                if benchmark_ticker not in df_aligned:
+                    st.error(f"No data found for benchmark {benchmark_ticker}.")
+                    st.stop()
                 
                 # Update tickers list to match what was actually fetched
                 tickers = df_prices.columns.tolist()
@@ -124,19 +281,50 @@ if st.session_state.get('analyzed', False):
                      weights = weights / weights.sum()
                 
                 # 2. Risk Metrics
-                returns = mt.calculate_log_returns(df_prices)
-                benchmark_returns = mt.calculate_log_returns(df_benchmark)
+                # Weight-independent statistics are cached by a fingerprint of the price panel,
+                # so reruns that only change weights or settings skip straight to the portfolio maths
+                stats_cache = get_stats_cache()
+                returns_columns = list(dict.fromkeys(tickers + [benchmark_ticker]))
+                pairwise = alignment_policies[alignment_choice] != 'intersection'
+                prices_key = sc.fingerprint(df_aligned[returns_columns], observed[returns_columns], pairwise)
                 
-                # Handle Single Ticker Benchmark
-                if isinstance(benchmark_returns, pd.DataFrame):
-                    benchmark_returns = benchmark_returns.iloc[:, 0]
+                # Forward-filled prices are not trades, so they never show up as zero returns.
+                # Pairwise: each asset's return is NaN on dates it did not trade and the move since its
+                # last trade lands on its next trading day. Otherwise returns are taken between dates
+                # on which the portfolio and the benchmark all traded.
+                all_returns = stats_cache.get_or_compute(
+                    'log_returns', prices_key,
+                    lambda: mt.calculate_log_returns(df_aligned[returns_columns], dropna=not pairwise, observed=observed[returns_columns])
+                )
+                returns = all_returns[tickers]
+                benchmark_returns = all_returns[benchmark_ticker].dropna()
                 
-                cov_matrix = mt.calculate_covariance_matrix(returns)
-                port_return, port_vol, port_sharpe = mt.calculate_portfolio_performance(weights, returns.mean(), cov_matrix, risk_free_rate=rf_rate)
+                cov_key = sc.fingerprint(prices_key, cov_methods[cov_choice])
+                if not pairwise:
+                    # Mean, covariance and correlation from a single pass over the returns
+                    return_stats = stats_cache.get_or_compute('return_stats', prices_key, lambda: mt.StreamingCovariance.from_returns(returns))
+                    mean_returns = return_stats.mean
+                    if cov_methods[cov_choice] == 'sample':
+                        cov_matrix = return_stats.cov
+                    else:
+                        cov_matrix = stats_cache.get_or_compute('cov_matrix', cov_key, lambda: mt.calculate_covariance_matrix(returns, method=cov_methods[cov_choice]))
+                elif cov_methods[cov_choice] == 'sample':
+                    mean_returns = returns.mean()
+                    # Pairs cover different dates, so the estimate is projected back onto a valid covariance
+                    cov_matrix = stats_cache.get_or_compute('cov_matrix', cov_key, lambda: mt.nearest_psd(mt.pairwise_covariance(returns)))
+                else:
+                    mean_returns = returns.mean()
+                    # Shrinkage and factor estimators need complete rows: the common trading days
+                    cov_matrix = stats_cache.get_or_compute('cov_matrix', cov_key, lambda: mt.calculate_covariance_matrix(
+                        mt.calculate_log_returns(df_aligned[tickers], observed=observed[tickers]), method=cov_methods[cov_choice]
+                    ))
+                port_return, port_vol, port_sharpe = mt.calculate_portfolio_performance(weights, mean_returns, cov_matrix, risk_free_rate=rf_rate)
                 
                 # Calculate Portfolio Daily Returns for Beta calculation
-                # (Weighted sum of asset returns)
-                port_daily_returns = returns.dot(weights)
+                # (Weighted sum of asset returns; a position that did not trade is marked at its last
+                # price until it does, so it adds nothing that day)
+                position_returns = returns[returns.notna().any(axis=1)].fillna(0.0)
+                port_daily_returns = position_returns.dot(weights)
                 
                 # Calculate Beta
                 beta = mt.calculate_beta(port_daily_returns, benchmark_returns)
@@ -157,35 +345,85 @@ if st.session_state.get('analyzed', False):
                 # 4. Charts
                 st.markdown("### Performance & Analysis")
                 
+                # Frontier, backtest and Monte Carlo run as background jobs; their charts are
+                # drawn into placeholders and updated by follow_jobs at the end of the page
+                watched_jobs = []
+                
                 # Cumulative Returns
-                port_cum_returns = (1 + returns).cumprod()
-                # Simplified: Cumulative return of the portfolio value
-                # Portfolio Daily Returns = weighted sum of asset daily returns
-                port_daily_returns = returns.dot(weights)
-                port_cum_ret_series = (1 + port_daily_returns).cumprod()
+                # Portfolio growth of $1 from a backtest with the chosen rebalancing and costs
+                backtest_job = session_job(
+                    'backtest', 'backtest', df_prices, weights, rebalance=rebalance_labels[rebalance_choice],
+                    cost_bps=cost_bps, threshold=drift_threshold
+                )
+                cumulative_slot = st.empty()
+                
+                # Log returns compound by summation
+                bench_cum_ret_series = np.exp(benchmark_returns.cumsum())
+                
+                # Rolling Risk
+                st.subheader("Rolling Risk")
+                rolling_window = st.slider("Rolling Window (Trading Days)", 21, 252, 63, step=21)
+                rolling = mt.calculate_rolling_metrics(port_daily_returns, benchmark_returns, window=rolling_window, risk_free_rate=rf_rate)
+                fig_rolling = vz.plot_rolling_metrics(rolling, benchmark_name=benchmark_ticker, window=rolling_window)
+                render_chart(fig_rolling, 'rolling_metrics')
                 
-                bench_cum_ret_series = (1 + benchmark_returns).cumprod()
+                # Value at Risk & Drawdown
+                st.subheader("Value at Risk (1-Day)")
+                var_table = pd.concat({
+                    'Historical': rk.historical_var(position_returns, weights).set_index('confidence'),
+                    'Parametric': rk.parametric_var(weights, mean_returns, cov_matrix).set_index('confidence'),
+                }, names=['Method'])[['var', 'es']]
+                var_table = var_table.rename(columns={'var': 'VaR', 'es': 'Expected Shortfall'})
+                st.dataframe(var_table.style.format('{:.2%}'), use_container_width=True)
                 
-                fig_cum = vz.plot_cumulative_returns(port_cum_ret_series, bench_cum_ret_series, benchmark_name=benchmark_ticker)
-                st.plotly_chart(fig_cum, use_container_width=True)
+                drawdown_slot = st.empty()
+                
+                def render_backtest(job):
+                    with cumulative_slot.container():
+                        backtest_result = show_job_status(job, "Running backtest")
+                        if backtest_result is None:
+                            return
+                        fig_cum = vz.plot_cumulative_returns(backtest_result['nav'], bench_cum_ret_series, benchmark_name=benchmark_ticker)
+                        render_chart(fig_cum, 'cumulative_returns')
+                    dd_stats = rk.drawdown_statistics(backtest_result['nav']).iloc[0]
+                    with drawdown_slot.container():
+                        d1, d2 = st.columns(2)
+                        d1.metric("Max Drawdown", f"{dd_stats['max_drawdown']:.2%}")
+                        d2.metric("Longest Drawdown", f"{int(dd_stats['max_drawdown_duration'])} trading days")
+                
+                watched_jobs.append((backtest_job, render_backtest))
                 
                 col_chart1, col_chart2 = st.columns(2)
                 
                 with col_chart1:
                     st.subheader("Asset Correlations")
-                    fig_corr = vz.plot_correlation_heatmap(returns.corr())
-                    st.plotly_chart(fig_corr, use_container_width=True)
+                    # Derived from the selected covariance estimate; correlated assets are grouped
+                    corr_matrix = mt.correlation_from_covariance(cov_matrix)
+                    fig_corr = vz.plot_correlation_heatmap(corr_matrix, cluster=True, compact=len(tickers) > vz.MAX_ANNOTATED_ASSETS)
+                    render_chart(fig_corr, 'correlation_heatmap')
                     
                 with col_chart2:
                     st.subheader("Efficient Frontier Simulation")
-                    sim_res, _ = mt.simulate_efficient_frontier(returns.mean(), cov_matrix, risk_free_rate=rf_rate)
-                    fig_ef = vz.plot_efficient_frontier_chart(sim_res, portfolio_vol=port_vol, portfolio_return=port_return)
-                    # Add current portfolio marker (Now handled inside the function)
-                    st.plotly_chart(fig_ef, use_container_width=True)
+                    frontier_job = session_job('frontier', 'frontier', mean_returns, cov_matrix, risk_free_rate=rf_rate)
+                    frontier_slot = st.empty()
+                    
+                    def render_frontier(job):
+                        with frontier_slot.container():
+                            partial = show_job_status(job, "Simulating portfolios")
+                            if partial is None:
+                                return
+                            # The cloud fills in chunk by chunk; the frontier line appears once solved
+                            sim_res, frontier = partial
+                            fig_ef = vz.plot_efficient_frontier_chart(sim_res, portfolio_vol=port_vol, portfolio_return=port_return, frontier=frontier)
+                            # Add current portfolio marker (Now handled inside the function)
+                            render_chart(fig_ef, 'efficient_frontier')
+                    
+                    watched_jobs.append((frontier_job, render_frontier))
 
                 # 5. ESG & Data
                 st.markdown("### ESG & Holdings Data")
-                esg_df = dl.get_esg_scores(tickers)
+                # Copy: cached values are shared between reruns
+                esg_df = stats_cache.get_or_compute('esg_scores', sc.fingerprint(tuple(tickers)), lambda: dl.get_esg_scores(tickers)).copy()
                 esg_df['Weight'] = [f"{w:.1%}" for w in weights]
                 esg_df.index = range(1, len(esg_df) + 1)
                 st.dataframe(esg_df, use_container_width=True)
@@ -198,32 +436,60 @@ if st.session_state.get('analyzed', False):
                     sim_years = st.slider("Forecast Horizon (Years)", 1, 10, 5)
                     initial_inv = st.number_input("Initial Investment ($)", value=10000, step=1000)
                     
-                    if st.button("Run Simulation"):
-                        with st.spinner("Running 1,000 simulations..."):
-                             sim_results = mt.run_monte_carlo_simulation(weights, returns.mean(), cov_matrix, years=sim_years, initial_investment=initial_inv)
-                             
-                             # Plot
-                             fig_mc = vz.plot_monte_carlo_simulation(sim_results)
-                             st.plotly_chart(fig_mc, use_container_width=True)
-                             
-                             # Stats
-                             final_values = sim_results.iloc[-1]
-                             median_val = final_values.median()
-                             p95_val = final_values.quantile(0.95)
-                             p05_val = final_values.quantile(0.05)
-                             
-                             c1, c2, c3 = st.columns(3)
-                             c1.metric(f"Median Value ({sim_years}y)", f"${median_val:,.2f}")
-                             c2.metric("Optimistic (95%)", f"${p95_val:,.2f}")
-                             c3.metric("Pessimistic (5%)", f"${p05_val:,.2f}")
+                    # The simulation keeps showing on reruns until its inputs change, which cancels it
+                    run_clicked = st.button("Run Simulation")
+                    mc_job = session_job(
+                        'monte_carlo', 'monte_carlo', weights, mean_returns, cov_matrix,
+                        years=sim_years, initial_investment=initial_inv, start=run_clicked
+                    )
+                    mc_slot = st.empty()
+                    
+                    def render_monte_carlo(job):
+                        with mc_slot.container():
+                            partial = show_job_status(job, "Running 1,000 simulations")
+                            if partial is None:
+                                return
+                            sim_bands = partial['bands']
+                            
+                            # Plot (bands over the paths finished so far while the job runs)
+                            fig_mc = vz.plot_monte_carlo_bands(sim_bands)
+                            render_chart(fig_mc, 'monte_carlo')
+                            
+                            # Stats
+                            final_values = sim_bands.iloc[-1]
+                            median_val = final_values[50]
+                            p95_val = final_values[95]
+                            p05_val = final_values[5]
+                            
+                            c1, c2, c3 = st.columns(3)
+                            c1.metric(f"Median Value ({sim_years}y)", f"${median_val:,.2f}")
+                            c2.metric("Optimistic (95%)", f"${p95_val:,.2f}")
+                            c3.metric("Pessimistic (5%)", f"${p05_val:,.2f}")
+                            if not job.done():
+                                st.caption(f"Preliminary: first {partial['simulations']:,} simulated paths")
+                    
+                    if mc_job is not None:
+                        watched_jobs.append((mc_job, render_monte_carlo))
 
                 # Export
                 st.download_button("Download Price Data", df_prices.to_csv(), "price_data.csv")
+                
+                follow_jobs(watched_jobs)
     except Exception as e:
         # Security: Do not expose raw exception details to user (info leakage)
         st.error("An error occurred during analysis. Please check your inputs and try again.")
-        # Log the actual error for debugging (in a real app this would go to a log file)
-        print(f"Error: {e}")
+        # Log the actual error with its traceback for debugging
+        logger.exception("Analysis failed: %s", e)
+    finally:
+        stage_records = ins.end_recording()
+    
+    if show_diagnostics and stage_records:
+        with st.expander("Diagnostics", expanded=True):
+            cache_hits = sum(1 for r in stage_records if r.get('cache') == 'hit')
+            cache_lookups = sum(1 for r in stage_records if 'cache' in r)
+            total_seconds = sum(r['seconds'] for r in stage_records if r['depth'] == 0)
+            st.caption(f"{len(stage_records)} stages, {total_seconds:.2f}s in top-level stages, {cache_hits}/{cache_lookups} cache hits")
+            st.dataframe(ins.summarize(stage_records), use_container_width=True)
 
 else:
     st.info("👈 Enter tickers in the sidebar and click 'Analyze Portfolio' to start.")
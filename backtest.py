@@ -0,0 +1,202 @@
+import numpy as np
+import pandas as pd
+
+try:
+    from . import instrumentation as ins
+except ImportError:
+    import instrumentation as ins
+
+REBALANCE_OPTIONS = ('none', 'monthly', 'quarterly', 'threshold')
+
+def rebalance_positions(index, frequency):
+    """
+    Returns the row positions at whose close the portfolio is (re)balanced for calendar rules.
+    Row 0 is the initial purchase; later rebalances happen on the last trading day of each
+    month or quarter (the final row is never a rebalance).
+    """
+    if frequency == 'none':
+        return np.array([0])
+    if frequency not in ('monthly', 'quarterly'):
+        raise ValueError(f"Unknown rebalance frequency: {frequency}")
+
+    periods = pd.DatetimeIndex(index).to_period('M' if frequency == 'monthly' else 'Q')
+    period_ends = np.flatnonzero(periods[1:] != periods[:-1])
+    # A panel starting on a period end already buys at row 0
+    return np.concatenate([[0], period_ends[period_ends > 0]])
+
+def threshold_positions(prices, weights, threshold=0.05, lookahead=256):
+    """
+    Returns rebalance positions for a drift-threshold rule: rebalance as soon as any
+    asset weight drifts more than threshold (absolute) away from its target.
+
+    Drift since the last rebalance is evaluated for a whole block of days at once;
+    Python only loops over rebalance events, never over days.
+    """
+    prices = np.asarray(prices, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    num_days = len(prices)
+    positions = [0]
+    last = 0
+    block = lookahead
+
+    while last < num_days - 1:
+        stop = min(last + 1 + block, num_days)
+        rel = prices[last + 1:stop] / prices[last]
+        values = rel * weights
+        drifted = values / values.sum(axis=1, keepdims=True)
+        breached = np.flatnonzero(np.abs(drifted - weights).max(axis=1) > threshold)
+
+        if len(breached):
+            last = last + 1 + breached[0]
+            if last < num_days - 1:
+                positions.append(last)
+            block = lookahead
+        elif stop == num_days:
+            break
+        else:
+            # No breach yet: look further ahead from the same rebalance point
+            block *= 2
+
+    return np.array(positions)
+
+def _backtest_matrix(prices, weights, positions, cost_rate, initial_value=1.0):
+    """
+    Core engine: simulates P target-weight portfolios rebalanced at the given row positions.
+
+    prices: (days, assets) array without NaNs
+    weights: (P, assets) target weights
+    positions: sorted rebalance rows, starting with 0
+
+    Between rebalances holdings are fixed, so every day's value is a matrix product of
+    price relatives since the last rebalance with the target weights; only the per-segment
+    NAV chain is a cumulative product. Returns (nav, turnover) arrays of shape (days, P).
+    """
+    num_days = len(prices)
+    weights = np.atleast_2d(weights)
+    positions = np.asarray(positions)
+
+    # Segment k covers rows (positions[k], positions[k + 1]]
+    segment = np.searchsorted(positions, np.arange(num_days), side='left') - 1
+    segment[0] = 0
+    segment_start = positions[segment]
+
+    rel = prices / prices[segment_start]
+    growth = rel @ weights.T
+
+    # Turnover at each rebalance: drifted weights back to target (initial purchase is 1)
+    ends = positions[1:]
+    end_growth = growth[ends]
+    drift_ratio = rel[ends][:, np.newaxis, :] / end_growth[:, :, np.newaxis]
+    rebalance_turnover = (np.abs(weights) * np.abs(1 - drift_ratio)).sum(axis=2)
+
+    turnover = np.zeros((num_days, len(weights)))
+    turnover[0] = np.abs(weights).sum(axis=1)
+    turnover[ends] = rebalance_turnover
+
+    # NAV right after each rebalance, net of costs
+    cost_factor = 1 - cost_rate * turnover[positions]
+    segment_return = np.vstack([np.ones((1, len(weights))), end_growth])
+    segment_nav = initial_value * np.cumprod(segment_return * cost_factor, axis=0)
+
+    nav = segment_nav[segment] * growth
+    # On rebalance days report the NAV after trading costs
+    nav[positions] = segment_nav
+    return nav, turnover
+
+def _drawdown(nav):
+    return nav / np.maximum.accumulate(nav, axis=0) - 1
+
+@ins.instrument()
+def run_backtest(prices, weights, rebalance='monthly', cost_bps=10.0, threshold=0.05, initial_value=1.0):
+    """
+    Backtests a target-weight portfolio on a price panel.
+
+    Args:
+        prices (pd.DataFrame): Adjusted close prices, one column per asset (rows with NaNs are dropped).
+        weights (array-like): Target weights in the column order of prices.
+        rebalance (str): 'none' (buy and hold), 'monthly', 'quarterly' or 'threshold'.
+        cost_bps (float): Transaction cost in basis points of traded value.
+        threshold (float): Absolute weight drift triggering a rebalance in 'threshold' mode.
+        initial_value (float): Starting portfolio value.
+
+    Returns:
+        pd.DataFrame: 'nav', 'turnover' (traded fraction of NAV, non-zero on trade days)
+        and 'drawdown' series indexed by date.
+    """
+    prices = prices.dropna()
+    weights = np.asarray(weights, dtype=float)
+    values = prices.to_numpy(dtype=float)
+
+    if rebalance == 'threshold':
+        positions = threshold_positions(values, weights, threshold)
+    else:
+        positions = rebalance_positions(prices.index, rebalance)
+
+    nav, turnover = _backtest_matrix(values, weights, positions, cost_bps / 1e4, initial_value)
+    return pd.DataFrame({
+        'nav': nav[:, 0],
+        'turnover': turnover[:, 0],
+        'drawdown': _drawdown(nav)[:, 0],
+    }, index=prices.index)
+
+def _summarize(nav, turnover, initial_value):
+    """
+    Summary statistics for each column of NAV / turnover matrices.
+    """
+    years = (len(nav) - 1) / 252
+    total = nav[-1] / initial_value
+    log_returns = np.diff(np.log(nav), axis=0)
+    return {
+        'total_return': total - 1,
+        'annual_return': total ** (1 / years) - 1 if years > 0 else np.nan,
+        'annual_volatility': log_returns.std(axis=0, ddof=1) * np.sqrt(252),
+        'max_drawdown': _drawdown(nav).min(axis=0),
+        'total_turnover': turnover.sum(axis=0),
+        'num_trades': (turnover > 0).sum(axis=0),
+    }
+
+def run_backtest_sweep(prices, weight_sets, rebalance_options=('none', 'monthly', 'quarterly'),
+                       cost_bps_options=(0.0, 10.0), threshold_options=(0.05,), initial_value=1.0):
+    """
+    Backtests every combination of weight set, rebalance rule and cost level.
+
+    Calendar rules evaluate all weight sets in one matrix pass; the threshold rule finds
+    rebalance dates per weight set once and reuses them for every cost level.
+
+    Args:
+        weight_sets (dict or array): name -> weights, or a (P, assets) array (names are row numbers).
+
+    Returns:
+        pd.DataFrame: one row per combination with its summary statistics.
+    """
+    prices = prices.dropna()
+    values = prices.to_numpy(dtype=float)
+    if isinstance(weight_sets, dict):
+        names = list(weight_sets)
+        weights = np.vstack([np.asarray(weight_sets[n], dtype=float) for n in names])
+    else:
+        weights = np.atleast_2d(np.asarray(weight_sets, dtype=float))
+        names = list(range(len(weights)))
+
+    rows = []
+    for rebalance in rebalance_options:
+        if rebalance == 'threshold':
+            for threshold in threshold_options:
+                schedules = [threshold_positions(values, w, threshold) for w in weights]
+                for cost_bps in cost_bps_options:
+                    for name, w, positions in zip(names, weights, schedules):
+                        nav, turnover = _backtest_matrix(values, w, positions, cost_bps / 1e4, initial_value)
+                        stats = _summarize(nav, turnover, initial_value)
+                        rows.append({'weights': name, 'rebalance': rebalance, 'threshold': threshold,
+                                     'cost_bps': cost_bps, **{k: v[0] for k, v in stats.items()}})
+            continue
+
+        positions = rebalance_positions(prices.index, rebalance)
+        for cost_bps in cost_bps_options:
+            nav, turnover = _backtest_matrix(values, weights, positions, cost_bps / 1e4, initial_value)
+            stats = _summarize(nav, turnover, initial_value)
+            for i, name in enumerate(names):
+                rows.append({'weights': name, 'rebalance': rebalance, 'threshold': np.nan,
+                             'cost_bps': cost_bps, **{k: v[i] for k, v in stats.items()}})
+
+    return pd.DataFrame(rows)
@@ -0,0 +1,203 @@
+"""
+Headless batch analysis: scores many portfolios from one shared price fetch.
+
+Usage:
+    python batch_analysis.py portfolios.csv --start 2023-01-01 --output results.csv
+
+The input is a long-format CSV with columns portfolio, ticker and optionally weight
+(relative, normalized per portfolio; equal weights if absent) and benchmark (falls back
+to --benchmark). Results are written as CSV, or Parquet for a .parquet output path.
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Ensure the root directory is in the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import utils.data_loader as dl
+    import utils.metrics as mt
+    from utils.providers import FileProvider, SyntheticProvider
+except ImportError:
+    import data_loader as dl
+    import metrics as mt
+    from providers import FileProvider, SyntheticProvider
+
+# Date panels of the portfolio segments, set once per worker process by _init_worker
+_PANEL = {}
+
+def load_portfolios(path, default_benchmark="QQQ"):
+    """
+    Reads a long-format portfolio file into a list of dicts with
+    'portfolio', 'tickers', 'weights' and 'benchmark'.
+    """
+    df = pd.read_csv(path)
+    if 'weight' not in df.columns:
+        df['weight'] = 1.0
+    if 'benchmark' not in df.columns:
+        df['benchmark'] = default_benchmark
+    df['benchmark'] = df['benchmark'].fillna(default_benchmark)
+    df['ticker'] = df['ticker'].astype(str).str.strip()
+
+    portfolios = []
+    for name, rows in df.groupby('portfolio', sort=False):
+        portfolios.append({
+            'portfolio': name,
+            'tickers': rows['ticker'].tolist(),
+            'weights': rows['weight'].astype(float).to_numpy(),
+            'benchmark': rows['benchmark'].iloc[0],
+        })
+    return portfolios
+
+def _init_worker(panels, risk_free_rate):
+    _PANEL.update(panels=panels, risk_free_rate=risk_free_rate)
+
+def _evaluate_group(task):
+    """
+    Scores a group of portfolios sharing one segment panel: builds one (P, assets) weights
+    matrix per benchmark and evaluates it with metrics.evaluate_portfolios.
+    Returns the statistics of each portfolio, in order.
+    """
+    segment, portfolios = task
+    returns, mean_returns, cov_matrix = _PANEL['panels'][segment]
+    columns = {t: i for i, t in enumerate(returns.columns)}
+    results = [None] * len(portfolios)
+    by_benchmark = {}
+
+    for k, portfolio in enumerate(portfolios):
+        available = np.array([t in columns for t in portfolio['tickers']], dtype=bool)
+        tickers = [t for t, ok in zip(portfolio['tickers'], available) if ok]
+
+        # Normalize, falling back to equal weights if all zeros (as in the app)
+        weights = portfolio['weights'][available]
+        weights = weights / weights.sum() if weights.sum() != 0 else np.full(len(tickers), 1 / len(tickers))
+        full_weights = np.zeros(len(columns))
+        np.add.at(full_weights, [columns[t] for t in tickers], weights)
+        by_benchmark.setdefault(portfolio['benchmark'], []).append((k, full_weights))
+
+    for benchmark, members in by_benchmark.items():
+        stats = mt.evaluate_portfolios(
+            np.vstack([w for _, w in members]), returns, returns[benchmark], _PANEL['risk_free_rate'],
+            mean_returns=mean_returns, cov_matrix=cov_matrix
+        )
+        for (k, _), values in zip(members, stats.to_dict('records')):
+            results[k] = values
+    return results
+
+def run_batch_analysis(portfolios, start_date, end_date=None, risk_free_rate=0.0, workers=1, provider=None,
+                       compact=False):
+    """
+    Fetches the union universe once, then scores each portfolio on the dates on which its
+    own tickers and benchmark all traded, so one client's results never depend on who else
+    is in the file (e.g. a recently listed ticker in another portfolio).
+
+    Portfolios whose tickers traded on the same dates form a segment: log returns, mean
+    returns and the covariance matrix are computed once per segment and its portfolios are
+    evaluated in matrix form, fanning groups of portfolios out over a process pool when
+    workers > 1. With compact=True returns are held as a float32 metrics.ReturnsPanel.
+
+    Returns:
+        tuple: (pd.DataFrame with one row per portfolio, fetch report)
+    """
+    universe = list(dict.fromkeys(
+        [t for p in portfolios for t in p['tickers']] + [p['benchmark'] for p in portfolios]
+    ))
+    prices, report = dl.fetch_historical_data(universe, start_date, end_date, provider=provider, return_report=True)
+    prices = prices.dropna(axis=1, how='all')
+    position = {t: i for i, t in enumerate(prices.columns)}
+    observed = prices.notna().to_numpy()
+
+    rows = []
+    segments = {}
+    for index, portfolio in enumerate(portfolios):
+        available = [t in position for t in portfolio['tickers']]
+        tickers = [t for t, ok in zip(portfolio['tickers'], available) if ok]
+        rows.append({
+            'portfolio': portfolio['portfolio'],
+            'benchmark': portfolio['benchmark'],
+            'num_assets': len(tickers),
+            'missing_tickers': ' '.join(t for t, ok in zip(portfolio['tickers'], available) if not ok),
+        })
+        if not tickers or portfolio['benchmark'] not in position:
+            continue
+        # Filled or missing prices are not trades: returns run between the dates on which
+        # the portfolio's own tickers and benchmark all traded
+        dates = observed[:, [position[t] for t in tickers + [portfolio['benchmark']]]].all(axis=1)
+        segments.setdefault(dates.tobytes(), (dates, []))[1].append(index)
+
+    panels = []
+    for dates, members in segments.values():
+        columns = list(dict.fromkeys(
+            t for i in members for t in portfolios[i]['tickers'] + [portfolios[i]['benchmark']] if t in position
+        ))
+        traded = prices.loc[dates, columns]
+        returns = mt.ReturnsPanel.from_prices(traded) if compact else mt.calculate_log_returns(traded)
+        panels.append((returns, returns.mean(), mt.calculate_covariance_matrix(returns)))
+
+    # Several groups per worker keeps the pool busy when portfolio sizes differ
+    scored = sum(len(members) for _, members in segments.values())
+    group_size = max(1, -(-scored // (workers * 4)))
+    tasks, task_members = [], []
+    for segment, (_, members) in enumerate(segments.values()):
+        for start in range(0, len(members), group_size):
+            group = members[start:start + group_size]
+            tasks.append((segment, [portfolios[i] for i in group]))
+            task_members.append(group)
+
+    if workers <= 1:
+        _init_worker(panels, risk_free_rate)
+        results = [_evaluate_group(task) for task in tasks]
+    else:
+        # The panels are pickled once per worker via the initializer, not once per task
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(panels, risk_free_rate)) as pool:
+            results = list(pool.map(_evaluate_group, tasks))
+
+    for group, stats in zip(task_members, results):
+        for index, values in zip(group, stats):
+            rows[index].update(values)
+    return pd.DataFrame(rows), report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score many portfolios in one batch run.")
+    parser.add_argument('portfolios', help="CSV with columns portfolio, ticker[, weight][, benchmark]")
+    parser.add_argument('--start', default='2023-01-01', help="Start date (YYYY-MM-DD)")
+    parser.add_argument('--end', default=None, help="End date (YYYY-MM-DD, exclusive)")
+    parser.add_argument('--benchmark', default='QQQ', help="Benchmark for portfolios that do not specify one")
+    parser.add_argument('--rf-rate', type=float, default=4.5, help="Risk free rate in percent")
+    parser.add_argument('--output', default='batch_results.csv', help="Output path (.csv or .parquet)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument('--compact', action='store_true', help="Hold returns as a float32 panel (halves memory for large universes)")
+    parser.add_argument('--price-dir', default=None, help="Read prices from a local directory instead of Yahoo Finance")
+    parser.add_argument('--synthetic', action='store_true', help="Use reproducible synthetic prices (no network)")
+    args = parser.parse_args(argv)
+
+    provider = None
+    if args.synthetic:
+        provider = SyntheticProvider()
+    elif args.price_dir:
+        provider = FileProvider(args.price_dir)
+
+    portfolios = load_portfolios(args.portfolios, default_benchmark=args.benchmark)
+    start_time = datetime.now()
+    results, report = run_batch_analysis(
+        portfolios, args.start, args.end, risk_free_rate=args.rf_rate / 100,
+        workers=args.workers, provider=provider, compact=args.compact
+    )
+
+    if args.output.endswith('.parquet'):
+        results.to_parquet(args.output, index=False)
+    else:
+        results.to_csv(args.output, index=False)
+
+    print(f"Scored {len(results)} portfolios in {(datetime.now() - start_time).total_seconds():.2f}s -> {args.output}")
+    if report['failed']:
+        print(f"Tickers without data: {', '.join(report['failed'])}")
+
+if __name__ == '__main__':
+    main()
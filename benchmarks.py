@@ -0,0 +1,317 @@
+"""
+Reproducible benchmark suite for the analytics hot paths.
+
+Usage:
+    python benchmarks.py --scale quick --output bench_results.json
+    python benchmarks.py --scale quick --baseline bench_results.json --tolerance 1.3
+
+Every case runs on synthetic price panels (providers.SyntheticProvider, no network)
+scaled over the number of assets, history length and simulation count. Results are
+written as JSON, one record per case and size. With --baseline each median time is
+compared with the matching record of an earlier run; the run exits with status 1 if
+any case is slower than tolerance x baseline (and by more than --min-seconds).
+"""
+import argparse
+import functools
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Ensure the root directory is in the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import utils.metrics as mt
+    import utils.visualizations as vz
+    from utils.providers import SyntheticProvider
+except ImportError:
+    import metrics as mt
+    import visualizations as vz
+    from providers import SyntheticProvider
+
+SCALES = {
+    'quick': {'assets': [10, 100, 500], 'years': [1, 5], 'simulations': [1000, 10000]},
+    'full': {'assets': [10, 100, 500, 2000], 'years': [1, 5, 25], 'simulations': [1000, 10000, 100000]},
+}
+
+# Cases whose cost or output explodes past these sizes are capped
+# (asset-level Monte Carlo draws days x simulations x assets normals)
+MAX_ASSETS = {'plot_correlation_heatmap': 500, 'solve_efficient_frontier': 500, 'run_multi_asset_monte_carlo': 100}
+MAX_SIMULATIONS = {
+    'run_monte_carlo_simulation': 10000,
+    'run_multi_asset_monte_carlo': 10000,
+    'plot_monte_carlo_simulation': 10000,
+}
+
+END_DATE = pd.Timestamp('2025-01-01')
+
+@functools.lru_cache(maxsize=4)
+def synthetic_panel(num_assets, years, seed=0):
+    """
+    Prices, log returns and daily statistics of a synthetic universe plus a benchmark,
+    cached so every case at the same size shares one panel.
+    """
+    tickers = [f"SYN{i:04d}" for i in range(num_assets)]
+    prices = SyntheticProvider(seed=seed).download(tickers + ['BENCH'], END_DATE - pd.DateOffset(years=years), END_DATE)
+    returns = mt.calculate_log_returns(prices)
+    weights = np.full(num_assets, 1 / num_assets)
+    return {
+        'prices': prices[tickers],
+        'returns': returns[tickers],
+        'benchmark_returns': returns['BENCH'],
+        'mean_returns': returns[tickers].mean(),
+        'cov_matrix': returns[tickers].cov(),
+        'weights': weights,
+        'portfolio_returns': returns[tickers].dot(weights),
+    }
+
+def measure(fn, repeats=3, budget_seconds=2.0):
+    """
+    Times fn with time.perf_counter. The first call doubles as warm-up; calls slower than
+    budget_seconds are measured once instead of repeated. Returns (timings, last result).
+    """
+    start = time.perf_counter()
+    result = fn()
+    first = time.perf_counter() - start
+    if first > budget_seconds:
+        return [first], result
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+def _sizes(scale, name, *axes):
+    """
+    Cartesian product of the requested scale axes, with per-case caps applied.
+    """
+    grid = [{}]
+    for axis in axes:
+        values = scale[axis]
+        if axis == 'assets':
+            values = [v for v in values if v <= MAX_ASSETS.get(name, v)]
+        if axis == 'simulations':
+            values = [v for v in values if v <= MAX_SIMULATIONS.get(name, v)]
+        grid = [{**params, axis: v} for params in grid for v in values]
+    return grid
+
+def _frontier_inputs(data, simulations):
+    results, _ = mt.simulate_efficient_frontier(data['mean_returns'], data['cov_matrix'], num_portfolios=simulations,
+                                                return_weights=False)
+    return results
+
+def _monte_carlo_paths(data, simulations):
+    return mt.run_monte_carlo_simulation(data['weights'], data['mean_returns'], data['cov_matrix'],
+                                         years=5, num_simulations=simulations)
+
+def _log_returns_cases(scale):
+    for params in _sizes(scale, 'calculate_log_returns', 'assets', 'years'):
+        data = synthetic_panel(params['assets'], params['years'])
+        yield params, functools.partial(mt.calculate_log_returns, data['prices'])
+
+def _covariance_cases(scale):
+    for method in ('sample', 'ledoit_wolf', 'factor'):
+        for params in _sizes(scale, 'calculate_covariance_matrix', 'assets', 'years'):
+            data = synthetic_panel(params['assets'], params['years'])
+            yield {**params, 'method': method}, functools.partial(
+                mt.calculate_covariance_matrix, data['returns'], method=method)
+
+def _frontier_simulation_cases(scale):
+    for params in _sizes(scale, 'simulate_efficient_frontier', 'assets', 'simulations'):
+        data = synthetic_panel(params['assets'], 1)
+        yield params, functools.partial(_frontier_inputs, data, params['simulations'])
+
+def _frontier_solver_cases(scale):
+    for params in _sizes(scale, 'solve_efficient_frontier', 'assets'):
+        data = synthetic_panel(params['assets'], 1)
+        yield params, functools.partial(
+            mt.solve_efficient_frontier, data['mean_returns'], data['cov_matrix'], num_points=50)
+
+def _monte_carlo_cases(scale):
+    for params in _sizes(scale, 'run_monte_carlo_simulation', 'simulations'):
+        yield params, functools.partial(_monte_carlo_paths, synthetic_panel(10, 1), params['simulations'])
+
+def _multi_asset_monte_carlo_cases(scale):
+    for params in _sizes(scale, 'run_multi_asset_monte_carlo', 'assets', 'simulations'):
+        data = synthetic_panel(params['assets'], 1)
+        yield params, functools.partial(
+            mt.run_multi_asset_monte_carlo, data['weights'], data['mean_returns'], data['cov_matrix'],
+            years=1, num_simulations=params['simulations'], output='percentiles')
+
+def _beta_cases(scale):
+    for params in _sizes(scale, 'calculate_beta', 'years'):
+        data = synthetic_panel(10, params['years'])
+        yield params, functools.partial(mt.calculate_beta, data['portfolio_returns'], data['benchmark_returns'])
+
+def _evaluate_portfolios_cases(scale):
+    for params in _sizes(scale, 'evaluate_portfolios', 'assets', 'years'):
+        data = synthetic_panel(params['assets'], params['years'])
+        weights = np.random.default_rng(0).dirichlet(np.ones(params['assets']), 100)
+        yield params, functools.partial(mt.evaluate_portfolios, weights, data['returns'], data['benchmark_returns'])
+
+def _cumulative_plot_cases(scale):
+    for params in _sizes(scale, 'plot_cumulative_returns', 'years'):
+        data = synthetic_panel(10, params['years'])
+        yield params, functools.partial(
+            vz.plot_cumulative_returns, np.exp(data['portfolio_returns'].cumsum()),
+            np.exp(data['benchmark_returns'].cumsum()))
+
+def _rolling_plot_cases(scale):
+    for params in _sizes(scale, 'plot_rolling_metrics', 'years'):
+        data = synthetic_panel(10, params['years'])
+        rolling = mt.calculate_rolling_metrics(data['portfolio_returns'], data['benchmark_returns'], window=63)
+        yield params, functools.partial(vz.plot_rolling_metrics, rolling, 'BENCH', 63)
+
+def _heatmap_plot_cases(scale):
+    for mode in ('default', 'clustered'):
+        for params in _sizes(scale, 'plot_correlation_heatmap', 'assets'):
+            correlation = mt.correlation_from_covariance(synthetic_panel(params['assets'], 1)['cov_matrix'])
+            options = {'cluster': True, 'compact': True} if mode == 'clustered' else {}
+            yield {**params, 'mode': mode}, functools.partial(vz.plot_correlation_heatmap, correlation, **options)
+
+def _frontier_plot_cases(scale):
+    for params in _sizes(scale, 'plot_efficient_frontier_chart', 'simulations'):
+        results = _frontier_inputs(synthetic_panel(10, 1), params['simulations'])
+        yield params, functools.partial(vz.plot_efficient_frontier_chart, results, 0.2, 0.1)
+
+def _monte_carlo_plot_cases(scale):
+    for params in _sizes(scale, 'plot_monte_carlo_simulation', 'simulations'):
+        paths = _monte_carlo_paths(synthetic_panel(10, 1), params['simulations'])
+        yield params, functools.partial(vz.plot_monte_carlo_simulation, paths)
+
+# Benchmark name -> generator of (params, callable) for every size of a scale.
+# Inputs are prepared by the generator, so only the call under test is timed.
+CASES = {
+    'calculate_log_returns': _log_returns_cases,
+    'calculate_covariance_matrix': _covariance_cases,
+    'simulate_efficient_frontier': _frontier_simulation_cases,
+    'solve_efficient_frontier': _frontier_solver_cases,
+    'run_monte_carlo_simulation': _monte_carlo_cases,
+    'run_multi_asset_monte_carlo': _multi_asset_monte_carlo_cases,
+    'calculate_beta': _beta_cases,
+    'evaluate_portfolios': _evaluate_portfolios_cases,
+    # Plotting: figure construction only; the serialized payload size is recorded separately
+    'plot_cumulative_returns': _cumulative_plot_cases,
+    'plot_rolling_metrics': _rolling_plot_cases,
+    'plot_correlation_heatmap': _heatmap_plot_cases,
+    'plot_efficient_frontier_chart': _frontier_plot_cases,
+    'plot_monte_carlo_simulation': _monte_carlo_plot_cases,
+}
+
+def _case_key(name, params):
+    return name + '[' + ','.join(f"{k}={v}" for k, v in sorted(params.items())) + ']'
+
+def run_benchmarks(scale='quick', only=None, repeats=3, budget_seconds=2.0, log=print):
+    """
+    Runs every case of the scale (optionally only names containing one of the `only`
+    substrings) and returns the result records.
+    """
+    sizes = SCALES[scale] if isinstance(scale, str) else scale
+    records = []
+    for name, cases in CASES.items():
+        if only and not any(pattern in name for pattern in only):
+            continue
+        for params, fn in cases(sizes):
+            records.append(_run_case(name, params, fn, repeats, budget_seconds, log))
+    return records
+
+def _run_case(name, params, fn, repeats, budget_seconds, log):
+    timings, result = measure(fn, repeats, budget_seconds)
+    record = {
+        'benchmark': name,
+        'key': _case_key(name, params),
+        'params': params,
+        'median_seconds': statistics.median(timings),
+        'min_seconds': min(timings),
+        'runs': len(timings),
+    }
+    if name.startswith('plot_'):
+        record['payload_bytes'] = len(result.to_json())
+    if log:
+        log(f"{record['key']:<70} {record['median_seconds'] * 1000:10.2f} ms")
+    return record
+
+def compare_to_baseline(records, baseline_records, tolerance=1.3, min_seconds=0.005):
+    """
+    Matches records to a baseline run by key and flags cases whose median time grew by
+    more than the tolerance factor and by more than min_seconds (timer noise floor).
+
+    Returns:
+        pd.DataFrame: one row per matched case with 'ratio' and 'regression'.
+    """
+    baseline = {r['key']: r for r in baseline_records}
+    rows = []
+    for record in records:
+        if record['key'] not in baseline:
+            continue
+        base = baseline[record['key']]['median_seconds']
+        current = record['median_seconds']
+        rows.append({
+            'key': record['key'],
+            'baseline_seconds': base,
+            'median_seconds': current,
+            'ratio': current / base if base > 0 else np.inf,
+            'regression': current > base * tolerance and current - base > min_seconds,
+        })
+    return pd.DataFrame(rows, columns=['key', 'baseline_seconds', 'median_seconds', 'ratio', 'regression'])
+
+def environment_info():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the analytics hot paths on synthetic universes.")
+    parser.add_argument('--scale', choices=list(SCALES), default='quick', help="Size grid to run")
+    parser.add_argument('--only', nargs='*', default=None, help="Run only benchmarks whose name contains one of these")
+    parser.add_argument('--repeats', type=int, default=3, help="Timed repetitions per case")
+    parser.add_argument('--output', default='bench_results.json', help="Where to write the JSON results")
+    parser.add_argument('--baseline', default=None, help="Earlier results JSON to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=1.3, help="Allowed slowdown factor versus the baseline")
+    parser.add_argument('--min-seconds', type=float, default=0.005, help="Ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    records = run_benchmarks(args.scale, only=args.only, repeats=args.repeats)
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'scale': args.scale,
+        'environment': environment_info(),
+        'results': records,
+    }
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        comparison = compare_to_baseline(records, baseline['results'], args.tolerance, args.min_seconds)
+        regressions = comparison[comparison['regression']]
+        report['baseline'] = args.baseline
+        report['regressions'] = regressions['key'].tolist()
+        if len(regressions):
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.2f}x:")
+            print(regressions.to_string(index=False))
+            status = 1
+        else:
+            print(f"\nNo regressions against {args.baseline} ({len(comparison)} cases compared).")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
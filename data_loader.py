@@ -1,48 +1,216 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
-import streamlit as st
 
-@st.cache_data
-def fetch_historical_data(tickers, start_date, end_date=None):
+try:
+    from . import price_store as ps
+    from . import fetch_scheduler as fs
+    from . import instrumentation as ins
+    from .providers import YFinanceProvider
+except ImportError:
+    import price_store as ps
+    import fetch_scheduler as fs
+    import instrumentation as ins
+    from providers import YFinanceProvider
+
+DEFAULT_PROVIDER = YFinanceProvider()
+
+def set_default_provider(provider):
+    """
+    Sets the provider used when none is passed explicitly, e.g. a SyntheticProvider
+    or FileProvider to run the app, benchmarks or debug scripts without the network.
+    """
+    global DEFAULT_PROVIDER
+    DEFAULT_PROVIDER = provider
+
+def _fetch_through_store(tickers, start, end, today, store_dir, provider):
+    """
+    Downloads the ranges missing from the price store, then reads [start, end) back from it.
+    """
+    # Group tickers by missing range so each range is one batched download
+    pending = {}
+    for ticker in tickers:
+        for missing in ps.missing_ranges(ticker, start, end, store_dir):
+            pending.setdefault(missing, []).append(ticker)
+    
+    failures = {}
+    for (fetch_start, fetch_end), group in pending.items():
+        data, failed = fs.fetch_prices(group, fetch_start, fetch_end, provider)
+        failures.update(failed)
+        # Today's bar is still forming, so coverage stops at today and it is re-fetched later
+        covered_end = min(fetch_end, today)
+        # data only holds tickers of batches the provider answered; those that raised retry next
+        # time. Ranges answered without bars (weekends, before listing, left out of the answer)
+        # are skipped for a while rather than re-downloaded on every call
+        for ticker in data.columns:
+            if data[ticker].notna().any():
+                ps.write_prices(ticker, data[ticker], fetch_start, covered_end, store_dir)
+            elif fetch_start < covered_end:
+                ps.mark_empty(ticker, fetch_start, covered_end, store_dir)
+    
+    df = pd.concat({t: ps.read_prices(t, start, end, store_dir) for t in tickers}, axis=1)
+    return df, failures
+
+@ins.instrument()
+def fetch_historical_data(tickers, start_date, end_date=None, store_dir=None, provider=None, return_report=False):
     """
     Fetches historical adjusted close prices for the given tickers.
+    Prices are served from the local price store; only date ranges not yet stored are
+    downloaded (in concurrent batches, see fetch_scheduler) and written back to the store.
     
     Args:
         tickers (list): List of ticker symbols (e.g., ['FSR.JO', 'NPN.JO']).
         start_date (str): Start date in 'YYYY-MM-DD' format.
-        end_date (str, optional): End date in 'YYYY-MM-DD' format.
+        end_date (str, optional): End date in 'YYYY-MM-DD' format (exclusive, as in yfinance).
+        store_dir (str, optional): Price store directory, defaults to price_store.STORE_DIR.
+        provider (MarketDataProvider, optional): Price source, defaults to Yahoo Finance.
+        return_report (bool): Also return a report of the tickers that could not be fetched.
         
     Returns:
-        pd.DataFrame: DataFrame of Adjusted Close prices.
+        pd.DataFrame: DataFrame of Adjusted Close prices, or (DataFrame, report) where
+        report['failed'] maps each ticker without data to the reason.
     """
     if not tickers:
-        return pd.DataFrame()
+        return (pd.DataFrame(), {'failed': {}}) if return_report else pd.DataFrame()
+    provider = provider or DEFAULT_PROVIDER
     
-    # yfinance expects a space-separated string or list
-    data = yf.download(tickers, start=start_date, end=end_date, progress=False)
+    today = pd.Timestamp.today().normalize()
+    start = pd.Timestamp(start_date).normalize()
+    end = pd.Timestamp(end_date).normalize() if end_date is not None else today + pd.Timedelta(days=1)
     
-    if 'Adj Close' in data.columns:
-        df = data['Adj Close']
-    elif 'Close' in data.columns:
-        df = data['Close']
+    if not provider.persist:
+        # Local providers are served directly and never written to the price store
+        df, failures = fs.fetch_prices(tickers, start, end, provider, batch_size=len(tickers),
+                                       max_retries=0, calls_per_second=None)
+        df = df.reindex(columns=tickers)
     else:
-        # Fallback if single ticker and structure is different
-        df = data
-        
-    return df
+        df, failures = _fetch_through_store(tickers, start, end, today, store_dir, provider)
+    df.index.name = 'Date'
+    if not return_report:
+        return df
+    
+    for ticker in df.columns[df.isna().all()]:
+        failures.setdefault(ticker, "no data in the requested range")
+    report = {'failed': {t: reason for t, reason in failures.items() if df[t].isna().all()}}
+    return df, report
 
-@st.cache_data
-def fetch_exchange_rates(start_date):
+@ins.instrument()
+def refresh_prices(tickers, store_dir=None, provider=None, batch_size=200, cache=None):
     """
-    Fetches USD/ZAR exchange rate.
+    Incrementally brings stored tickers up to date.
+    Each ticker is re-requested from its last stored bar (which may have been partial)
+    to today, with tickers sharing the same last bar downloaded together in batches.
+    Tickers with nothing stored yet are skipped; use fetch_historical_data for those.
+    
+    Args:
+        cache (StatsCache, optional): Entries tagged with a ticker whose prices changed
+            are invalidated, so derived statistics are recomputed from the revised bars.
+    
+    Returns:
+        dict: ticker -> earliest date whose price was added or changed (None if unchanged).
     """
-    ticker = "USDZAR=X"
-    data = yf.download(ticker, start=start_date, progress=False)
-    if 'Adj Close' in data.columns:
-        return data['Adj Close']
-    return data['Close']
+    provider = provider or DEFAULT_PROVIDER
+    today = pd.Timestamp.today().normalize()
+    end = today + pd.Timedelta(days=1)
+    
+    pending = {}
+    for ticker in tickers:
+        last_bar = ps.last_stored_date(ticker, store_dir)
+        if last_bar is not None:
+            pending.setdefault(last_bar, []).append(ticker)
+    
+    changes = {}
+    for last_bar, group in pending.items():
+        data, failed = fs.fetch_prices(group, last_bar, end, provider, batch_size=batch_size)
+        for ticker in group:
+            changes[ticker] = None
+            if ticker in data.columns and ticker not in failed:
+                changes[ticker] = ps.write_prices(ticker, data[ticker], last_bar, today, store_dir)
+    
+    if cache is not None:
+        cache.invalidate([t for t, changed_from in changes.items() if changed_from is not None])
+    return changes
+
+@ins.instrument()
+def fetch_exchange_rates(start_date, pair="USDZAR=X", provider=None, end_date=None):
+    """
+    Fetches an exchange rate series (USD/ZAR by default) through the price store.
+    """
+    df = fetch_historical_data([pair], start_date=start_date, end_date=end_date, provider=provider)
+    return df[pair]
+
+# Exchange suffix -> (currency, price unit). Yahoo quotes JSE and LSE listings in cents / pence.
+EXCHANGE_CURRENCIES = {
+    '.JO': ('ZAR', 0.01),
+    '.L': ('GBP', 0.01),
+    '.DE': ('EUR', 1.0),
+    '.F': ('EUR', 1.0),
+    '.PA': ('EUR', 1.0),
+    '.AS': ('EUR', 1.0),
+    '.MI': ('EUR', 1.0),
+    '.MC': ('EUR', 1.0),
+    '.BR': ('EUR', 1.0),
+    '.SW': ('CHF', 1.0),
+    '.TO': ('CAD', 1.0),
+    '.V': ('CAD', 1.0),
+    '.AX': ('AUD', 1.0),
+    '.HK': ('HKD', 1.0),
+    '.T': ('JPY', 1.0),
+    '.SI': ('SGD', 1.0),
+}
+
+def fx_pair_tickers(tickers, base_currency='USD', overrides=None):
+    """
+    FX pair tickers (e.g. 'ZARUSD=X') needed to convert the given tickers into base_currency.
+    """
+    currencies = {detect_currency(t, overrides)[0] for t in tickers}
+    return [f"{c}{base_currency}=X" for c in sorted(currencies - {base_currency})]
+
+def detect_currency(ticker, overrides=None):
+    """
+    Returns (currency, unit) for a ticker from its exchange suffix, e.g. 'FSR.JO' -> ('ZAR', 0.01).
+    Tickers without a known suffix are assumed to be quoted in USD.
+    """
+    if overrides and ticker in overrides:
+        return overrides[ticker]
+    if '.' in ticker:
+        suffix = ticker[ticker.rindex('.'):].upper()
+        if suffix in EXCHANGE_CURRENCIES:
+            return EXCHANGE_CURRENCIES[suffix]
+    return ('USD', 1.0)
+
+@ins.instrument()
+def convert_to_base_currency(prices, base_currency='USD', provider=None, store_dir=None, overrides=None):
+    """
+    Converts a mixed-currency price panel into base_currency.
+    All needed FX pairs (e.g. 'ZARUSD=X') are fetched once through the price store, aligned to
+    the panel's dates (forward-filled over FX holidays), gathered into a (dates, tickers) rate
+    matrix and applied with a single broadcast multiply.
+    
+    Returns:
+        tuple: (converted pd.DataFrame, dict of ticker -> currency). Tickers whose FX
+        series could not be fetched come back as all-NaN columns.
+    """
+    info = {t: detect_currency(t, overrides) for t in prices.columns}
+    currencies = {t: c for t, (c, _) in info.items()}
+    units = np.array([u for _, u in info.values()])
+    
+    foreign = sorted({c for c in currencies.values() if c != base_currency})
+    pairs = {c: f"{c}{base_currency}=X" for c in foreign}
+    
+    # Column 0 is the base currency itself (rate 1)
+    fx = np.ones((len(prices), len(foreign) + 1))
+    if foreign and len(prices):
+        end = prices.index.max() + pd.Timedelta(days=1)
+        rates = fetch_historical_data(list(pairs.values()), prices.index.min(), end, store_dir=store_dir, provider=provider)
+        rates = rates.reindex(rates.index.union(prices.index)).ffill().bfill().reindex(prices.index)
+        fx[:, 1:] = rates[list(pairs.values())].to_numpy(dtype=float)
+    
+    column_of = {base_currency: 0, **{c: i + 1 for i, c in enumerate(foreign)}}
+    rate_matrix = fx[:, [column_of[currencies[t]] for t in prices.columns]] * units
+    converted = pd.DataFrame(prices.to_numpy(dtype=float) * rate_matrix, index=prices.index, columns=prices.columns)
+    return converted, currencies
 
+@ins.instrument()
 def get_esg_scores(tickers):
     """
     Generates mock ESG scores for the given tickers as a placeholder.
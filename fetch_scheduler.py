@@ -0,0 +1,96 @@
+import time
+import random
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+try:
+    from . import instrumentation as ins
+except ImportError:
+    import instrumentation as ins
+
+class RateLimiter:
+    """
+    Thread-safe limiter spacing request starts at least 1 / calls_per_second apart.
+    """
+
+    def __init__(self, calls_per_second=2.0):
+        self.interval = 1.0 / calls_per_second if calls_per_second else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+def _fetch_batch(provider, batch, start_date, end_date, limiter, max_retries, backoff):
+    """
+    Downloads one batch with retry and exponential backoff.
+    Returns (DataFrame or None, error message or None).
+    """
+    error = None
+    for attempt in range(max_retries + 1):
+        limiter.wait()
+        try:
+            with ins.stage('provider.download', tickers=len(batch), attempt=attempt):
+                return provider.download(batch, start_date, end_date), None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if attempt < max_retries:
+                # Exponential backoff with jitter so parallel workers do not retry in lockstep
+                time.sleep(backoff * 2 ** attempt * (1 + random.random()))
+    return None, error
+
+def fetch_prices(tickers, start_date, end_date, provider, batch_size=50, max_workers=4,
+                 max_retries=3, backoff=1.0, calls_per_second=2.0):
+    """
+    Fetches prices for a large universe by splitting it into batches and running them
+    on a bounded thread pool, with retries, backoff and a shared rate limit.
+
+    Returns:
+        tuple: (pd.DataFrame aligned on the union of dates with one column per ticker of
+                every batch the provider answered without raising, empty answers included,
+                dict of failed ticker -> reason)
+    """
+    tickers = list(dict.fromkeys(tickers))
+    batches = [tickers[i:i + batch_size] for i in range(0, len(tickers), batch_size)]
+    limiter = RateLimiter(calls_per_second)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as pool:
+        # Each batch runs in a copy of the caller's context so its stages reach the caller's recording
+        futures = [
+            pool.submit(contextvars.copy_context().run, _fetch_batch, provider, batch, start_date, end_date,
+                        limiter, max_retries, backoff)
+            for batch in batches
+        ]
+        outcomes = [f.result() for f in futures]
+
+    frames = []
+    answered = []
+    failures = {}
+    for batch, (data, error) in zip(batches, outcomes):
+        if data is None:
+            for ticker in batch:
+                failures[ticker] = f"download failed after {max_retries + 1} attempts ({error})"
+            continue
+        for ticker in batch:
+            if data.empty:
+                # An entirely empty answer may be a silent outage, so it is reported as well
+                failures[ticker] = "empty response"
+            elif ticker not in data.columns or data[ticker].isna().all():
+                failures[ticker] = "no data returned"
+        frames.append(data.reindex(columns=batch))
+        answered.extend(batch)
+
+    if frames:
+        merged = pd.concat(frames, axis=1).sort_index()
+    else:
+        merged = pd.DataFrame(columns=answered, dtype=float)
+    merged.index.name = 'Date'
+    return merged, failures
@@ -0,0 +1,236 @@
+"""
+Per-stage instrumentation for the analysis pipeline.
+
+Entry points in data_loader, metrics and visualizations are wrapped with @instrument;
+other code can time a block with `with stage('name'):`. Each stage records its wall
+time, input / output shapes, cache hit or miss (StatsCache) and, when memory tracing is
+on, the peak traced memory above the stage's starting point.
+
+Recording is off by default and an instrumented call then costs one flag check. It is
+switched on for the whole process with the PORTFOLIO_INSTRUMENTATION environment
+variable ('1', or 'memory' to trace memory too) or with enable(), and for one thread /
+session with begin_recording() ... end_recording() or `with recording():`, which also
+collect the records for display. Every finished stage is emitted as a JSON line on
+the 'portfolio.instrumentation' logger.
+"""
+import os
+import json
+import time
+import logging
+import functools
+import threading
+import tracemalloc
+import contextvars
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('portfolio.instrumentation')
+
+_env = os.environ.get('PORTFOLIO_INSTRUMENTATION', '').strip().lower()
+_GLOBAL = {'enabled': _env not in ('', '0', 'false'), 'memory': _env == 'memory'}
+if _GLOBAL['enabled'] and not logger.handlers:
+    # Opting in through the environment means the JSON lines should reach stderr
+    logger.addHandler(logging.StreamHandler())
+    logger.setLevel(logging.INFO)
+if _GLOBAL['memory']:
+    tracemalloc.start()
+
+# Records collected by the current session (None when not recording)
+_SESSION = contextvars.ContextVar('instrumentation_session', default=None)
+# Stages currently open in this thread, for nesting and memory peaks
+_LOCAL = threading.local()
+# tracemalloc is process-wide: recorders tracing memory share it, and it is only stopped
+# when the last of them ends and this module was the one that started it
+_TRACING = {'users': 0, 'started': False}
+_TRACING_LOCK = threading.Lock()
+
+class _Session:
+    def __init__(self, memory):
+        self.memory = memory
+        self.records = []
+
+def _acquire_tracing():
+    with _TRACING_LOCK:
+        _TRACING['users'] += 1
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _TRACING['started'] = True
+
+def _release_tracing():
+    with _TRACING_LOCK:
+        _TRACING['users'] -= 1
+        if _TRACING['users'] == 0 and _TRACING['started']:
+            tracemalloc.stop()
+            _TRACING['started'] = False
+
+def enable(memory=False):
+    """
+    Records and logs stages process-wide.
+    """
+    _GLOBAL.update(enabled=True, memory=memory)
+
+def disable():
+    _GLOBAL.update(enabled=False, memory=False)
+
+def is_enabled():
+    return _GLOBAL['enabled'] or _SESSION.get() is not None
+
+def begin_recording(memory=False):
+    """
+    Starts collecting stage records in the current context (e.g. one Streamlit script run).
+    Any recording already in progress in this context is discarded.
+    Memory peaks are process-wide, so with several sessions recording memory at once
+    each stage's peak also includes allocations made concurrently by the others.
+    """
+    end_recording()
+    session = _Session(memory)
+    if memory:
+        _acquire_tracing()
+    _SESSION.set(session)
+    return session.records
+
+def end_recording():
+    """
+    Stops collecting and returns the records collected since begin_recording().
+    """
+    session = _SESSION.get()
+    if session is None:
+        return []
+    _SESSION.set(None)
+    if session.memory:
+        _release_tracing()
+    return session.records
+
+@contextmanager
+def recording(memory=False):
+    records = begin_recording(memory)
+    try:
+        yield records
+    finally:
+        end_recording()
+
+def _shape(value):
+    if isinstance(value, (pd.DataFrame, pd.Series, np.ndarray)) or hasattr(value, 'shape'):
+        shape = getattr(value, 'shape', None)
+        if isinstance(shape, tuple):
+            return list(shape)
+    if isinstance(value, (list, tuple)) and value and all(hasattr(v, 'shape') for v in value):
+        return [_shape(v) for v in value]
+    return None
+
+def _input_shapes(args, kwargs):
+    shapes = {}
+    for i, value in enumerate(args):
+        shape = _shape(value)
+        if shape is not None:
+            shapes[f"arg{i}"] = shape
+    for key, value in kwargs.items():
+        shape = _shape(value)
+        if shape is not None:
+            shapes[key] = shape
+    return shapes
+
+def _emit(record):
+    session = _SESSION.get()
+    if session is not None:
+        session.records.append(record)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps(record, default=str))
+
+@contextmanager
+def stage(name, **info):
+    """
+    Times the enclosed block as one stage. Yields the record dict (or None when
+    instrumentation is off), so callers can attach extra fields such as 'cache'.
+    """
+    session = _SESSION.get()
+    if not (_GLOBAL['enabled'] or session is not None):
+        yield None
+        return
+
+    record = {'stage': name, **info}
+    stack = getattr(_LOCAL, 'stack', None)
+    if stack is None:
+        stack = _LOCAL.stack = []
+    record['depth'] = len(stack)
+
+    trace_memory = tracemalloc.is_tracing() and (_GLOBAL['memory'] or (session is not None and session.memory))
+    frame = {'peak': 0}
+    if trace_memory:
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            # The enclosing stage's peak so far, before this stage resets the counter
+            stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+        tracemalloc.reset_peak()
+        frame['start'] = current
+    stack.append(frame)
+
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record['error'] = type(e).__name__
+        raise
+    finally:
+        record['seconds'] = time.perf_counter() - start
+        stack.pop()
+        if trace_memory and 'start' in frame:
+            peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+            record['peak_mb'] = (peak - frame['start']) / 2**20
+            if stack:
+                stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+        _emit(record)
+
+def event(name, **info):
+    """
+    Records an instantaneous stage, e.g. a cache hit.
+    """
+    if not (_GLOBAL['enabled'] or _SESSION.get() is not None):
+        return
+    _emit({'stage': name, **info, 'depth': len(getattr(_LOCAL, 'stack', None) or []), 'seconds': 0.0})
+
+def instrument(name=None):
+    """
+    Decorator recording every call of a function as a stage named module.function,
+    with the shapes of its array / DataFrame arguments and of its result.
+    """
+    def decorate(fn):
+        stage_name = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not (_GLOBAL['enabled'] or _SESSION.get() is not None):
+                return fn(*args, **kwargs)
+            with stage(stage_name) as record:
+                record['inputs'] = _input_shapes(args, kwargs)
+                result = fn(*args, **kwargs)
+                record['output'] = _shape(result)
+                return result
+        return wrapper
+    return decorate
+
+def _format_shape(shape):
+    if shape is None or (isinstance(shape, float) and np.isnan(shape)):
+        return ''
+    if isinstance(shape, dict):
+        return ', '.join(f"{k}={_format_shape(v)}" for k, v in shape.items())
+    if shape and isinstance(shape[0], list):
+        return ', '.join(_format_shape(s) for s in shape)
+    return 'x'.join(str(n) for n in shape)
+
+def summarize(records):
+    """
+    Stage records as a display-ready DataFrame in completion order, with nested stages
+    indented and shapes formatted as text (e.g. '1043x3').
+    """
+    if not records:
+        return pd.DataFrame(columns=['stage', 'seconds', 'peak_mb', 'cache', 'inputs', 'output'])
+    df = pd.DataFrame(records)
+    df['stage'] = ['  ' * int(d) + s for d, s in zip(df['depth'], df['stage'])]
+    for column in ('inputs', 'output'):
+        if column in df.columns:
+            df[column] = df[column].map(_format_shape)
+    columns = [c for c in ['stage', 'seconds', 'peak_mb', 'cache', 'inputs', 'output', 'error'] if c in df.columns]
+    return df[columns]
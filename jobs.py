@@ -0,0 +1,347 @@
+"""
+Background jobs for the heavy UI computations: efficient frontier, Monte Carlo and backtest.
+
+A JobManager owns one process pool shared by every Streamlit session. Each job is split
+into chunk tasks (blocks of frontier portfolios or Monte Carlo paths) whose results are
+merged as they complete, so a Job reports progress and a partial result long before it
+finishes. Jobs are keyed by a fingerprint of their kind and inputs: submitting inputs that
+are already running, or finished recently, returns the existing job instead of a new one.
+Sessions attach to a job as owners; once the last owner releases it (because its inputs
+changed), the chunks that have not started yet are cancelled.
+"""
+import os
+import time
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, CancelledError
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+try:
+    from . import metrics as mt
+    from . import backtest as bt
+    from . import stats_cache as sc
+    from . import instrumentation as ins
+except ImportError:
+    import metrics as mt
+    import backtest as bt
+    import stats_cache as sc
+    import instrumentation as ins
+
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+# Worker-side chunk tasks (top-level so the process pool can pickle them)
+
+def _frontier_chunk(mean_returns, cov_matrix, num_portfolios, risk_free_rate, seed):
+    np.random.seed(seed)
+    results, _ = mt.simulate_efficient_frontier(
+        mean_returns, cov_matrix, num_portfolios, risk_free_rate=risk_free_rate, return_weights=False
+    )
+    return results
+
+def _frontier_solution(mean_returns, cov_matrix, risk_free_rate):
+    return mt.solve_efficient_frontier(mean_returns, cov_matrix, risk_free_rate=risk_free_rate)
+
+def _monte_carlo_chunk(weights, mean_returns, cov_matrix, years, num_simulations, initial_investment, seed):
+    paths = mt.run_multi_asset_monte_carlo(
+        weights, mean_returns, cov_matrix, years=years, num_simulations=num_simulations,
+        initial_investment=initial_investment, output='paths', seed=seed
+    )
+    # Halves the payload sent back; the reducer keeps float32 anyway
+    return paths.to_numpy(dtype=np.float32)
+
+# Reducers merge chunk results in the parent as they arrive, in any order
+
+class FrontierReducer:
+    """
+    Random-portfolio cloud (filled in chunk by chunk) plus the solved frontier.
+    Partial value: (results of the finished chunks, frontier dict or None while unsolved).
+    """
+
+    def __init__(self, num_chunks):
+        self.chunks = [None] * num_chunks
+        self.frontier = None
+
+    def update(self, index, value):
+        if index == 0:
+            self.frontier = value
+        else:
+            self.chunks[index - 1] = value
+
+    def partial(self):
+        finished = [c for c in self.chunks if c is not None]
+        if not finished:
+            return None
+        return np.hstack(finished), self.frontier
+
+class MonteCarloReducer:
+    """
+    Percentile bands over the paths simulated so far.
+    Partial value: {'bands': DataFrame (days, percentiles), 'simulations': paths included}.
+    """
+
+    def __init__(self, num_days, percentiles):
+        self.reducer = mt.PercentileReducer(num_days, percentiles)
+
+    def update(self, index, value):
+        self.reducer.update(value)
+
+    def partial(self):
+        if self.reducer.count == 0:
+            return None
+        return {'bands': self.reducer.result(), 'simulations': self.reducer.count}
+
+class SingleReducer:
+    """
+    Jobs made of one task: no partial value until it is done.
+    """
+
+    def __init__(self):
+        self.value = None
+
+    def update(self, index, value):
+        self.value = value
+
+    def partial(self):
+        return self.value
+
+# Job kinds: build the chunk tasks (fn, args) and the reducer merging their results
+
+def frontier_tasks(mean_returns, cov_matrix, risk_free_rate=0.0, num_portfolios=5000, chunk_size=1000, seed=0):
+    """
+    The frontier solve runs first, then the random cloud in chunks of chunk_size portfolios.
+    """
+    mean_returns = np.asarray(mean_returns, dtype=float)
+    cov_matrix = np.asarray(cov_matrix, dtype=float)
+    tasks = [(_frontier_solution, (mean_returns, cov_matrix, risk_free_rate))]
+    for i, start in enumerate(range(0, num_portfolios, chunk_size)):
+        size = min(chunk_size, num_portfolios - start)
+        tasks.append((_frontier_chunk, (mean_returns, cov_matrix, size, risk_free_rate, [seed, i])))
+    return tasks, FrontierReducer(len(tasks) - 1)
+
+def monte_carlo_tasks(weights, mean_returns, cov_matrix, years=5, num_simulations=1000, initial_investment=10000,
+                      percentiles=(5, 50, 95), chunk_size=100, seed=42):
+    """
+    Paths are simulated in chunks of chunk_size, each from its own seed, and folded into
+    one PercentileReducer.
+    """
+    args = (np.asarray(weights, dtype=float), np.asarray(mean_returns, dtype=float), np.asarray(cov_matrix, dtype=float))
+    tasks = []
+    for i, start in enumerate(range(0, num_simulations, chunk_size)):
+        size = min(chunk_size, num_simulations - start)
+        tasks.append((_monte_carlo_chunk, args + (years, size, initial_investment, [seed, i])))
+    return tasks, MonteCarloReducer(years * 252, percentiles)
+
+def backtest_tasks(prices, weights, **kwargs):
+    """
+    One run_backtest call; kwargs are passed through (rebalance, cost_bps, threshold, ...).
+    """
+    return [(bt.run_backtest, (prices, np.asarray(weights, dtype=float)), kwargs)], SingleReducer()
+
+JOB_KINDS = {
+    'frontier': frontier_tasks,
+    'monte_carlo': monte_carlo_tasks,
+    'backtest': backtest_tasks,
+}
+
+def job_key(kind, *args, **kwargs):
+    """
+    Fingerprint identifying a job by its kind and inputs.
+    """
+    parts = [kind, *args]
+    for name in sorted(kwargs):
+        parts += [name, kwargs[name]]
+    return sc.fingerprint(*parts)
+
+class Job:
+    """
+    Handle on a submitted job. Safe to poll from any thread: status, progress,
+    partial() and result() only read state merged under the job's lock.
+    """
+
+    def __init__(self, key, kind, num_tasks, reducer):
+        self.key = key
+        self.kind = kind
+        self.total = num_tasks
+        self.completed = 0
+        self.status = RUNNING
+        self.error = None
+        self.owners = set()
+        self.submitted = time.time()
+        self._reducer = reducer
+        self._futures = []
+        self._partial = (-1, None)
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+
+    def _start(self, pool, tasks):
+        for index, task in enumerate(tasks):
+            fn, args = task[0], task[1]
+            kwargs = task[2] if len(task) > 2 else {}
+            future = pool.submit(fn, *args, **kwargs)
+            self._futures.append(future)
+            future.add_done_callback(lambda f, i=index: self._on_done(i, f))
+
+    def _on_done(self, index, future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        with self._lock:
+            if self.status != RUNNING:
+                return
+            if error is not None:
+                self.status, self.error = FAILED, error
+            else:
+                self._reducer.update(index, future.result())
+                self.completed += 1
+                if self.completed == self.total:
+                    self.status = DONE
+        if error is not None:
+            self._cancel_pending()
+        if self.status != RUNNING:
+            self._finished.set()
+
+    def _cancel_pending(self):
+        for future in self._futures:
+            future.cancel()
+
+    @property
+    def progress(self):
+        return self.completed / self.total if self.total else 1.0
+
+    def done(self):
+        return self._finished.is_set()
+
+    def partial(self):
+        """
+        The result merged from the chunks finished so far (None before the first one).
+        Equal to result() once the job is done.
+        """
+        with self._lock:
+            completed, value = self._partial
+            if completed != self.completed:
+                value = self._reducer.partial()
+                self._partial = (self.completed, value)
+            return value
+
+    def result(self, timeout=None):
+        """
+        Waits for the job and returns its result. Raises the worker's exception if a
+        chunk failed and CancelledError if the job was cancelled.
+        """
+        if not self._finished.wait(timeout):
+            raise TimeoutError(f"Job {self.kind} still running")
+        if self.status == FAILED:
+            raise self.error
+        if self.status == CANCELLED:
+            raise CancelledError()
+        return self.partial()
+
+    def cancel(self):
+        """
+        Cancels chunks that have not started; running chunks finish and are discarded.
+        """
+        with self._lock:
+            if self.status != RUNNING:
+                return False
+            self.status = CANCELLED
+        self._cancel_pending()
+        self._finished.set()
+        return True
+
+class JobManager:
+    """
+    Runs jobs on a shared process pool and dedupes them by input fingerprint.
+
+    The pool uses the 'spawn' start method: forking the multi-threaded Streamlit server
+    is unsafe. Up to keep_finished completed jobs are kept so reruns and other sessions
+    asking for the same inputs get the result immediately.
+    """
+
+    def __init__(self, max_workers=None, keep_finished=16):
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.keep_finished = keep_finished
+        self._pool = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+
+    def submit(self, kind, *args, owner=None, **kwargs):
+        """
+        Starts a job of the given kind ('frontier', 'monte_carlo' or 'backtest'), or returns
+        the running / finished job with identical inputs. owner (e.g. a session id) is
+        recorded so release() only cancels jobs nobody is waiting for.
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        key = job_key(kind, *args, **kwargs)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.status in (RUNNING, DONE):
+                self._jobs.move_to_end(key)
+                if owner is not None:
+                    job.owners.add(owner)
+                ins.event(f"job.{kind}", cache='hit', status=job.status)
+                return job
+
+            tasks, reducer = JOB_KINDS[kind](*args, **kwargs)
+            job = Job(key, kind, len(tasks), reducer)
+            if owner is not None:
+                job.owners.add(owner)
+            try:
+                job._start(self._executor(), tasks)
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory); start over on a fresh pool
+                self._pool = None
+                job._futures = []
+                job._start(self._executor(), tasks)
+            self._jobs[key] = job
+            self._evict()
+        ins.event(f"job.{kind}", cache='miss', tasks=len(tasks))
+        return job
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def release(self, key, owner):
+        """
+        Detaches owner from a job; a running job left without owners is cancelled.
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None:
+                return
+            job.owners.discard(owner)
+            if job.owners or job.done():
+                return
+            del self._jobs[key]
+        job.cancel()
+
+    def _evict(self):
+        finished = [k for k, job in self._jobs.items() if job.done()]
+        for key in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[key]
+
+    def active_jobs(self):
+        with self._lock:
+            return [job for job in self._jobs.values() if not job.done()]
+
+    def shutdown(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+            self._jobs.clear()
+        for job in jobs:
+            job.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
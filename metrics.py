@@ -1,18 +1,321 @@
 import numpy as np
 import pandas as pd
 
-def calculate_log_returns(prices):
+try:
+    from . import instrumentation as ins
+except ImportError:
+    import instrumentation as ins
+
+ALIGNMENT_POLICIES = ('intersection', 'ffill', 'union')
+
+@ins.instrument()
+def align_prices(prices, policy='ffill', max_fill_days=3):
+    """
+    Aligns a price panel from mixed exchange calendars onto one set of dates.
+    Tickers without any prices are dropped first.
+
+    policy:
+        'intersection' - keep only dates on which every ticker traded
+        'ffill'        - union calendar; gaps of up to max_fill_days rows (holidays on one
+                         exchange) carry the last price forward, dates still incomplete are dropped
+        'union'        - union calendar; every gap after a ticker's first price is carried
+                         forward and nothing is dropped (use the mask for pairwise statistics)
+
+    Returns:
+        tuple: (aligned pd.DataFrame, boolean pd.DataFrame marking actually observed prices)
+    """
+    if policy not in ALIGNMENT_POLICIES:
+        raise ValueError(f"Unknown alignment policy: {policy}")
+
+    prices = prices.dropna(axis=1, how='all')
+    values = prices.to_numpy(dtype=float)
+    observed = ~np.isnan(values)
+
+    if policy == 'intersection':
+        keep = observed.all(axis=1)
+        return prices[keep], pd.DataFrame(observed[keep], index=prices.index[keep], columns=prices.columns)
+
+    # Row of the last observed price at or before each date, per column
+    rows = np.arange(len(values))[:, np.newaxis]
+    last_seen = np.maximum.accumulate(np.where(observed, rows, -1), axis=0)
+    filled = values[np.maximum(last_seen, 0), np.arange(values.shape[1])]
+    limit = np.inf if policy == 'union' else max_fill_days
+    fillable = (last_seen >= 0) & (rows - last_seen <= limit)
+    filled = np.where(fillable, filled, np.nan)
+
+    aligned = pd.DataFrame(filled, index=prices.index, columns=prices.columns)
+    mask = pd.DataFrame(observed, index=prices.index, columns=prices.columns)
+    if policy == 'ffill':
+        keep = fillable.all(axis=1)
+        aligned, mask = aligned[keep], mask[keep]
+    return aligned, mask
+
+@ins.instrument()
+def calculate_log_returns(prices, dropna=True, observed=None):
     """
     Calculates daily log returns from adjusted close prices.
+
+    With dropna=False rows containing NaNs are kept. An observed mask (from align_prices)
+    keeps forward-filled prices from counting as zero returns:
+        dropna=True  - returns are measured between consecutive dates on which every ticker
+                       traded, so a holiday on one exchange merges two days into one return
+                       for all tickers (the rows stay synchronized for covariances)
+        dropna=False - returns on dates a ticker did not trade are NaN and the move since its
+                       last trade lands on its next trading day (for pairwise statistics)
     """
-    return np.log(prices / prices.shift(1)).dropna()
+    if observed is not None and dropna:
+        prices = prices[np.asarray(observed, dtype=bool).all(axis=1)]
+        observed = None
+    returns = np.log(prices / prices.shift(1))
+    if observed is not None:
+        returns = returns.where(observed)
+    if dropna:
+        return returns.dropna()
+    return returns.iloc[1:]
 
-def calculate_covariance_matrix(returns):
+def _returns_matrix(returns):
+    """
+    2-D returns values for matrix maths. A ReturnsPanel is used in its own (float32 or
+    memory-mapped) storage instead of being copied to float64.
+    """
+    if isinstance(returns, ReturnsPanel):
+        return returns.values
+    return np.asarray(returns, dtype=float)
+
+@ins.instrument()
+def calculate_covariance_matrix(returns, method='sample', num_factors=5):
     """
     Calculates the covariance matrix of returns.
+
+    method:
+        'sample'               - sample covariance (returns.cov())
+        'pairwise'             - pairwise-complete covariance of returns containing NaNs
+        'ledoit_wolf'          - Ledoit-Wolf shrinkage towards a scaled identity
+        'constant_correlation' - Ledoit-Wolf shrinkage towards the constant-correlation matrix
+        'factor'               - PCA factor model with num_factors factors, as a FactorCovariance
+    """
+    if method == 'sample':
+        return returns.cov()
+    if method == 'pairwise':
+        return pairwise_covariance(returns)
+    if method == 'ledoit_wolf':
+        return ledoit_wolf_covariance(returns, target='identity')
+    if method == 'constant_correlation':
+        return ledoit_wolf_covariance(returns, target='constant_correlation')
+    if method == 'factor':
+        return FactorCovariance.from_returns(returns, num_factors)
+    raise ValueError(f"Unknown covariance method: {method}")
+
+def pairwise_covariance(returns, min_periods=2):
+    """
+    Pairwise-complete covariance: each pair uses every date on which both returns exist.
+    Same result as DataFrame.cov() on NaN-containing returns, but computed with three
+    matrix products over a validity mask instead of a loop over pairs.
+    """
+    X = _returns_matrix(returns)
+    valid = ~np.isnan(X)
+    X0 = np.where(valid, X, 0.0)
+    M = valid.astype(float)
+
+    counts = M.T @ M
+    sums = X0.T @ M  # sums[i, j]: sum of x_i over dates where i and j both exist
+    cross = X0.T @ X0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = (cross - sums * sums.T / counts) / (counts - 1)
+    cov[counts < max(min_periods, 2)] = np.nan
+
+    if isinstance(returns, (pd.DataFrame, ReturnsPanel)):
+        return pd.DataFrame(cov, index=returns.columns, columns=returns.columns)
+    return cov
+
+def nearest_psd(cov_matrix):
+    """
+    Closest positive semi-definite matrix (in Frobenius norm) to a symmetric estimate such as
+    pairwise_covariance, whose pairs cover different dates and so need not be PSD.
+    Negative eigenvalues are clipped to zero; undefined (NaN) covariances count as zero.
     """
-    return returns.cov()
+    cov = np.nan_to_num(np.asarray(cov_matrix, dtype=float))
+    cov = (cov + cov.T) / 2
+    eigvals, eigvecs = np.linalg.eigh(cov)
+    if eigvals.min() < 0:
+        cov = (eigvecs * np.clip(eigvals, 0.0, None)) @ eigvecs.T
+
+    columns = getattr(cov_matrix, 'columns', None)
+    if columns is not None:
+        return pd.DataFrame(cov, index=columns, columns=columns)
+    return cov
+
+def ledoit_wolf_covariance(returns, target='identity', return_shrinkage=False):
+    """
+    Ledoit-Wolf shrinkage estimator: delta * F + (1 - delta) * S, with the shrinkage
+    intensity delta estimated from the data.
+    target 'identity' uses F = mean variance * I (Ledoit & Wolf 2004); 'constant_correlation'
+    keeps the sample variances and sets every correlation to the average one (Ledoit & Wolf 2003).
+    Scaled to the same n - 1 normalization as returns.cov().
+    """
+    X = _returns_matrix(returns)
+    X = X - X.mean(axis=0, dtype=float).astype(X.dtype)
+    t, n = X.shape
+    S = (X.T @ X).astype(float) / t
+
+    if target == 'identity':
+        mu = np.trace(S) / n
+        F = mu * np.eye(n)
+        d2 = np.sum((S - F) ** 2)
+        # sum_t ||x_t x_t' - S||^2 = sum_t ||x_t||^4 - T ||S||^2
+        b2_bar = (np.sum(np.sum(X ** 2, axis=1) ** 2) / t - np.sum(S ** 2)) / t
+        shrinkage = min(b2_bar, d2) / d2 if d2 > 0 else 1.0
+    elif target == 'constant_correlation':
+        var = np.diag(S)
+        std = np.sqrt(var)
+        corr = S / np.outer(std, std)
+        r_bar = (corr.sum() - n) / (n * (n - 1))
+        F = r_bar * np.outer(std, std)
+        np.fill_diagonal(F, var)
+
+        X2 = X ** 2
+        pi_mat = X2.T @ X2 / t - S ** 2
+        pi_hat = pi_mat.sum()
+        theta = (X ** 3).T @ X / t - var[:, np.newaxis] * S
+        # ratio[i, j] = sqrt(var_j / var_i) weights theta[i, j] (covCor.m); the sum over
+        # both triangles is halved again by r_bar / 2 below
+        ratio = std[np.newaxis, :] / std[:, np.newaxis]
+        off_diag = ratio * theta + (ratio * theta).T
+        np.fill_diagonal(off_diag, 0.0)
+        rho_hat = np.trace(pi_mat) + r_bar / 2 * off_diag.sum()
+        gamma_hat = np.sum((F - S) ** 2)
+        kappa = (pi_hat - rho_hat) / gamma_hat if gamma_hat > 0 else 0.0
+        shrinkage = max(0.0, min(1.0, kappa / t))
+    else:
+        raise ValueError(f"Unknown shrinkage target: {target}")
+
+    shrunk = (shrinkage * F + (1 - shrinkage) * S) * t / (t - 1)
+    if isinstance(returns, (pd.DataFrame, ReturnsPanel)):
+        shrunk = pd.DataFrame(shrunk, index=returns.columns, columns=returns.columns)
+    return (shrunk, shrinkage) if return_shrinkage else shrunk
+
+def correlation_from_covariance(cov_matrix):
+    """
+    Correlation matrix derived from an already estimated covariance matrix (any estimator,
+    including a FactorCovariance), without another pass over the returns.
+    Assets with zero variance get NaN correlations.
+    """
+    cov = np.asarray(cov_matrix, dtype=float)
+    std = np.sqrt(np.diag(cov))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = np.clip(cov / np.outer(std, std), -1.0, 1.0)
+    np.fill_diagonal(corr, np.where(std > 0, 1.0, np.nan))
+
+    columns = getattr(cov_matrix, 'columns', None)
+    if columns is not None:
+        return pd.DataFrame(corr, index=columns, columns=columns)
+    return corr
+
+def cluster_order(correlation_matrix):
+    """
+    Leaf order of an average-linkage hierarchical clustering on the correlation distance
+    sqrt((1 - rho) / 2), so correlated assets end up next to each other (e.g. to reorder a
+    heatmap). NaN correlations count as zero.
+
+    Each merge updates the distance matrix with the Lance-Williams rule and keeps a
+    per-row nearest neighbour, so only rows whose neighbour was merged are rescanned.
+    """
+    corr = np.nan_to_num(np.asarray(correlation_matrix, dtype=float))
+    n = len(corr)
+    if n <= 2:
+        return np.arange(n)
+
+    dist = np.sqrt(np.clip((1 - corr) / 2, 0.0, 1.0))
+    np.fill_diagonal(dist, np.inf)
+    sizes = np.ones(n)
+    leaves = {i: [i] for i in range(n)}
+    nearest = dist.argmin(axis=1)
+    nearest_dist = dist[np.arange(n), nearest]
+
+    for _ in range(n - 1):
+        i = int(np.argmin(nearest_dist))
+        j = int(nearest[i])
+        # Merge cluster j into i
+        merged = (dist[i] * sizes[i] + dist[j] * sizes[j]) / (sizes[i] + sizes[j])
+        dist[i, :] = merged
+        dist[:, i] = merged
+        dist[i, i] = np.inf
+        dist[j, :] = np.inf
+        dist[:, j] = np.inf
+        sizes[i] += sizes[j]
+        leaves[i] = leaves[i] + leaves.pop(j)
+        nearest_dist[j] = np.inf
+
+        # An average of two distances is never below either, so only rows that pointed
+        # at i or j (and i itself) can have a new nearest neighbour
+        stale = np.flatnonzero((nearest == i) | (nearest == j))
+        stale = stale[stale != j]
+        stale = np.union1d(stale, [i])
+        nearest[stale] = dist[stale].argmin(axis=1)
+        nearest_dist[stale] = dist[stale, nearest[stale]]
+
+    return np.array(leaves[i])
+
+class FactorCovariance:
+    """
+    Low-rank covariance B B' + diag(d) stored as (assets, k) loadings B and specific
+    variances d. Portfolio variance costs O(assets * k) and the dense assets x assets
+    matrix is only built if a caller converts it with np.asarray().
+    """
+
+    def __init__(self, loadings, specific_variance, columns=None):
+        self.loadings = np.asarray(loadings, dtype=float)
+        self.specific_variance = np.asarray(specific_variance, dtype=float)
+        self.columns = list(columns) if columns is not None else None
+
+    @classmethod
+    def from_returns(cls, returns, num_factors=5):
+        """
+        Fits a PCA factor model from the SVD of the demeaned returns (no n x n matrix).
+        """
+        X = _returns_matrix(returns)
+        X = X - X.mean(axis=0, dtype=float).astype(X.dtype)
+        t, n = X.shape
+        k = min(num_factors, n, t - 1)
+        _, singular_values, vt = np.linalg.svd(X, full_matrices=False)
+        loadings = vt[:k].T * (singular_values[:k] / np.sqrt(t - 1))
+        total_variance = np.sum(X ** 2, axis=0, dtype=float) / (t - 1)
+        # Keep a small floor so the model stays positive definite
+        specific = np.maximum(total_variance - np.sum(loadings ** 2, axis=1), 1e-4 * total_variance.mean())
+        columns = returns.columns if isinstance(returns, (pd.DataFrame, ReturnsPanel)) else None
+        return cls(loadings, specific, columns)
 
+    @property
+    def shape(self):
+        n = len(self.specific_variance)
+        return (n, n)
+
+    def portfolio_variance(self, weights):
+        """
+        w' (B B' + D) w for a weight vector, or row-wise for a (P, assets) matrix.
+        """
+        W = np.asarray(weights, dtype=float)
+        exposures = W @ self.loadings
+        return np.sum(exposures ** 2, axis=-1) + (W ** 2) @ self.specific_variance
+
+    def dot(self, weights):
+        """
+        (B B' + D) w without forming the dense matrix.
+        """
+        weights = np.asarray(weights, dtype=float)
+        return self.loadings @ (self.loadings.T @ weights) + self.specific_variance * weights
+
+    def to_dense(self):
+        dense = self.loadings @ self.loadings.T + np.diag(self.specific_variance)
+        if self.columns is not None:
+            return pd.DataFrame(dense, index=self.columns, columns=self.columns)
+        return dense
+
+    def __array__(self, dtype=None, copy=None):
+        dense = np.asarray(self.to_dense())
+        return dense if dtype is None else dense.astype(dtype)
+
+@ins.instrument()
 def calculate_portfolio_performance(weights, mean_returns, cov_matrix, risk_free_rate=0.0):
     """
     Calculates the expected annual return, annual volatility, and Sharpe ratio of the portfolio.
@@ -20,7 +323,10 @@ def calculate_portfolio_performance(weights, mean_returns, cov_matrix, risk_free
     """
     weights = np.array(weights)
     returns = np.sum(mean_returns * weights) * 252
-    volatility = np.sqrt(np.dot(weights.T, np.dot(cov_matrix * 252, weights)))
+    if isinstance(cov_matrix, FactorCovariance):
+        volatility = np.sqrt(cov_matrix.portfolio_variance(weights) * 252)
+    else:
+        volatility = np.sqrt(np.dot(weights.T, np.dot(cov_matrix * 252, weights)))
     
     sharpe_ratio = 0
     if volatility > 0:
@@ -28,30 +334,453 @@ def calculate_portfolio_performance(weights, mean_returns, cov_matrix, risk_free
         
     return returns, volatility, sharpe_ratio
 
-def simulate_efficient_frontier(mean_returns, cov_matrix, num_portfolios=5000, risk_free_rate=0.0):
+class StreamingCovariance:
+    """
+    Online estimator of mean returns, covariance and correlation (Welford / Chan update).
+
+    Rows of returns are folded in with update(); each new day costs O(assets^2) instead
+    of a pass over the full history. With decay (e.g. 0.97) older observations are
+    down-weighted exponentially. Partial estimators built on separate chunks or workers
+    can be combined with merge(). Rows containing NaNs are skipped, like dropna().
+
+    With unit weights the results match returns.mean() / returns.cov() / returns.corr().
+    """
+
+    def __init__(self, num_assets=None, columns=None, decay=None):
+        if num_assets is None:
+            num_assets = len(columns)
+        self.columns = list(columns) if columns is not None else None
+        self.decay = decay
+        self.count = 0
+        self.weight = 0.0
+        self.weight_sq = 0.0
+        self._mean = np.zeros(num_assets)
+        self._comoment = np.zeros((num_assets, num_assets))
+
+    @classmethod
+    @ins.instrument('metrics.StreamingCovariance.from_returns')
+    def from_returns(cls, returns, decay=None):
+        """
+        Builds an estimator from a returns DataFrame (or 2-D array) in one batch update.
+        A ReturnsPanel is folded in block by block.
+        """
+        if isinstance(returns, ReturnsPanel):
+            estimator = cls(columns=returns.columns, decay=decay)
+            for block in returns.blocks():
+                estimator.update(block)
+            return estimator
+        columns = returns.columns if isinstance(returns, pd.DataFrame) else None
+        estimator = cls(np.shape(returns)[1], columns=columns, decay=decay)
+        estimator.update(returns)
+        return estimator
+
+    def _combine(self, weight, weight_sq, mean, comoment):
+        total = self.weight + weight
+        if total == 0:
+            return
+        delta = mean - self._mean
+        self._comoment += comoment + np.outer(delta, delta) * (self.weight * weight / total)
+        self._mean += delta * (weight / total)
+        self.weight = total
+        self.weight_sq += weight_sq
+
+    def _decay_existing(self, num_rows):
+        factor = self.decay ** num_rows
+        self.weight *= factor
+        self.weight_sq *= factor ** 2
+        self._comoment *= factor
+
+    def update(self, rows):
+        """
+        Adds one row (assets,) or a block of rows (k, assets) of returns, oldest first.
+        """
+        rows = np.atleast_2d(np.asarray(rows, dtype=float))
+        rows = rows[~np.isnan(rows).any(axis=1)]
+        k = len(rows)
+        if k == 0:
+            return self
+
+        if self.decay is None:
+            w = np.ones(k)
+        else:
+            # Newest row has weight 1, the one before decay, and so on
+            w = self.decay ** np.arange(k - 1, -1, -1)
+            self._decay_existing(k)
+
+        weight = w.sum()
+        mean = w @ rows / weight
+        centered = rows - mean
+        comoment = (centered * w[:, np.newaxis]).T @ centered
+
+        self._combine(weight, (w ** 2).sum(), mean, comoment)
+        self.count += k
+        return self
+
+    def merge(self, other):
+        """
+        Folds another estimator over the same assets into this one.
+        With decay, other must hold the later observations.
+        """
+        if self.decay is not None:
+            self._decay_existing(other.count)
+        self._combine(other.weight, other.weight_sq, other._mean, other._comoment)
+        self.count += other.count
+        return self
+
+    def _label(self, values):
+        if self.columns is None:
+            return values
+        if values.ndim == 1:
+            return pd.Series(values, index=self.columns)
+        return pd.DataFrame(values, index=self.columns, columns=self.columns)
+
+    @property
+    def mean(self):
+        return self._label(self._mean.copy())
+
+    @property
+    def cov(self):
+        # Unbiased (reliability-weighted) normalization, n - 1 for unit weights
+        denom = self.weight - self.weight_sq / self.weight if self.weight > 0 else 0.0
+        values = self._comoment / denom if denom > 0 else np.full_like(self._comoment, np.nan)
+        return self._label(values)
+
+    @property
+    def corr(self):
+        cov = np.asarray(self.cov)
+        std = np.sqrt(np.diag(cov))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = cov / np.outer(std, std)
+        return self._label(values)
+
+class ReturnsPanel:
+    """
+    Compact returns panel: one contiguous (days, assets) matrix, float32 by default, with
+    the dates and tickers kept as separate indexes.
+
+    With path the matrix is an np.memmap backed .npy file (labels go to <path>.labels.npz),
+    so a 5,000 ticker x 25 year panel (about 630 MB as float32) need not fit in memory and
+    can be reopened with ReturnsPanel.open(). Statistics are accumulated in float64 over row
+    blocks. The covariance estimators, StreamingCovariance.from_returns, evaluate_portfolios
+    and calculate_rolling_metrics accept a panel in place of a returns DataFrame, and
+    mean() / cov() / panel[ticker] mirror the DataFrame API.
+    """
+
+    def __init__(self, values, index, columns):
+        self.values = values
+        self.index = pd.Index(index)
+        self.columns = pd.Index(columns)
+
+    @staticmethod
+    def _allocate(shape, dtype, path):
+        if path is None:
+            return np.empty(shape, dtype=dtype)
+        return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+
+    @staticmethod
+    def _labels_path(path):
+        return f"{path}.labels.npz"
+
+    def _finish(self, path):
+        if path is not None:
+            self.values.flush()
+            index = self.index.to_numpy()
+            np.savez(self._labels_path(path), index=index if index.dtype != object else index.astype(str),
+                     columns=self.columns.to_numpy().astype(str))
+        return self
+
+    @classmethod
+    def from_returns(cls, returns, dtype=np.float32, path=None, block_columns=512):
+        """
+        Packs a returns DataFrame, copying a block of columns at a time.
+        """
+        values = cls._allocate(returns.shape, dtype, path)
+        for start in range(0, returns.shape[1], block_columns):
+            values[:, start:start + block_columns] = returns.iloc[:, start:start + block_columns].to_numpy(dtype=float)
+        return cls(values, returns.index, returns.columns)._finish(path)
+
+    @classmethod
+    def from_prices(cls, prices, dtype=np.float32, path=None, block_columns=512):
+        """
+        Log returns of a price DataFrame written straight into the compact matrix, a block
+        of columns at a time. Rows with a missing price are dropped as in calculate_log_returns.
+        """
+        num_rows, num_columns = prices.shape
+        complete = np.ones(num_rows, dtype=bool)
+        for start in range(0, num_columns, block_columns):
+            complete &= prices.iloc[:, start:start + block_columns].notna().to_numpy().all(axis=1)
+        keep = complete[1:] & complete[:-1]
+
+        values = cls._allocate((int(keep.sum()), num_columns), dtype, path)
+        for start in range(0, num_columns, block_columns):
+            block = prices.iloc[:, start:start + block_columns].to_numpy(dtype=float)
+            values[:, start:start + block_columns] = np.log(block[1:] / block[:-1])[keep]
+        return cls(values, prices.index[1:][keep], prices.columns)._finish(path)
+
+    @classmethod
+    def open(cls, path, mode='r'):
+        """
+        Reopens a panel saved with path=..., memory-mapping the matrix.
+        """
+        labels = np.load(cls._labels_path(path))
+        return cls(np.load(path, mmap_mode=mode), labels['index'], labels['columns'])
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def dtype(self):
+        return self.values.dtype
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    def __len__(self):
+        return len(self.values)
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.values, dtype=dtype)
+
+    def __getitem__(self, ticker):
+        return pd.Series(self.values[:, self.columns.get_loc(ticker)].astype(float), index=self.index, name=ticker)
+
+    def blocks(self, block_rows=4096):
+        """
+        Yields consecutive float64 row blocks.
+        """
+        for start in range(0, len(self.values), block_rows):
+            yield np.asarray(self.values[start:start + block_rows], dtype=float)
+
+    @staticmethod
+    def _positions(labels, wanted):
+        positions = labels.get_indexer(wanted)
+        if (positions < 0).any():
+            raise KeyError(f"Labels not in panel: {list(pd.Index(wanted)[positions < 0])}")
+        return positions
+
+    def select(self, index=None, columns=None):
+        """
+        In-memory panel with the given dates and / or tickers (labels, in the given order).
+        """
+        rows = slice(None) if index is None else self._positions(self.index, index)
+        cols = slice(None) if columns is None else self._positions(self.columns, columns)
+        if index is not None and columns is not None:
+            values = self.values[np.ix_(rows, cols)]
+        else:
+            values = np.ascontiguousarray(self.values[rows][:, cols])
+        return ReturnsPanel(values, self.index if index is None else index,
+                            self.columns if columns is None else columns)
+
+    def mean(self):
+        return pd.Series(self.values.mean(axis=0, dtype=float), index=self.columns)
+
+    def cov(self):
+        return StreamingCovariance.from_returns(self).cov
+
+    def corr(self):
+        return StreamingCovariance.from_returns(self).corr
+
+    def dot(self, weights):
+        """
+        Daily portfolio returns for a weight vector, as a float64 Series.
+        """
+        weights = np.asarray(weights, dtype=float)
+        return pd.Series(np.concatenate([block @ weights for block in self.blocks()]), index=self.index)
+
+    def to_frame(self):
+        return pd.DataFrame(np.asarray(self.values, dtype=float), index=self.index, columns=self.columns)
+
+def _batch_portfolio_performance(weights, mean_returns, cov_matrix, risk_free_rate=0.0):
+    """
+    Vectorized version of calculate_portfolio_performance for a (N, assets) weights matrix.
+    Returns arrays of annual returns, annual volatilities and Sharpe ratios.
+    """
+    mu = np.asarray(mean_returns, dtype=float)
+
+    returns = weights @ mu * 252
+    if isinstance(cov_matrix, FactorCovariance):
+        variances = cov_matrix.portfolio_variance(weights) * 252
+    else:
+        # Row-wise w^T C w without building the N x N product
+        cov = np.asarray(cov_matrix, dtype=float)
+        variances = np.einsum('ij,ij->i', weights @ cov, weights) * 252
+    volatility = np.sqrt(np.maximum(variances, 0.0))
+
+    sharpe_ratio = np.zeros_like(volatility)
+    positive = volatility > 0
+    sharpe_ratio[positive] = (returns[positive] - risk_free_rate) / volatility[positive]
+
+    return returns, volatility, sharpe_ratio
+
+@ins.instrument()
+def simulate_efficient_frontier(mean_returns, cov_matrix, num_portfolios=5000, risk_free_rate=0.0,
+                                chunk_size=100000, return_weights=True):
     """
     Simulates random portfolios to visualize the efficient frontier.
-    Returns a DataFrame with returns, volatility, sharpe ratio, and weights.
+    Returns a [returns, volatility, sharpe ratio] array and the weights record.
+
+    Weights are drawn and evaluated in (chunk_size, assets) blocks so very large
+    runs stream through bounded memory. The weights record is a (num_portfolios, assets)
+    array (one row per portfolio), or None when return_weights is False.
     """
     results = np.zeros((3, num_portfolios))
-    weights_record = []
     num_assets = len(mean_returns)
-    
-    for i in range(num_portfolios):
-        weights = np.random.random(num_assets)
-        weights /= np.sum(weights)
-        weights_record.append(weights)
-        
-        portfolio_return, portfolio_volatility, portfolio_sharpe = calculate_portfolio_performance(
+    weights_record = np.empty((num_portfolios, num_assets)) if return_weights else None
+    chunk_size = max(1, int(chunk_size or num_portfolios))
+
+    for start in range(0, num_portfolios, chunk_size):
+        stop = min(start + chunk_size, num_portfolios)
+
+        # Same draw order as one np.random.random(num_assets) call per portfolio
+        weights = np.random.random((stop - start, num_assets))
+        weights /= weights.sum(axis=1, keepdims=True)
+        if return_weights:
+            weights_record[start:stop] = weights
+
+        results[0, start:stop], results[1, start:stop], results[2, start:stop] = _batch_portfolio_performance(
             weights, mean_returns, cov_matrix, risk_free_rate
         )
-        
-        results[0,i] = portfolio_return
-        results[1,i] = portfolio_volatility
-        results[2,i] = portfolio_sharpe
-        
+
     return results, weights_record
 
+def _solve_long_only_qp(cov, A, b, w0, tol=1e-12, max_iter=None):
+    """
+    Primal active-set solver for: min w' C w  s.t.  A w = b, w >= 0.
+    w0 must be a feasible starting point; its zero entries form the initial working set.
+    """
+    n = len(w0)
+    w = np.array(w0, dtype=float)
+    active = w <= tol
+    w[active] = 0.0
+    m = A.shape[0]
+    max_iter = max_iter or 10 * n + 50
+
+    for _ in range(max_iter):
+        free = ~active
+        C_ff = cov[np.ix_(free, free)]
+        A_f = A[:, free]
+        k = C_ff.shape[0]
+
+        # KKT system of the equality-constrained subproblem on the free set
+        kkt = np.zeros((k + m, k + m))
+        kkt[:k, :k] = C_ff
+        kkt[:k, k:] = -A_f.T
+        kkt[k:, :k] = A_f
+        rhs = np.concatenate([np.zeros(k), b])
+        try:
+            sol = np.linalg.solve(kkt, rhs)
+            if not np.allclose(kkt @ sol, rhs):
+                raise np.linalg.LinAlgError
+        except np.linalg.LinAlgError:
+            # Degenerate free set (e.g. a single asset left): least-squares solution
+            sol = np.linalg.lstsq(kkt, rhs, rcond=None)[0]
+        target = np.zeros(n)
+        target[free] = sol[:k]
+        lam = sol[k:]
+        step = target - w
+
+        if np.max(np.abs(step)) <= 1e-10:
+            # Bound multipliers: nu = C w - A' lam must be >= 0 on the working set
+            nu = cov @ w - A.T @ lam
+            nu[free] = np.inf
+            release = np.argmin(nu)
+            if nu[release] >= -tol:
+                break
+            active[release] = False
+            continue
+
+        # Longest feasible step towards the subproblem optimum
+        blocking = free & (step < -tol)
+        alpha = 1.0
+        blocker = None
+        if blocking.any():
+            ratios = -w[blocking] / step[blocking]
+            idx = np.argmin(ratios)
+            if ratios[idx] < 1.0:
+                alpha = ratios[idx]
+                blocker = np.flatnonzero(blocking)[idx]
+
+        w = w + alpha * step
+        if blocker is not None:
+            w[blocker] = 0.0
+            active[blocker] = True
+
+    return np.maximum(w, 0.0)
+
+def _portfolio_point(weights, mu, cov, risk_free_rate):
+    """
+    Annualized return / volatility / Sharpe of a single weight vector as a dict.
+    """
+    ret, vol, sharpe = calculate_portfolio_performance(weights, mu, cov, risk_free_rate)
+    return {'return': ret, 'volatility': vol, 'sharpe': sharpe, 'weights': weights}
+
+@ins.instrument()
+def solve_efficient_frontier(mean_returns, cov_matrix, num_points=50, risk_free_rate=0.0):
+    """
+    Computes the exact long-only efficient frontier by minimum-variance optimization
+    at num_points target returns between the minimum-variance portfolio and the
+    highest-returning asset.
+
+    Returns a dict with:
+        'results': [returns, volatilities, sharpe_ratios] array of the frontier curve
+        'weights': (num_points, assets) array of frontier weights
+        'min_variance': dict(return, volatility, sharpe, weights) of the global minimum-variance portfolio
+        'max_sharpe': dict(return, volatility, sharpe, weights) of the tangency portfolio
+    """
+    mu = np.asarray(mean_returns, dtype=float)
+    cov = np.asarray(cov_matrix, dtype=float)
+    num_assets = len(mu)
+    ones = np.ones((1, num_assets))
+
+    # Global minimum variance: only the budget constraint
+    start = np.zeros(num_assets)
+    start[np.argmin(np.diag(cov))] = 1.0
+    w_gmv = _solve_long_only_qp(cov, ones, np.array([1.0]), start)
+
+    # Frontier: sweep target returns upwards, warm-starting each solve by blending
+    # the previous solution with the highest-returning asset (always feasible)
+    top = np.argmax(mu)
+    gmv_return = float(mu @ w_gmv)
+    targets = np.linspace(gmv_return, mu[top], num_points)
+    A = np.vstack([ones, mu])
+    weights_record = np.zeros((num_points, num_assets))
+    w_prev = w_gmv
+
+    for i, target in enumerate(targets):
+        prev_return = float(mu @ w_prev)
+        if mu[top] - prev_return > 1e-15:
+            t = np.clip((target - prev_return) / (mu[top] - prev_return), 0.0, 1.0)
+            start = (1 - t) * w_prev
+            start[top] += t
+        else:
+            start = w_prev
+        w_prev = _solve_long_only_qp(cov, A, np.array([1.0, target]), start)
+        weights_record[i] = w_prev
+
+    results = np.vstack(_batch_portfolio_performance(weights_record, mu, cov, risk_free_rate))
+
+    # Tangency portfolio: min y' C y  s.t. (mu - rf)' y = 1, y >= 0, then w = y / sum(y)
+    excess = mu - risk_free_rate / 252
+    best = np.argmax(excess)
+    if excess[best] > 0:
+        start = np.zeros(num_assets)
+        start[best] = 1.0 / excess[best]
+        y = _solve_long_only_qp(cov, excess[np.newaxis, :], np.array([1.0]), start)
+        w_tangency = y / y.sum()
+    else:
+        # No asset beats the risk-free rate: fall back to the best point on the curve
+        w_tangency = weights_record[np.argmax(results[2])]
+
+    return {
+        'results': results,
+        'weights': weights_record,
+        'min_variance': _portfolio_point(w_gmv, mu, cov, risk_free_rate),
+        'max_sharpe': _portfolio_point(w_tangency, mu, cov, risk_free_rate),
+    }
+
+@ins.instrument()
 def calculate_beta(portfolio_returns, benchmark_returns):
     """
     Calculates the Beta of the portfolio relative to the benchmark.
@@ -71,6 +800,71 @@ def calculate_beta(portfolio_returns, benchmark_returns):
     
     return beta
 
+def _rolling_sum(values, window):
+    """
+    Trailing window sums along axis 0 via cumulative sums; the first window-1 rows are NaN
+    (all of them when there are fewer rows than window, like pandas .rolling()).
+    """
+    sums = np.full(values.shape, np.nan)
+    if len(values) < window:
+        return sums
+    cumulative = np.cumsum(values, axis=0)
+    sums[window - 1] = cumulative[window - 1]
+    sums[window:] = cumulative[window:] - cumulative[:-window]
+    return sums
+
+@ins.instrument()
+def calculate_rolling_metrics(returns, benchmark_returns, window=63, risk_free_rate=0.0):
+    """
+    Calculates rolling annualized volatility, Sharpe ratio, beta and correlation to the
+    benchmark over trailing windows of daily log returns (e.g. from calculate_log_returns).
+
+    All assets and windows are computed at once from cumulative sums of x, x^2 and x*b,
+    so the cost is O(days * assets) regardless of the window length.
+    returns may be a Series (one portfolio), a DataFrame or a ReturnsPanel (one column per asset).
+
+    Returns:
+        dict: 'volatility', 'sharpe', 'beta', 'correlation' -> Series/DataFrame aligned to the dates
+    """
+    is_series = isinstance(returns, pd.Series)
+    frame = returns.to_frame() if is_series else returns
+
+    # Align the series to ensure we are comparing same dates
+    common_index = frame.index.intersection(benchmark_returns.index)
+    if isinstance(frame, ReturnsPanel):
+        frame = frame.select(index=common_index) if len(common_index) != len(frame) else frame
+    else:
+        frame = frame.loc[common_index]
+    bench = benchmark_returns.loc[common_index].to_numpy(dtype=float)
+
+    # Demeaning first keeps the cumulative sums small and the variances accurate
+    x = np.asarray(frame, dtype=float)
+    x_mean = x.mean(axis=0)
+    b_mean = bench.mean()
+    x = x - x_mean
+    b = (bench - b_mean)[:, np.newaxis]
+
+    sum_x = _rolling_sum(x, window)
+    sum_b = _rolling_sum(b, window)
+    var_x = (_rolling_sum(x * x, window) - sum_x ** 2 / window) / (window - 1)
+    var_b = (_rolling_sum(b * b, window) - sum_b ** 2 / window) / (window - 1)
+    cov_xb = (_rolling_sum(x * b, window) - sum_x * sum_b / window) / (window - 1)
+    var_x = np.maximum(var_x, 0.0)
+    var_b = np.maximum(var_b, 0.0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        volatility = np.sqrt(var_x * 252)
+        annual_return = (sum_x / window + x_mean) * 252
+        sharpe = (annual_return - risk_free_rate) / volatility
+        beta = cov_xb / var_b
+        correlation = cov_xb / np.sqrt(var_x * var_b)
+
+    results = {}
+    for name, values in [('volatility', volatility), ('sharpe', sharpe), ('beta', beta), ('correlation', correlation)]:
+        df = pd.DataFrame(values, index=frame.index, columns=frame.columns)
+        results[name] = df.iloc[:, 0].rename(name) if is_series else df
+    return results
+
 def calculate_alpha(portfolio_return, benchmark_return, beta, risk_free_rate=0.0):
     """
     Calculates Jensen's Alpha.
@@ -81,6 +875,75 @@ def calculate_alpha(portfolio_return, benchmark_return, beta, risk_free_rate=0.0
     alpha = portfolio_return - expected_return
     return alpha
 
+@ins.instrument()
+def evaluate_portfolios(weights, returns, benchmark_returns, risk_free_rate=0.0, mean_returns=None, cov_matrix=None):
+    """
+    Evaluates many portfolios at once on a shared returns panel.
+
+    weights: (P, assets) array, one portfolio per row, columns in the order of returns
+    returns: (days, assets) DataFrame, ReturnsPanel or array of daily log returns
+    benchmark_returns: Series or array of daily benchmark log returns
+    mean_returns, cov_matrix: optional precomputed daily statistics of returns
+
+    Beta and tracking error use the asset-benchmark covariance vector, so every
+    portfolio statistic is a matrix product instead of a per-portfolio np.cov.
+    Returns a DataFrame with return, volatility, sharpe, beta, alpha and tracking_error
+    (all annualized, 252 trading days) for each portfolio.
+    """
+    if isinstance(returns, (pd.DataFrame, ReturnsPanel)) and isinstance(benchmark_returns, pd.Series):
+        # Align the panel and benchmark once for all portfolios
+        common_index = returns.index.intersection(benchmark_returns.index)
+        if len(common_index) != len(returns) or len(common_index) != len(benchmark_returns):
+            if isinstance(returns, ReturnsPanel):
+                returns = returns.select(index=common_index)
+            else:
+                returns = returns.loc[common_index]
+            benchmark_returns = benchmark_returns.loc[common_index]
+            mean_returns = cov_matrix = None
+
+    R = _returns_matrix(returns)
+    b = np.asarray(benchmark_returns, dtype=float)
+    W = np.atleast_2d(np.asarray(weights, dtype=float))
+    num_days = R.shape[0]
+
+    mu = R.mean(axis=0, dtype=float) if mean_returns is None else np.asarray(mean_returns, dtype=float)
+    if cov_matrix is not None:
+        cov = np.asarray(cov_matrix, dtype=float)
+    elif isinstance(returns, ReturnsPanel):
+        cov = np.asarray(returns.cov())
+    else:
+        cov = np.cov(R, rowvar=False)
+    cov = np.atleast_2d(cov)
+
+    port_return, port_vol, port_sharpe = _batch_portfolio_performance(W, mu, cov, risk_free_rate)
+
+    # Asset-benchmark covariances, one pass over the panel (b_centered sums to zero,
+    # so the asset returns need no demeaning copy)
+    b_centered = b - b.mean()
+    asset_bench_cov = (R.T @ b_centered.astype(R.dtype)).astype(float) / (num_days - 1)
+    bench_var = b_centered @ b_centered / (num_days - 1)
+
+    port_bench_cov = W @ asset_bench_cov
+    beta = port_bench_cov / bench_var
+
+    bench_annual_return = b.mean() * 252
+    alpha = port_return - (risk_free_rate + beta * (bench_annual_return - risk_free_rate))
+
+    # Var(R w - b) = w' C w - 2 w' c + Var(b)
+    port_var_daily = port_vol ** 2 / 252
+    active_var = np.maximum(port_var_daily - 2 * port_bench_cov + bench_var, 0.0)
+    tracking_error = np.sqrt(active_var * 252)
+
+    return pd.DataFrame({
+        'return': port_return,
+        'volatility': port_vol,
+        'sharpe': port_sharpe,
+        'beta': beta,
+        'alpha': alpha,
+        'tracking_error': tracking_error,
+    })
+
+@ins.instrument()
 def run_monte_carlo_simulation(weights, mean_returns, cov_matrix, years=5, num_simulations=1000, initial_investment=10000):
     """
     Runs a Monte Carlo simulation using Geometric Brownian Motion.
@@ -111,3 +974,182 @@ def run_monte_carlo_simulation(weights, mean_returns, cov_matrix, years=5, num_s
         simulation_data[t] = simulation_data[t-1] * np.exp(drift + shock)
         
     return pd.DataFrame(simulation_data)
+
+def _cholesky_factor(cov_matrix):
+    """
+    Returns a lower-triangular factor L with L L' = cov_matrix.
+    Falls back to a clipped eigendecomposition when the matrix is only positive semi-definite.
+    """
+    cov = np.asarray(cov_matrix, dtype=float)
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        eigvals, eigvecs = np.linalg.eigh(cov)
+        return eigvecs * np.sqrt(np.clip(eigvals, 0.0, None))
+
+class PercentileReducer:
+    """
+    Streaming per-day percentile estimator for Monte Carlo output.
+
+    Feed (num_days, n_sims) chunks to update(). Simulations are kept (as float32) and
+    reduced exactly while they fit in exact_limit_mb; beyond that the reducer switches to a
+    per-day log-spaced histogram sketch with about relative_accuracy relative error, so
+    memory no longer grows with the number of simulations.
+    """
+
+    def __init__(self, num_days, percentiles=(5, 50, 95), exact_limit_mb=64, relative_accuracy=0.005):
+        self.num_days = num_days
+        self.percentiles = tuple(percentiles)
+        self.exact_limit = max(1, int(exact_limit_mb * 2**20 // (4 * num_days)))
+        self.bucket_width = np.log1p(2 * relative_accuracy)
+        self.count = 0
+        self._buffer = []
+        self._counts = None
+        self._log_low = None
+
+    def update(self, chunk):
+        """
+        Adds a (num_days, n_sims) block of simulated values.
+        """
+        chunk = np.asarray(chunk)
+        self.count += chunk.shape[1]
+
+        if self._counts is None and self.count <= self.exact_limit:
+            self._buffer.append(chunk.astype(np.float32))
+            return
+        if self._counts is None:
+            self._start_sketch(chunk)
+        self._add_to_sketch(chunk)
+
+    def _start_sketch(self, chunk):
+        tiny = np.finfo(np.float32).tiny
+        blocks = self._buffer + [chunk]
+        low = np.log(max(min(float(b.min()) for b in blocks), tiny))
+        high = np.log(max(max(float(b.max()) for b in blocks), tiny))
+        # Leave room for later chunks to land outside the range seen so far
+        margin = max(high - low, 1.0)
+        self._log_low = low - margin
+        num_buckets = int(np.ceil((high - low + 2 * margin) / self.bucket_width)) + 1
+        self._counts = np.zeros((self.num_days, num_buckets), dtype=np.int64)
+        # Fold the exact buffer in block by block, releasing each block as it goes
+        while self._buffer:
+            self._add_to_sketch(self._buffer.pop())
+
+    def _add_to_sketch(self, chunk):
+        # Column slices of about 256k values keep the temporary bucket arrays small
+        width = max(1, 2**18 // self.num_days)
+        for start in range(0, chunk.shape[1], width):
+            logs = np.log(np.maximum(chunk[:, start:start + width], np.finfo(np.float32).tiny))
+            buckets = np.floor((logs - self._log_low) / self.bucket_width).astype(np.int32)
+            del logs
+
+            # Grow the histogram (by whole buckets, so existing counts keep their edges)
+            # when a slice lands outside the range covered so far
+            below = max(0, -int(buckets.min()))
+            above = max(0, int(buckets.max()) + 1 - self._counts.shape[1])
+            if below or above:
+                self._counts = np.pad(self._counts, ((0, 0), (below, above)))
+                self._log_low -= below * self.bucket_width
+                buckets += below
+
+            num_buckets = self._counts.shape[1]
+            index_dtype = np.int32 if self._counts.size < 2**31 else np.int64
+            buckets = buckets.astype(index_dtype, copy=False)
+            buckets += np.arange(self.num_days, dtype=index_dtype)[:, np.newaxis] * num_buckets
+            self._counts += np.bincount(buckets.ravel(), minlength=self._counts.size).reshape(self._counts.shape)
+
+    def result(self):
+        """
+        Returns the bands as a DataFrame indexed by day with one column per percentile.
+        """
+        if self._counts is None:
+            values = np.hstack(self._buffer) if self._buffer else np.full((self.num_days, 1), np.nan)
+            bands = np.percentile(values, self.percentiles, axis=1).T
+        else:
+            cumulative = np.cumsum(self._counts, axis=1)
+            bands = np.empty((self.num_days, len(self.percentiles)))
+            for j, q in enumerate(self.percentiles):
+                rank = q / 100 * self.count
+                idx = (cumulative < rank).sum(axis=1)
+                bands[:, j] = np.exp(self._log_low + (idx + 0.5) * self.bucket_width)
+        return pd.DataFrame(bands, columns=list(self.percentiles))
+
+@ins.instrument()
+def run_multi_asset_monte_carlo(weights, mean_returns, cov_matrix, years=5, num_simulations=1000,
+                                initial_investment=10000, output='paths', percentiles=(5, 50, 95),
+                                chunk_size=10000, max_block_mb=64, seed=42):
+    """
+    Runs a buy-and-hold Monte Carlo simulation at asset level.
+    Daily asset log returns are drawn as mean_returns + L z, where L is the Cholesky factor
+    of cov_matrix, and accumulated with a cumulative sum and exp over blocks of days.
+
+    Simulations are processed in chunks of chunk_size paths and each chunk in day blocks of
+    at most max_block_mb of shocks, so memory stays bounded for large runs. With
+    output='percentiles' max_block_mb also bounds the exact buffer of the PercentileReducer.
+
+    output:
+        'paths'       - DataFrame (num_days, num_simulations), same layout as run_monte_carlo_simulation
+        'percentiles' - DataFrame (num_days, len(percentiles)) with one column per percentile,
+                        reduced chunk by chunk with a PercentileReducer
+        'terminal'    - ndarray of final portfolio values (num_simulations,)
+    """
+    if output not in ('paths', 'percentiles', 'terminal'):
+        raise ValueError(f"Unknown output mode: {output}")
+
+    rng = np.random.default_rng(seed)
+    weights = np.asarray(weights, dtype=float)
+    mu = np.asarray(mean_returns, dtype=float)
+    chol = _cholesky_factor(cov_matrix)
+    num_assets = len(mu)
+    num_days = years * 252
+    holdings = weights * initial_investment
+    chunk_size = max(1, min(int(chunk_size), num_simulations))
+
+    if output == 'terminal':
+        collected = np.empty(num_simulations)
+    elif output == 'percentiles':
+        reducer = PercentileReducer(num_days, percentiles, exact_limit_mb=max_block_mb)
+    else:
+        collected = np.empty((num_days, num_simulations))
+        collected[0] = initial_investment
+
+    for start in range(0, num_simulations, chunk_size):
+        stop = min(start + chunk_size, num_simulations)
+        n_sims = stop - start
+
+        if output == 'terminal':
+            # Buy-and-hold terminal value only depends on the summed log returns,
+            # which are exactly N(T * mu, T * cov) over T steps
+            steps = num_days - 1
+            log_level = steps * mu + np.sqrt(steps) * (rng.standard_normal((n_sims, num_assets)) @ chol.T)
+            collected[start:stop] = np.exp(log_level) @ holdings
+            continue
+
+        block_days = max(1, int(max_block_mb * 2**20 // (8 * n_sims * num_assets)))
+        log_level = np.zeros((n_sims, num_assets))
+        if output == 'percentiles':
+            values = np.empty((num_days, n_sims))
+            values[0] = initial_investment
+        else:
+            values = collected[:, start:stop]
+
+        for day in range(1, num_days, block_days):
+            end = min(day + block_days, num_days)
+            shocks = rng.standard_normal((n_sims * (end - day), num_assets)) @ chol.T
+            shocks = shocks.reshape(n_sims, end - day, num_assets)
+            shocks += mu
+            np.cumsum(shocks, axis=1, out=shocks)
+            shocks += log_level[:, np.newaxis, :]
+            log_level = shocks[:, -1, :].copy()
+
+            np.exp(shocks, out=shocks)
+            values[day:end] = (shocks @ holdings).T
+
+        if output == 'percentiles':
+            reducer.update(values)
+
+    if output == 'terminal':
+        return collected
+    if output == 'percentiles':
+        return reducer.result()
+    return pd.DataFrame(collected)
@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import tempfile
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+import pandas as pd
+
+# One memory-mappable .npy file per ticker holding (date, price) rows, plus a small JSON
+# sidecar recording the [start, end) date range that has already been fetched.
+STORE_DIR = os.environ.get(
+    'PRICE_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.price_store')
+)
+PRICE_DTYPE = np.dtype([('date', 'datetime64[D]'), ('price', 'f8')])
+
+# Seconds during which a range the provider answered without any bars is not fetched again
+EMPTY_RANGE_TTL = 60 * 60
+
+# In-process locks per ticker lock file; the file lock itself serializes separate processes
+_LOCKS = {}
+_LOCKS_GUARD = threading.Lock()
+
+def _paths(ticker, store_dir=None):
+    """
+    Returns the (data, metadata) file paths for a ticker. Tickers are URL-quoted so
+    symbols like '^GSPC' or 'USDZAR=X' map to safe file names.
+    """
+    base = os.path.join(store_dir or STORE_DIR, quote(ticker, safe=''))
+    return base + '.npy', base + '.json'
+
+@contextmanager
+def _ticker_lock(ticker, store_dir):
+    """
+    Holds a ticker's write lock: a threading lock for writers in this process plus an
+    exclusive lock on a '.lock' file for writers in other processes (e.g. batch workers).
+    """
+    lock_path = os.path.splitext(_paths(ticker, store_dir)[0])[0] + '.lock'
+    with _LOCKS_GUARD:
+        lock = _LOCKS.setdefault(lock_path, threading.Lock())
+    with lock, open(lock_path, 'a+b') as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _atomic_write(path, write, mode='w'):
+    """
+    Writes via a uniquely named temporary file and renames it, so readers never see a
+    partial file and concurrent writers never share a temporary file.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode) as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def _empty_path(ticker, store_dir=None):
+    return os.path.splitext(_paths(ticker, store_dir)[1])[0] + '.empty.json'
+
+def _empty_ranges(ticker, store_dir=None):
+    """
+    Returns the [start, end) ranges recorded by mark_empty that have not yet expired.
+    """
+    path = _empty_path(ticker, store_dir)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        entries = json.load(f)
+    now = time.time()
+    return [
+        (pd.Timestamp(e['start']), pd.Timestamp(e['end']))
+        for e in entries if now - e['fetched_at'] < EMPTY_RANGE_TTL
+    ]
+
+def mark_empty(ticker, start, end, store_dir=None):
+    """
+    Records that the provider answered [start, end) without any bars for a ticker
+    (weekend, holiday, before listing, or left out of the answer). missing_ranges skips
+    the range for EMPTY_RANGE_TTL seconds, after which it is fetched again.
+    """
+    store_dir = store_dir or STORE_DIR
+    os.makedirs(store_dir, exist_ok=True)
+    path = _empty_path(ticker, store_dir)
+
+    with _ticker_lock(ticker, store_dir):
+        entries = []
+        if os.path.exists(path):
+            with open(path) as f:
+                entries = [e for e in json.load(f) if time.time() - e['fetched_at'] < EMPTY_RANGE_TTL]
+        entries.append({
+            'start': str(pd.Timestamp(start).date()), 'end': str(pd.Timestamp(end).date()),
+            'fetched_at': time.time(),
+        })
+        _atomic_write(path, lambda f: json.dump(entries, f))
+
+def read_coverage(ticker, store_dir=None):
+    """
+    Returns the stored (start, end) coverage of a ticker as Timestamps, or None.
+    """
+    _, meta_path = _paths(ticker, store_dir)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    return pd.Timestamp(meta['start']), pd.Timestamp(meta['end'])
+
+def missing_ranges(ticker, start, end, store_dir=None):
+    """
+    Returns the list of [start, end) ranges that must be fetched so the store covers
+    [start, end). Coverage is kept contiguous, so a request that does not overlap the
+    stored range also fetches the gap in between. Recently answered empty ranges
+    (see mark_empty) are left out.
+    """
+    coverage = read_coverage(ticker, store_dir)
+    if coverage is None:
+        ranges = [(start, end)] if start < end else []
+    else:
+        cov_start, cov_end = coverage
+        ranges = []
+        if start < cov_start:
+            ranges.append((start, cov_start))
+        if end > cov_end:
+            ranges.append((cov_end, end))
+
+    for empty_start, empty_end in _empty_ranges(ticker, store_dir):
+        ranges = [
+            (lo, hi)
+            for range_start, range_end in ranges
+            for lo, hi in ((range_start, min(range_end, empty_start)), (max(range_start, empty_end), range_end))
+            if lo < hi
+        ]
+    return ranges
+
+def load_array(ticker, store_dir=None):
+    """
+    Returns the stored (date, price) structured array, memory-mapped read-only.
+    """
+    data_path, _ = _paths(ticker, store_dir)
+    if not os.path.exists(data_path):
+        return np.empty(0, dtype=PRICE_DTYPE)
+    return np.load(data_path, mmap_mode='r')
+
+def read_prices(ticker, start=None, end=None, store_dir=None):
+    """
+    Returns the stored prices of a ticker in [start, end) as a Series.
+    """
+    data = load_array(ticker, store_dir)
+    dates = data['date']
+    lo = 0 if start is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(start).date()), side='left')
+    hi = len(dates) if end is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(end).date()), side='left')
+    index = pd.DatetimeIndex(dates[lo:hi].astype('datetime64[ns]'), name='Date')
+    return pd.Series(np.array(data['price'][lo:hi]), index=index, name=ticker)
+
+def last_stored_date(ticker, store_dir=None):
+    """
+    Returns the date of the last stored bar of a ticker, or None if nothing is stored.
+    """
+    data = load_array(ticker, store_dir)
+    if len(data) == 0:
+        return None
+    return pd.Timestamp(data['date'][-1])
+
+def write_prices(ticker, prices, start, end, store_dir=None):
+    """
+    Merges freshly fetched prices for [start, end) into the store and extends the
+    recorded coverage. New values replace stored values on the same dates.
+    Writers of the same ticker are serialized from load to replace, so none is lost.
+    Returns the earliest date whose stored price was added or changed, or None.
+    """
+    store_dir = store_dir or STORE_DIR
+    os.makedirs(store_dir, exist_ok=True)
+    data_path, meta_path = _paths(ticker, store_dir)
+
+    prices = prices.dropna()
+    fresh = np.empty(len(prices), dtype=PRICE_DTYPE)
+    fresh['date'] = prices.index.values.astype('datetime64[D]')
+    fresh['price'] = prices.values
+
+    with _ticker_lock(ticker, store_dir):
+        existing = np.array(load_array(ticker, store_dir))
+
+        # Earliest fresh bar that is new or differs from what is stored
+        pos = np.clip(np.searchsorted(existing['date'], fresh['date']), 0, max(len(existing) - 1, 0))
+        if len(existing):
+            unchanged = (existing['date'][pos] == fresh['date']) & (existing['price'][pos] == fresh['price'])
+        else:
+            unchanged = np.zeros(len(fresh), dtype=bool)
+        changed_dates = fresh['date'][~unchanged]
+        changed_from = pd.Timestamp(changed_dates.min()) if len(changed_dates) else None
+
+        merged = np.concatenate([fresh, existing])
+        # np.unique keeps the first occurrence, i.e. the fresh value for duplicated dates
+        _, first = np.unique(merged['date'], return_index=True)
+        merged = merged[first]
+
+        coverage = read_coverage(ticker, store_dir)
+        if coverage is not None:
+            start, end = min(start, coverage[0]), max(end, coverage[1])
+
+        _atomic_write(data_path, lambda f: np.save(f, merged), mode='wb')
+        meta = {'start': str(pd.Timestamp(start).date()), 'end': str(pd.Timestamp(end).date())}
+        _atomic_write(meta_path, lambda f: json.dump(meta, f))
+
+    return changed_from
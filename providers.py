@@ -0,0 +1,137 @@
+import os
+import zlib
+import threading
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+class MarketDataProvider:
+    """
+    Interface for price sources used by data_loader.
+    download() returns a DataFrame of adjusted close prices indexed by date with one
+    column per ticker it could serve; tickers it has no data for are simply left out.
+    It may raise on transient errors, which the fetch scheduler retries. The scheduler
+    calls it from several threads at once, so it must be thread-safe.
+
+    persist controls whether data_loader caches the results in the on-disk price store;
+    local providers that are already fast and deterministic set it to False.
+    """
+
+    persist = True
+
+    def download(self, tickers, start_date, end_date=None):
+        raise NotImplementedError
+
+class YFinanceProvider(MarketDataProvider):
+    """
+    Yahoo Finance prices via yfinance.
+
+    yf.download collects results and errors in module-global state, so concurrent calls
+    (scheduler threads, other sessions) would mix batches. Calls are serialized
+    process-wide; yfinance still downloads the tickers of one batch in parallel.
+    """
+
+    _download_lock = threading.Lock()
+
+    def download(self, tickers, start_date, end_date=None):
+        # yfinance expects a space-separated string or list
+        with self._download_lock:
+            data = yf.download(tickers, start=start_date, end=end_date, progress=False, threads=True)
+
+        if 'Adj Close' in data.columns:
+            df = data['Adj Close']
+        elif 'Close' in data.columns:
+            df = data['Close']
+        else:
+            # Fallback if single ticker and structure is different
+            df = data
+
+        if isinstance(df, pd.Series):
+            df = df.to_frame(name=tickers[0])
+        if getattr(df.index, 'tz', None) is not None:
+            df.index = df.index.tz_localize(None)
+        return df
+
+class FileProvider(MarketDataProvider):
+    """
+    Prices from a local directory with one file per ticker, named like the price store
+    (URL-quoted ticker) with a .csv or .parquet extension. Files need a date column or
+    index and an 'Adj Close', 'Close' or single price column.
+    """
+
+    persist = False
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _read(self, ticker):
+        base = os.path.join(self.directory, quote(ticker, safe=''))
+        if os.path.exists(base + '.parquet'):
+            # Parquet support needs pyarrow or fastparquet installed
+            df = pd.read_parquet(base + '.parquet')
+        elif os.path.exists(base + '.csv'):
+            df = pd.read_csv(base + '.csv')
+        else:
+            return None
+
+        date_col = next((c for c in df.columns if str(c).lower() == 'date'), None)
+        if date_col is not None:
+            df = df.set_index(date_col)
+        df.index = pd.to_datetime(df.index)
+        for col in ('Adj Close', 'Close'):
+            if col in df.columns:
+                return df[col]
+        return df.iloc[:, 0]
+
+    def download(self, tickers, start_date, end_date=None):
+        series = {}
+        for ticker in tickers:
+            prices = self._read(ticker)
+            if prices is not None:
+                mask = prices.index >= pd.Timestamp(start_date)
+                if end_date is not None:
+                    mask &= prices.index < pd.Timestamp(end_date)
+                series[ticker] = prices[mask].astype(float)
+        if not series:
+            return pd.DataFrame()
+        return pd.concat(series, axis=1).sort_index()
+
+class SyntheticProvider(MarketDataProvider):
+    """
+    Reproducible geometric Brownian motion prices for any ticker, for offline tests and
+    load tests. Each ticker gets its own seeded idiosyncratic shocks on top of a shared
+    market factor, so results do not depend on batch composition or requested range.
+    """
+
+    persist = False
+    ORIGIN = pd.Timestamp('1990-01-01')
+
+    def __init__(self, seed=0, annual_return=0.07, annual_volatility=0.25, market_correlation=0.3, start_price=100.0):
+        self.seed = seed
+        self.annual_return = annual_return
+        self.annual_volatility = annual_volatility
+        self.market_correlation = market_correlation
+        self.start_price = start_price
+
+    def download(self, tickers, start_date, end_date=None):
+        end = pd.Timestamp(end_date) if end_date is not None else pd.Timestamp.today().normalize() + pd.Timedelta(days=1)
+        # Paths always start at ORIGIN so a ticker's prices are the same for any window
+        dates = pd.bdate_range(self.ORIGIN, end - pd.Timedelta(days=1))
+        num_days = len(dates)
+
+        drift = (self.annual_return - 0.5 * self.annual_volatility ** 2) / 252
+        vol = self.annual_volatility / np.sqrt(252)
+        rho = self.market_correlation
+        market = np.random.default_rng([self.seed]).standard_normal(num_days)
+
+        shocks = np.empty((num_days, len(tickers)))
+        for j, ticker in enumerate(tickers):
+            rng = np.random.default_rng([self.seed, zlib.crc32(ticker.encode())])
+            shocks[:, j] = rng.standard_normal(num_days)
+        shocks = np.sqrt(rho) * market[:, np.newaxis] + np.sqrt(1 - rho) * shocks
+
+        prices = self.start_price * np.exp(np.cumsum(drift + vol * shocks, axis=0))
+        df = pd.DataFrame(prices, index=dates, columns=list(tickers))
+        return df.loc[df.index >= pd.Timestamp(start_date)]
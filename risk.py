@@ -0,0 +1,121 @@
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+# All loss measures are positive fractions of portfolio value: a 95% VaR of 0.02 means
+# a 5% chance of losing more than 2% over the horizon. Functions accept a single weight
+# vector or a (P, assets) matrix and are vectorized across portfolios and confidence levels.
+
+DEFAULT_CONFIDENCE_LEVELS = (0.95, 0.99)
+
+def _as_matrix(weights):
+    return np.atleast_2d(np.asarray(weights, dtype=float))
+
+def _tidy(var, es, confidence_levels, portfolios=None):
+    """
+    Arranges (levels, P) VaR / ES arrays as one row per portfolio and confidence level.
+    """
+    num_levels, num_portfolios = var.shape
+    portfolios = list(portfolios) if portfolios is not None else list(range(num_portfolios))
+    return pd.DataFrame({
+        'portfolio': np.tile(portfolios, num_levels),
+        'confidence': np.repeat(confidence_levels, num_portfolios),
+        'var': var.ravel(),
+        'es': es.ravel(),
+    })
+
+def _empirical_tail(samples, confidence_levels):
+    """
+    Historical-style VaR and Expected Shortfall from return samples of shape (N, P).
+    ES is the mean of the worst ceil((1 - q) * N) outcomes, from one sort per column.
+    """
+    samples = np.sort(samples, axis=0)
+    n = len(samples)
+    levels = np.asarray(confidence_levels, dtype=float)
+
+    var = -np.quantile(samples, 1 - levels, axis=0)
+    tail_counts = np.maximum(np.ceil((1 - levels) * n).astype(int), 1)
+    tail_sums = np.cumsum(samples, axis=0)[tail_counts - 1]
+    es = -tail_sums / tail_counts[:, np.newaxis]
+    return var, es
+
+def historical_var(returns, weights, confidence_levels=DEFAULT_CONFIDENCE_LEVELS, horizon_days=1, portfolios=None):
+    """
+    Historical VaR / Expected Shortfall from daily asset log returns (e.g. calculate_log_returns).
+    Multi-day horizons use overlapping horizon_days windows of summed log returns.
+    Portfolio outcomes are value-weighted simple returns: exp(r) @ w - 1.
+    """
+    R = np.asarray(returns, dtype=float)
+    if horizon_days > 1:
+        cumulative = np.vstack([np.zeros((1, R.shape[1])), np.cumsum(R, axis=0)])
+        R = cumulative[horizon_days:] - cumulative[:-horizon_days]
+    outcomes = np.expm1(R) @ _as_matrix(weights).T
+    var, es = _empirical_tail(outcomes, confidence_levels)
+    return _tidy(var, es, confidence_levels, portfolios)
+
+def parametric_var(weights, mean_returns, cov_matrix, confidence_levels=DEFAULT_CONFIDENCE_LEVELS,
+                   horizon_days=1, portfolios=None):
+    """
+    Parametric (normal) VaR / Expected Shortfall from daily mean returns and cov_matrix,
+    scaled to horizon_days with the square-root-of-time rule.
+    """
+    W = _as_matrix(weights)
+    mu = np.asarray(mean_returns, dtype=float)
+    cov = np.asarray(cov_matrix, dtype=float)
+
+    port_mean = W @ mu * horizon_days
+    port_vol = np.sqrt(np.einsum('ij,ij->i', W @ cov, W) * horizon_days)
+
+    normal = NormalDist()
+    levels = np.asarray(confidence_levels, dtype=float)
+    z = np.array([normal.inv_cdf(1 - q) for q in levels])
+    density = np.array([normal.pdf(v) for v in z])
+
+    var = -(port_mean + z[:, np.newaxis] * port_vol)
+    es = -(port_mean - (density / (1 - levels))[:, np.newaxis] * port_vol)
+    return _tidy(var, es, confidence_levels, portfolios)
+
+def monte_carlo_var(terminal_values, initial_investment, confidence_levels=DEFAULT_CONFIDENCE_LEVELS, portfolios=None):
+    """
+    VaR / Expected Shortfall over the simulation horizon from Monte Carlo terminal values,
+    e.g. run_multi_asset_monte_carlo(..., output='terminal'). terminal_values is (N,) for one
+    portfolio or (N, P) with one column per portfolio.
+    """
+    values = np.asarray(terminal_values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    outcomes = values / np.asarray(initial_investment, dtype=float) - 1
+    var, es = _empirical_tail(outcomes, confidence_levels)
+    return _tidy(var, es, confidence_levels, portfolios)
+
+def drawdown_statistics(nav):
+    """
+    Maximum drawdown, longest drawdown duration (rows spent below a previous peak) and
+    current drawdown for NAV series, e.g. backtest.run_backtest(...)['nav'].
+    nav may be a Series, a DataFrame with one column per portfolio, or an array.
+
+    Returns:
+        pd.DataFrame: one row per portfolio.
+    """
+    names = nav.columns if isinstance(nav, pd.DataFrame) else None
+    values = np.asarray(nav, dtype=float)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+
+    peaks = np.maximum.accumulate(values, axis=0)
+    drawdown = values / peaks - 1
+
+    # Row of the most recent peak for every day; duration is the distance to it
+    rows = np.arange(len(values))[:, np.newaxis]
+    last_peak = np.maximum.accumulate(np.where(values >= peaks, rows, 0), axis=0)
+    duration = rows - last_peak
+
+    result = pd.DataFrame({
+        'max_drawdown': -drawdown.min(axis=0),
+        'max_drawdown_duration': duration.max(axis=0),
+        'current_drawdown': -drawdown[-1],
+    })
+    if names is not None:
+        result.index = names
+    return result
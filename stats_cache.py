@@ -0,0 +1,148 @@
+import sys
+import hashlib
+import datetime
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+try:
+    from . import instrumentation as ins
+except ImportError:
+    import instrumentation as ins
+
+_MISSING = object()
+
+# Plain values whose repr is deterministic and content-based
+_SCALAR_TYPES = (type(None), bool, int, float, complex, str, bytes, np.generic, datetime.date, datetime.timedelta)
+
+def _update(digest, part):
+    if isinstance(part, (pd.DataFrame, pd.Series, pd.Index)):
+        digest.update(b'pandas')
+        digest.update(pd.util.hash_pandas_object(part, index=not isinstance(part, pd.Index)).values.tobytes())
+        labels = list(part.columns) if isinstance(part, pd.DataFrame) else [part.name]
+        digest.update(repr(labels).encode())
+    elif isinstance(part, np.ndarray):
+        digest.update(repr((part.shape, part.dtype.str)).encode())
+        digest.update(np.ascontiguousarray(part).tobytes())
+    elif isinstance(part, _SCALAR_TYPES):
+        digest.update(repr(part).encode())
+    elif isinstance(part, (list, tuple)):
+        digest.update(f"{type(part).__name__}[{len(part)}]".encode())
+        for item in part:
+            _update(digest, item)
+    elif isinstance(part, dict):
+        digest.update(f"dict[{len(part)}]".encode())
+        for key in sorted(part, key=repr):
+            _update(digest, key)
+            _update(digest, part[key])
+    elif isinstance(part, (set, frozenset)):
+        digest.update(repr(sorted(map(repr, part))).encode())
+    elif hasattr(part, '__dict__') and not callable(part):
+        # Estimator objects (FactorCovariance, StreamingCovariance, ...) by class and contents
+        digest.update(f"{type(part).__module__}.{type(part).__qualname__}".encode())
+        _update(digest, vars(part))
+    else:
+        raise TypeError(f"Cannot fingerprint objects of type {type(part).__name__}")
+    digest.update(b'|')
+
+def fingerprint(*parts):
+    """
+    Content hash of price panels, arrays and plain parameters, used as a cache key.
+    DataFrames and Series are hashed by values, index and labels, so two equal panels
+    fetched on different reruns map to the same key. Lists, tuples, dicts and estimator
+    objects (by their attributes) are hashed recursively; other types raise TypeError
+    rather than being keyed by identity.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        _update(digest, part)
+    return digest.hexdigest()
+
+def _estimate_nbytes(value):
+    """
+    Approximate memory footprint of a cached value.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_estimate_nbytes(v) for v in value.values()) + sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        return sum(_estimate_nbytes(v) for v in value) + sys.getsizeof(value)
+    if hasattr(value, '__dict__'):
+        return sum(_estimate_nbytes(v) for v in vars(value).values()) + sys.getsizeof(value)
+    return sys.getsizeof(value)
+
+class StatsCache:
+    """
+    Thread-safe LRU cache for derived statistics with a memory cap.
+
+    Entries are keyed by a stage name plus a fingerprint of their inputs, e.g.
+    get_or_compute('log_returns', fingerprint(df_prices), lambda: ...). Least recently
+    used entries are evicted once the estimated total size exceeds max_bytes.
+    Cached values are shared: callers must copy before mutating them.
+
+    Entries can be tagged with the tickers whose stored prices they were derived from,
+    so invalidate() can drop them when data_loader.refresh_prices revises those prices
+    (needed where the key does not cover every input, e.g. FX rates read inside compute).
+    """
+
+    def __init__(self, max_bytes=256 * 2**20):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, name, key, compute, tags=()):
+        full_key = (name, key)
+        with self._lock:
+            if full_key in self._entries:
+                self._entries.move_to_end(full_key)
+                self.hits += 1
+                value = self._entries[full_key][0]
+            else:
+                self.misses += 1
+                value = _MISSING
+        if value is not _MISSING:
+            ins.event(f"cache.{name}", cache='hit')
+            return value
+
+        with ins.stage(f"cache.{name}", cache='miss'):
+            value = compute()
+        size = _estimate_nbytes(value)
+        if size > self.max_bytes:
+            return value
+
+        with self._lock:
+            if full_key not in self._entries:
+                self._entries[full_key] = (value, size, frozenset(tags))
+                self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+        return value
+
+    def invalidate(self, tags):
+        """
+        Drops every entry tagged with any of the given tags. Returns the number dropped.
+        """
+        tags = set(tags)
+        with self._lock:
+            stale = [k for k, (_, _, entry_tags) in self._entries.items() if entry_tags & tags]
+            for full_key in stale:
+                self.current_bytes -= self._entries.pop(full_key)[1]
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
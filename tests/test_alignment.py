@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import metrics as mt
+
+def _mixed_calendar():
+    """
+    Two listings on a 12-day calendar: 'JSE' misses day 3 (a local holiday) and days 6-10
+    (a suspension), 'NYSE' misses day 8.
+    """
+    index = pd.bdate_range('2024-03-01', periods=12)
+    rng = np.random.default_rng(0)
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.01, (12, 2)), axis=0)), index=index, columns=['JSE', 'NYSE'])
+    prices.iloc[[3, 6, 7, 8, 9, 10], 0] = np.nan
+    prices.iloc[8, 1] = np.nan
+    return prices
+
+def _reference_ffill(prices, max_fill_days):
+    filled = prices.ffill(limit=max_fill_days)
+    return filled.dropna()
+
+def test_intersection_keeps_common_trading_days():
+    prices = _mixed_calendar()
+    aligned, observed = mt.align_prices(prices, policy='intersection')
+    pd.testing.assert_frame_equal(aligned, prices.dropna())
+    assert observed.all().all()
+
+def test_ffill_matches_limited_forward_fill():
+    prices = _mixed_calendar()
+    for max_fill_days in (1, 3, 5):
+        aligned, observed = mt.align_prices(prices, policy='ffill', max_fill_days=max_fill_days)
+        pd.testing.assert_frame_equal(aligned, _reference_ffill(prices, max_fill_days))
+        pd.testing.assert_frame_equal(observed, prices.notna().loc[aligned.index])
+
+def test_union_fills_every_gap_and_drops_empty_columns():
+    prices = _mixed_calendar().assign(EMPTY=np.nan)
+    aligned, observed = mt.align_prices(prices, policy='union')
+    assert list(aligned.columns) == ['JSE', 'NYSE']
+    pd.testing.assert_frame_equal(aligned, prices[['JSE', 'NYSE']].ffill())
+    with pytest.raises(ValueError):
+        mt.align_prices(prices, policy='nearest')
+
+def test_filled_prices_never_become_zero_returns():
+    prices = _mixed_calendar()
+    aligned, observed = mt.align_prices(prices, policy='ffill', max_fill_days=1)
+    returns = mt.calculate_log_returns(aligned, observed=observed)
+
+    traded = prices.dropna()
+    expected = np.log(traded / traded.shift(1)).dropna()
+    expected = expected.loc[expected.index.isin(aligned.index)]
+    pd.testing.assert_frame_equal(returns, expected)
+    assert not (returns == 0).any().any()
+
+def test_pairwise_returns_blank_untraded_days():
+    prices = _mixed_calendar()
+    aligned, observed = mt.align_prices(prices, policy='union')
+    returns = mt.calculate_log_returns(aligned, dropna=False, observed=observed)
+    assert returns['JSE'].isna().sum() == 6
+    # The move over the holiday lands on the next trading day
+    assert np.isclose(returns['JSE'].iloc[3], np.log(prices['JSE'].iloc[4] / prices['JSE'].iloc[2]))
+
+def test_pairwise_covariance_matches_pandas():
+    rng = np.random.default_rng(1)
+    returns = pd.DataFrame(rng.normal(0, 0.01, (60, 4)), columns=list('abcd'))
+    returns.iloc[rng.random((60, 4)) < 0.2] = np.nan
+    returns.iloc[:58, 3] = np.nan
+    pd.testing.assert_frame_equal(mt.pairwise_covariance(returns), returns.cov(), rtol=1e-10)
+    pd.testing.assert_frame_equal(mt.pairwise_covariance(returns, min_periods=10), returns.cov(min_periods=10), rtol=1e-10)
+    pd.testing.assert_frame_equal(mt.calculate_covariance_matrix(returns, method='pairwise'), returns.cov(), rtol=1e-10)
+
+def test_forward_fill_keeps_more_returns_than_common_days():
+    prices = _mixed_calendar()
+    aligned, observed = mt.align_prices(prices, policy='intersection')
+    common = mt.calculate_log_returns(aligned, observed=observed)
+    aligned, observed = mt.align_prices(prices, policy='ffill', max_fill_days=1)
+    pairwise = mt.calculate_log_returns(aligned, dropna=False, observed=observed)
+    assert pairwise['NYSE'].count() > len(common)
+    # Each listing's returns still add up to its move over the aligned dates
+    np.testing.assert_allclose(pairwise.sum(), np.log(aligned.iloc[-1] / aligned.iloc[0]))
+
+def test_nearest_psd_clips_negative_eigenvalues():
+    cov = pd.DataFrame([[1.0, 0.9, -0.9], [0.9, 1.0, 0.9], [-0.9, 0.9, 1.0]], index=list('abc'), columns=list('abc'))
+    projected = mt.nearest_psd(cov)
+    eigvals, eigvecs = np.linalg.eigh(cov)
+    expected = (eigvecs * np.maximum(eigvals, 0)) @ eigvecs.T
+    np.testing.assert_allclose(projected, expected, atol=1e-12)
+    assert list(projected.columns) == list('abc')
+    assert np.linalg.eigvalsh(projected).min() > -1e-12
+
+    valid = np.array([[2.0, 0.5], [0.5, 1.0]])
+    np.testing.assert_array_equal(mt.nearest_psd(valid), valid)
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+import backtest as bt
+
+def _prices(start='2023-01-02', days=400, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(start, periods=days)
+    log_returns = rng.normal(0.0003, [0.008, 0.015, 0.025], (days, 3))
+    return pd.DataFrame(100 * np.exp(np.cumsum(log_returns, axis=0)), index=index, columns=['A', 'B', 'C'])
+
+def _reference_backtest(prices, weights, rebalance_days, cost_rate, initial_value=1.0):
+    """
+    Day-by-day share accounting: at each rebalance trade back to target weights and pay
+    cost_rate on the traded fraction of NAV.
+    """
+    nav = np.empty(len(prices))
+    turnover = np.zeros(len(prices))
+    shares = np.zeros(len(weights))
+    value = initial_value
+    for t, price in enumerate(prices):
+        if t > 0:
+            value = shares @ price
+        if t in rebalance_days:
+            current = shares * price / value
+            turnover[t] = np.abs(weights - current).sum()
+            value *= 1 - cost_rate * turnover[t]
+            shares = weights * value / price
+        nav[t] = value
+    return nav, turnover
+
+def _reference_calendar_days(index, frequency):
+    if frequency == 'none':
+        return {0}
+    key = index.month if frequency == 'monthly' else index.quarter
+    ends = {t for t in range(len(index) - 1) if key[t] != key[t + 1]}
+    return ends | {0}
+
+def _reference_threshold_days(prices, weights, threshold):
+    days, last = {0}, 0
+    for t in range(1, len(prices) - 1):
+        values = prices[t] / prices[last] * weights
+        if np.abs(values / values.sum() - weights).max() > threshold:
+            days.add(t)
+            last = t
+    return days
+
+def test_calendar_backtests_match_share_accounting():
+    weights = np.array([0.5, 0.3, 0.2])
+    for start in ('2023-01-02', '2024-01-31', '2024-03-29'):
+        prices = _prices(start)
+        for rebalance in ('none', 'monthly', 'quarterly'):
+            result = bt.run_backtest(prices, weights, rebalance=rebalance, cost_bps=25)
+            days = _reference_calendar_days(prices.index, rebalance)
+            nav, turnover = _reference_backtest(prices.to_numpy(), weights, days, 25 / 1e4)
+            np.testing.assert_allclose(result['nav'].to_numpy(), nav, rtol=1e-12)
+            np.testing.assert_allclose(result['turnover'].to_numpy(), turnover, atol=1e-12)
+
+def test_threshold_backtest_matches_share_accounting():
+    prices = _prices()
+    weights = np.array([0.4, 0.4, 0.2])
+    result = bt.run_backtest(prices, weights, rebalance='threshold', threshold=0.03, cost_bps=10)
+    days = _reference_threshold_days(prices.to_numpy(), weights, 0.03)
+    nav, turnover = _reference_backtest(prices.to_numpy(), weights, days, 10 / 1e4)
+    assert len(days) > 2
+    np.testing.assert_allclose(result['nav'].to_numpy(), nav, rtol=1e-12)
+    np.testing.assert_allclose(result['turnover'].to_numpy(), turnover, atol=1e-12)
+
+def test_initial_purchase_is_charged_when_starting_on_a_month_end():
+    prices = _prices('2024-01-31', days=60)
+    result = bt.run_backtest(prices, [0.5, 0.3, 0.2], rebalance='monthly', cost_bps=100)
+    assert result['turnover'].iloc[0] == 1.0
+    assert np.isclose(result['nav'].iloc[0], 0.99)
+    assert list(bt.rebalance_positions(prices.index, 'monthly')).count(0) == 1
+
+def test_sweep_matches_single_backtests():
+    prices = _prices()
+    weight_sets = {'tilted': [0.6, 0.3, 0.1], 'equal': [1 / 3] * 3}
+    sweep = bt.run_backtest_sweep(prices, weight_sets, rebalance_options=('monthly', 'threshold'), cost_bps_options=(0.0, 20.0))
+    for row in sweep.itertuples():
+        threshold = 0.05 if np.isnan(row.threshold) else row.threshold
+        single = bt.run_backtest(prices, weight_sets[row.weights], rebalance=row.rebalance, cost_bps=row.cost_bps, threshold=threshold)
+        assert np.isclose(row.total_return, single['nav'].iloc[-1] - 1)
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('yfinance')
+
+import batch_analysis as ba
+import metrics as mt
+from providers import SyntheticProvider
+
+PORTFOLIOS = [
+    {'portfolio': 'growth', 'tickers': ['AAA', 'BBB', 'CCC'], 'weights': np.array([0.5, 0.3, 0.2]), 'benchmark': 'QQQ'},
+    {'portfolio': 'dupes', 'tickers': ['AAA', 'AAA', 'DDD'], 'weights': np.array([1.0, 1.0, 2.0]), 'benchmark': 'SPY'},
+    {'portfolio': 'zeros', 'tickers': ['BBB', 'DDD'], 'weights': np.array([0.0, 0.0]), 'benchmark': 'QQQ'},
+    {'portfolio': 'gone', 'tickers': ['AAA', 'NOPE'], 'weights': np.array([1.0, 1.0]), 'benchmark': 'QQQ'},
+]
+
+class PartialProvider(SyntheticProvider):
+    def download(self, tickers, start_date, end_date=None):
+        return super().download([t for t in tickers if t != 'NOPE'], start_date, end_date)
+
+class HolidayProvider(SyntheticProvider):
+    """
+    Synthetic prices with one listing closed on its own exchange holidays.
+    """
+
+    def download(self, tickers, start_date, end_date=None):
+        prices = super().download(tickers, start_date, end_date)
+        if 'JSE' in prices:
+            prices.loc[prices.index.dayofyear % 17 == 0, 'JSE'] = np.nan
+        return prices
+
+class LateListingProvider(SyntheticProvider):
+    """
+    Synthetic prices with one ticker only listed from mid-2023.
+    """
+
+    def download(self, tickers, start_date, end_date=None):
+        prices = super().download(tickers, start_date, end_date)
+        if 'LATE' in prices:
+            prices.loc[prices.index < '2023-06-01', 'LATE'] = np.nan
+        return prices
+
+def _reference_row(prices, portfolio, rf):
+    # The app's per-portfolio pipeline on just that portfolio's tickers
+    available = np.array([t in prices.columns for t in portfolio['tickers']])
+    tickers = [t for t, ok in zip(portfolio['tickers'], available) if ok]
+    weights = portfolio['weights'][available]
+    weights = weights / weights.sum() if weights.sum() else np.full(len(tickers), 1 / len(tickers))
+    returns = mt.calculate_log_returns(prices[list(dict.fromkeys(tickers + [portfolio['benchmark']]))].dropna())
+    asset_returns = pd.DataFrame({f"{t}_{i}": returns[t] for i, t in enumerate(tickers)})
+    ret, vol, sharpe = mt.calculate_portfolio_performance(weights, asset_returns.mean(), asset_returns.cov(), rf)
+    beta = mt.calculate_beta(asset_returns @ weights, returns[portfolio['benchmark']])
+    alpha = mt.calculate_alpha(ret, returns[portfolio['benchmark']].mean() * 252, beta, rf)
+    tracking = (asset_returns @ weights - returns[portfolio['benchmark']]).std() * np.sqrt(252)
+    return {'return': ret, 'volatility': vol, 'sharpe': sharpe, 'beta': beta, 'alpha': alpha, 'tracking_error': tracking}
+
+def test_batch_matches_per_portfolio_pipeline():
+    provider = PartialProvider(seed=3)
+    results, report = ba.run_batch_analysis(PORTFOLIOS, '2022-01-01', '2024-01-01', risk_free_rate=0.03, provider=provider)
+    prices = provider.download(['AAA', 'BBB', 'CCC', 'DDD', 'QQQ', 'SPY'], '2022-01-01', '2024-01-01')
+    results = results.set_index('portfolio')
+
+    assert list(report['failed']) == ['NOPE']
+    assert results.loc['gone', 'missing_tickers'] == 'NOPE'
+    for portfolio in PORTFOLIOS:
+        expected = _reference_row(prices, portfolio, 0.03)
+        for name, value in expected.items():
+            np.testing.assert_allclose(results.loc[portfolio['portfolio'], name], value, rtol=1e-9, err_msg=name)
+
+def test_workers_and_compact_panel_agree():
+    provider = PartialProvider(seed=3)
+    kwargs = dict(start_date='2022-01-01', end_date='2024-01-01', risk_free_rate=0.03, provider=provider)
+    serial, _ = ba.run_batch_analysis(PORTFOLIOS, **kwargs)
+    parallel, _ = ba.run_batch_analysis(PORTFOLIOS, workers=2, **kwargs)
+    compact, _ = ba.run_batch_analysis(PORTFOLIOS, compact=True, **kwargs)
+
+    pd.testing.assert_frame_equal(parallel, serial)
+    numeric = ['return', 'volatility', 'sharpe', 'beta', 'alpha', 'tracking_error']
+    np.testing.assert_allclose(compact[numeric].to_numpy(), serial[numeric].to_numpy(), rtol=1e-4, atol=1e-6)
+
+def test_holidays_do_not_become_zero_returns():
+    provider = HolidayProvider(seed=4)
+    portfolio = {'portfolio': 'mixed', 'tickers': ['JSE', 'AAA'], 'weights': np.array([0.5, 0.5]), 'benchmark': 'QQQ'}
+    results, _ = ba.run_batch_analysis([portfolio], '2022-01-01', '2024-01-01', provider=provider)
+    prices = provider.download(['JSE', 'AAA', 'QQQ'], '2022-01-01', '2024-01-01')
+
+    expected = _reference_row(prices, portfolio, 0.0)
+    for name, value in expected.items():
+        np.testing.assert_allclose(results.loc[0, name], value, rtol=1e-9, err_msg=name)
+
+def test_late_listing_does_not_cut_other_portfolios():
+    provider = LateListingProvider(seed=5)
+    old = {'portfolio': 'old', 'tickers': ['AAA', 'BBB'], 'weights': np.array([0.6, 0.4]), 'benchmark': 'QQQ'}
+    new = {'portfolio': 'new', 'tickers': ['AAA', 'LATE'], 'weights': np.array([0.5, 0.5]), 'benchmark': 'QQQ'}
+    kwargs = dict(start_date='2022-01-01', end_date='2024-01-01', provider=provider)
+    alone, _ = ba.run_batch_analysis([old], **kwargs)
+    mixed, _ = ba.run_batch_analysis([old, new], **kwargs)
+    parallel, _ = ba.run_batch_analysis([old, new], workers=2, **kwargs)
+    prices = provider.download(['AAA', 'BBB', 'LATE', 'QQQ'], '2022-01-01', '2024-01-01')
+
+    pd.testing.assert_frame_equal(mixed.iloc[[0]], alone)
+    pd.testing.assert_frame_equal(parallel, mixed)
+    mixed = mixed.set_index('portfolio')
+    for portfolio in (old, new):
+        expected = _reference_row(prices, portfolio, 0.0)
+        for name, value in expected.items():
+            np.testing.assert_allclose(mixed.loc[portfolio['portfolio'], name], value, rtol=1e-9, err_msg=name)
@@ -0,0 +1,23 @@
+import pytest
+
+pytest.importorskip('yfinance')
+
+import benchmarks as bm
+
+TINY = {'assets': [5], 'years': [1], 'simulations': [50]}
+
+def test_every_case_runs_at_a_tiny_scale():
+    records = bm.run_benchmarks(TINY, repeats=1, log=None)
+    assert {r['benchmark'] for r in records} == set(bm.CASES)
+    assert all(r['median_seconds'] > 0 for r in records)
+    assert all(r['payload_bytes'] > 0 for r in records if r['benchmark'].startswith('plot_'))
+    assert len({r['key'] for r in records}) == len(records)
+
+def test_compare_to_baseline_flags_slowdowns_above_the_noise_floor():
+    baseline = [{'key': 'a', 'median_seconds': 0.1}, {'key': 'b', 'median_seconds': 0.001}, {'key': 'c', 'median_seconds': 0.1}]
+    current = [{'key': 'a', 'median_seconds': 0.2}, {'key': 'b', 'median_seconds': 0.003}, {'key': 'c', 'median_seconds': 0.12},
+               {'key': 'new', 'median_seconds': 1.0}]
+    result = bm.compare_to_baseline(current, baseline, tolerance=1.3, min_seconds=0.005).set_index('key')
+    assert list(result.index) == ['a', 'b', 'c']
+    assert result['regression'].tolist() == [True, False, False]
+    assert result.loc['a', 'ratio'] == pytest.approx(2.0)
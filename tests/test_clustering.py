@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+import metrics as mt
+
+def _reference_order(corr):
+    """
+    Naive average linkage: recompute every cluster-pair mean distance from the original
+    matrix and merge the closest pair, the cluster holding the lower asset first.
+    """
+    dist = np.sqrt(np.clip((1 - np.nan_to_num(corr)) / 2, 0.0, 1.0))
+    clusters = [[i] for i in range(len(corr))]
+    while len(clusters) > 1:
+        best = None
+        for a in range(len(clusters)):
+            for b in range(a + 1, len(clusters)):
+                d = dist[np.ix_(clusters[a], clusters[b])].mean()
+                if best is None or d < best[0]:
+                    best = (d, a, b)
+        _, a, b = best
+        first, second = sorted([clusters[a], clusters[b]], key=min)
+        clusters = [c for k, c in enumerate(clusters) if k not in (a, b)] + [first + second]
+    return np.array(clusters[0])
+
+def _block_correlation(num_assets, num_blocks, seed):
+    rng = np.random.default_rng(seed)
+    block = rng.integers(0, num_blocks, num_assets)
+    factors = rng.normal(0, 1, (500, num_blocks))
+    returns = factors[:, block] + rng.normal(0, rng.uniform(0.5, 2.0, num_assets), (500, num_assets))
+    corr = np.corrcoef(returns, rowvar=False)
+    # np.corrcoef is symmetric only up to rounding, which decides merge orientation
+    return (corr + corr.T) / 2
+
+def test_cluster_order_matches_naive_average_linkage():
+    for num_assets, num_blocks, seed in [(12, 3, 0), (30, 5, 1), (45, 1, 2)]:
+        corr = _block_correlation(num_assets, num_blocks, seed)
+        order = mt.cluster_order(corr)
+        np.testing.assert_array_equal(order, _reference_order(corr))
+        assert sorted(order) == list(range(num_assets))
+
+def test_cluster_order_groups_blocks_and_handles_nan():
+    corr = _block_correlation(20, 4, 3)
+    corr[5, :] = corr[:, 5] = np.nan
+    corr[5, 5] = 1.0
+    order = mt.cluster_order(pd.DataFrame(corr))
+    np.testing.assert_array_equal(order, _reference_order(corr))
+    assert list(mt.cluster_order(np.eye(2))) == [0, 1]
+
+def test_correlation_from_covariance():
+    rng = np.random.default_rng(4)
+    returns = pd.DataFrame(rng.normal(0, 1, (200, 5)) @ rng.normal(0, 1, (5, 5)), columns=list('abcde'))
+    returns['flat'] = 0.0
+    corr = mt.correlation_from_covariance(returns.cov())
+    expected = returns.corr()
+    expected.loc['flat', 'flat'] = np.nan
+    pd.testing.assert_frame_equal(corr, expected, rtol=1e-10)
+
+    model = mt.FactorCovariance.from_returns(returns.iloc[:, :5], num_factors=2)
+    np.testing.assert_allclose(mt.correlation_from_covariance(model), mt.correlation_from_covariance(model.to_dense()))
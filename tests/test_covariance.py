@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+import metrics as mt
+
+def _skewed_returns(t=250, n=6, seed=0):
+    """
+    Skewed, unevenly scaled returns: the case where the shrinkage terms disagree most.
+    """
+    rng = np.random.default_rng(seed)
+    common = rng.standard_normal((t, 1))
+    X = rng.standard_exponential((t, n)) - 1 + 0.5 * common
+    X *= np.linspace(0.005, 0.04, n)
+    return pd.DataFrame(X, columns=[f"A{i}" for i in range(n)])
+
+def _reference_identity(X):
+    """
+    Port of scikit-learn's ledoit_wolf_shrinkage / ledoit_wolf (assume_centered=False).
+    """
+    X = X - X.mean(axis=0)
+    n_samples, n_features = X.shape
+    X2 = X ** 2
+    emp_cov_trace = X2.sum(axis=0) / n_samples
+    mu = emp_cov_trace.sum() / n_features
+    beta_ = np.sum(X2.T @ X2)
+    delta_ = np.sum((X.T @ X) ** 2) / n_samples ** 2
+    beta = 1.0 / (n_features * n_samples) * (beta_ / n_samples - delta_)
+    delta = (delta_ - 2.0 * mu * emp_cov_trace.sum() + n_features * mu ** 2) / n_features
+    beta = min(beta, delta)
+    shrinkage = 0.0 if beta == 0 else beta / delta
+    emp_cov = X.T @ X / n_samples
+    return (1 - shrinkage) * emp_cov + shrinkage * mu * np.eye(n_features), shrinkage
+
+def _reference_constant_correlation(x):
+    """
+    Line-by-line port of Ledoit & Wolf's covCor.m.
+    """
+    t, n = x.shape
+    x = x - x.mean(axis=0)
+    sample = x.T @ x / t
+    var = np.diag(sample)
+    sqrtvar = np.sqrt(var)
+    r_bar = (np.sum(sample / np.outer(sqrtvar, sqrtvar)) - n) / (n * (n - 1))
+    prior = r_bar * np.outer(sqrtvar, sqrtvar)
+    np.fill_diagonal(prior, var)
+
+    y = x ** 2
+    phi_mat = y.T @ y / t - 2 * (x.T @ x) * sample / t + sample ** 2
+    phi = phi_mat.sum()
+    term1 = (x ** 3).T @ x / t
+    help_ = x.T @ x / t
+    term2 = np.diag(help_)[:, np.newaxis] * sample
+    term3 = help_ * var[:, np.newaxis]
+    term4 = var[:, np.newaxis] * sample
+    theta_mat = term1 - term2 - term3 + term4
+    np.fill_diagonal(theta_mat, 0.0)
+    rho = np.trace(phi_mat) + r_bar * np.sum(np.outer(1 / sqrtvar, sqrtvar) * theta_mat)
+    gamma = np.linalg.norm(sample - prior, 'fro') ** 2
+    shrinkage = max(0.0, min(1.0, (phi - rho) / gamma / t))
+    return shrinkage * prior + (1 - shrinkage) * sample, shrinkage
+
+def test_ledoit_wolf_identity_matches_reference():
+    returns = _skewed_returns()
+    t = len(returns)
+    shrunk, shrinkage = mt.ledoit_wolf_covariance(returns, return_shrinkage=True)
+    expected, expected_shrinkage = _reference_identity(returns.to_numpy())
+    assert np.isclose(shrinkage, expected_shrinkage)
+    np.testing.assert_allclose(shrunk.to_numpy() * (t - 1) / t, expected, rtol=1e-10)
+
+def test_ledoit_wolf_constant_correlation_matches_reference():
+    for seed in range(5):
+        returns = _skewed_returns(seed=seed)
+        t = len(returns)
+        shrunk, shrinkage = mt.ledoit_wolf_covariance(returns, target='constant_correlation', return_shrinkage=True)
+        expected, expected_shrinkage = _reference_constant_correlation(returns.to_numpy())
+        assert np.isclose(shrinkage, expected_shrinkage)
+        np.testing.assert_allclose(shrunk.to_numpy() * (t - 1) / t, expected, rtol=1e-10)
+
+def _reference_factor(X, k):
+    """
+    Top-k eigenpairs of the sample covariance, residual variances on the diagonal.
+    """
+    S = np.cov(X, rowvar=False)
+    eigvals, eigvecs = np.linalg.eigh(S)
+    top = np.argsort(eigvals)[::-1][:k]
+    B = eigvecs[:, top] * np.sqrt(eigvals[top])
+    specific = np.maximum(np.diag(S) - np.sum(B ** 2, axis=1), 1e-4 * np.diag(S).mean())
+    return B @ B.T + np.diag(specific)
+
+def test_factor_covariance_matches_eigendecomposition():
+    returns = _skewed_returns(n=8)
+    for k in (1, 3, 8):
+        model = mt.calculate_covariance_matrix(returns, method='factor', num_factors=k)
+        expected = _reference_factor(returns.to_numpy(), k)
+        pd.testing.assert_frame_equal(model.to_dense(), pd.DataFrame(expected, index=returns.columns, columns=returns.columns), rtol=1e-8)
+
+        weights = np.random.default_rng(k).dirichlet(np.ones(8), size=5)
+        np.testing.assert_allclose(model.portfolio_variance(weights), np.einsum('ij,jk,ik->i', weights, expected, weights), rtol=1e-10)
+        np.testing.assert_allclose(model.dot(weights[0]), expected @ weights[0], rtol=1e-10)
+        np.testing.assert_allclose(np.asarray(model), expected, rtol=1e-8)
+
+def test_factor_covariance_in_portfolio_performance():
+    returns = _skewed_returns(n=8)
+    model = mt.FactorCovariance.from_returns(returns, num_factors=2)
+    weights = np.full(8, 1 / 8)
+    expected = mt.calculate_portfolio_performance(weights, returns.mean(), model.to_dense(), 0.01)
+    np.testing.assert_allclose(mt.calculate_portfolio_performance(weights, returns.mean(), model, 0.01), expected, rtol=1e-12)
+    np.testing.assert_allclose(
+        np.ravel(mt._batch_portfolio_performance(weights[np.newaxis, :], returns.mean(), model, 0.01)), expected, rtol=1e-12
+    )
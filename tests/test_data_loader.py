@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('yfinance')
+
+import data_loader as dl
+import price_store as ps
+import stats_cache as sc
+from providers import MarketDataProvider, SyntheticProvider
+
+class FlakyProvider(SyntheticProvider):
+    """
+    Stored provider that leaves the given tickers out of its first answer.
+    """
+
+    persist = True
+
+    def __init__(self, missing_once):
+        super().__init__(seed=1)
+        self.missing_once = set(missing_once)
+        self.requests = []
+
+    def download(self, tickers, start_date, end_date=None):
+        self.requests.append(list(tickers))
+        served = [t for t in tickers if t not in self.missing_once]
+        self.missing_once -= set(tickers)
+        return super().download(served, start_date, end_date)
+
+class ListingProvider(SyntheticProvider):
+    """
+    Stored provider recording its requests, with some tickers only listed from a given date.
+    """
+
+    persist = True
+
+    def __init__(self, listed):
+        super().__init__(seed=1)
+        self.listed = listed
+        self.requests = []
+
+    def download(self, tickers, start_date, end_date=None):
+        self.requests.append((list(tickers), str(pd.Timestamp(start_date).date()), str(pd.Timestamp(end_date).date())))
+        prices = super().download(tickers, start_date, end_date)
+        for ticker, listed in self.listed.items():
+            if ticker in prices:
+                prices.loc[prices.index < listed, ticker] = np.nan
+        return prices.dropna(how='all')
+
+class FixedProvider(MarketDataProvider):
+    """
+    Serves fixed series, e.g. FX rates with their own holidays.
+    """
+
+    persist = False
+
+    def __init__(self, series):
+        self.series = series
+
+    def download(self, tickers, start_date, end_date=None):
+        frame = pd.DataFrame({t: self.series[t] for t in tickers if t in self.series})
+        return frame.loc[(frame.index >= pd.Timestamp(start_date)) & (frame.index < pd.Timestamp(end_date))]
+
+class RevisingProvider(SyntheticProvider):
+    """
+    Stored provider whose prices can be scaled to simulate revised bars.
+    """
+
+    persist = True
+    scale = 1.0
+
+    def download(self, tickers, start_date, end_date=None):
+        return super().download(tickers, start_date, end_date) * self.scale
+
+def test_refresh_invalidates_cached_statistics_of_revised_tickers(tmp_path):
+    provider = RevisingProvider(seed=2)
+    dl.fetch_historical_data(['AAA', 'BBB'], start_date='2024-01-01', store_dir=str(tmp_path), provider=provider)
+    cache = sc.StatsCache()
+    cache.get_or_compute('fx_converted', 'k', lambda: 1.0, tags=['AAA'])
+
+    assert dl.refresh_prices(['AAA'], store_dir=str(tmp_path), provider=provider, cache=cache) == {'AAA': None}
+    assert len(cache) == 1
+
+    provider.scale = 1.01
+    changes = dl.refresh_prices(['AAA'], store_dir=str(tmp_path), provider=provider, cache=cache)
+    assert changes['AAA'] is not None
+    assert len(cache) == 0
+
+def test_tickers_missing_from_an_answered_batch_are_retried_after_the_ttl(tmp_path, monkeypatch):
+    provider = FlakyProvider(missing_once=['FLAKY'])
+    kwargs = dict(start_date='2024-01-01', end_date='2024-03-01', store_dir=str(tmp_path), provider=provider, return_report=True)
+
+    df, report = dl.fetch_historical_data(['AAA', 'FLAKY'], **kwargs)
+    assert 'FLAKY' in report['failed']
+    assert df['FLAKY'].isna().all()
+    assert ps.read_coverage('FLAKY', str(tmp_path)) is None
+
+    dl.fetch_historical_data(['AAA', 'FLAKY'], **kwargs)
+    assert len(provider.requests) == 1
+
+    monkeypatch.setattr(ps, 'EMPTY_RANGE_TTL', 0)
+    df, report = dl.fetch_historical_data(['AAA', 'FLAKY'], **kwargs)
+    assert provider.requests[-1] == ['FLAKY']
+    assert not report['failed']
+    assert df['FLAKY'].notna().all()
+
+def test_ranges_answered_without_bars_are_not_downloaded_again(tmp_path):
+    provider = ListingProvider(listed={'LATE': '2023-06-01'})
+    store = str(tmp_path)
+    dl.fetch_historical_data(['LATE'], start_date='2023-06-01', end_date='2024-01-01', store_dir=store, provider=provider)
+
+    for _ in range(2):
+        # A weekend, and the range before the listing date
+        dl.fetch_historical_data(['AAA'], start_date='2024-01-06', end_date='2024-01-08', store_dir=store, provider=provider)
+        df = dl.fetch_historical_data(['LATE'], start_date='2022-01-01', end_date='2024-01-01', store_dir=store, provider=provider)
+    assert provider.requests == [
+        (['LATE'], '2023-06-01', '2024-01-01'),
+        (['AAA'], '2024-01-06', '2024-01-08'),
+        (['LATE'], '2022-01-01', '2023-06-01'),
+    ]
+    assert df['LATE'].first_valid_index() == pd.Timestamp('2023-06-01')
+    assert ps.read_coverage('AAA', store) is None
+
+def test_currency_conversion_matches_per_ticker_lookup():
+    index = pd.bdate_range('2024-01-01', periods=20)
+    rng = np.random.default_rng(0)
+    prices = pd.DataFrame(rng.uniform(50, 150, (20, 4)), index=index, columns=['AAA', 'FSR.JO', 'VOD.L', 'NPN.JO'])
+    # FX series start late and skip a few days (FX holidays)
+    fx_index = index[2:].delete([5, 6, 11])
+    rates = {
+        'ZARUSD=X': pd.Series(rng.uniform(0.05, 0.06, len(fx_index)), index=fx_index),
+        'GBPUSD=X': pd.Series(rng.uniform(1.2, 1.3, len(fx_index)), index=fx_index),
+    }
+    converted, currencies = dl.convert_to_base_currency(prices, provider=FixedProvider(rates))
+
+    assert currencies == {'AAA': 'USD', 'FSR.JO': 'ZAR', 'VOD.L': 'GBP', 'NPN.JO': 'ZAR'}
+    for ticker in prices.columns:
+        currency, unit = dl.detect_currency(ticker)
+        for date in index:
+            if currency == 'USD':
+                rate = 1.0
+            else:
+                # Latest rate on or before the date, else the first one available
+                series = rates[f"{currency}USD=X"]
+                known = series.loc[:date]
+                rate = known.iloc[-1] if len(known) else series.iloc[0]
+            np.testing.assert_allclose(converted.loc[date, ticker], prices.loc[date, ticker] * unit * rate, rtol=1e-12)
+    assert dl.fx_pair_tickers(prices.columns) == ['GBPUSD=X', 'ZARUSD=X']
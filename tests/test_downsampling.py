@@ -0,0 +1,74 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+import visualizations as viz
+
+def _reference_lttb(x, y, threshold):
+    """
+    Port of Steinarsson's reference LTTB implementation.
+    """
+    n = len(y)
+    every = (n - 2) / (threshold - 2)
+    a, sampled = 0, [0]
+    for i in range(threshold - 2):
+        avg_start = int(math.floor((i + 1) * every) + 1)
+        avg_end = min(int(math.floor((i + 2) * every) + 1), n)
+        avg_x, avg_y = np.mean(x[avg_start:avg_end]), np.mean(y[avg_start:avg_end])
+        max_area, next_a = -1.0, None
+        for j in range(int(math.floor(i * every) + 1), int(math.floor((i + 1) * every) + 1)):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a])) * 0.5
+            if area > max_area:
+                max_area, next_a = area, j
+        sampled.append(next_a)
+        a = next_a
+    sampled.append(n - 1)
+    return np.array(sampled)
+
+def _reference_minmax(y, num_points):
+    size = math.ceil(len(y) / (num_points // 2))
+    keep = {0, len(y) - 1}
+    for start in range(0, len(y), size):
+        bucket = y[start:start + size]
+        keep |= {start + int(np.nanargmin(bucket)), start + int(np.nanargmax(bucket))}
+    return np.array(sorted(keep))
+
+def test_lttb_matches_reference():
+    rng = np.random.default_rng(0)
+    for n, threshold in [(1000, 100), (5003, 777), (10, 3), (2000, 1999)]:
+        x = np.sort(rng.uniform(0, 100, n))
+        y = rng.normal(0, 1, n).cumsum()
+        np.testing.assert_array_equal(viz.lttb_indices(x, y, threshold), _reference_lttb(x, y, threshold))
+    assert len(viz.lttb_indices(x, y, 5000)) == n
+
+def test_minmax_keeps_every_bucket_extreme():
+    rng = np.random.default_rng(1)
+    y = rng.normal(0, 1, 4321).cumsum()
+    y[[100, 2000]] = np.nan
+    for num_points in (10, 400, 1001):
+        np.testing.assert_array_equal(viz.minmax_indices(y, num_points), _reference_minmax(y, num_points))
+
+def test_downsample_keeps_dates_and_ends():
+    index = pd.bdate_range('2000-01-03', periods=6000)
+    series = pd.Series(np.random.default_rng(2).normal(0, 1, 6000).cumsum(), index=index)
+    reduced = viz.downsample(series, max_points=500)
+    expected = _reference_lttb(viz._numeric(index), series.to_numpy(), 500)
+    pd.testing.assert_series_equal(reduced, series.iloc[expected])
+    assert viz.downsample(series, max_points=None) is series
+    assert viz.downsample(series, 300, method='minmax').index[[0, -1]].equals(index[[0, -1]])
+
+def test_frontier_density_matches_histogram2d():
+    rng = np.random.default_rng(3)
+    vols, rets = rng.uniform(0.1, 0.3, 20000), rng.normal(0.08, 0.03, 20000)
+    sharpes = rets / vols
+    vol_centers, ret_centers, mean_sharpe, counts = viz._frontier_density(rets, vols, sharpes, 40)
+
+    vol_edges = np.linspace(vols.min(), vols.max(), 41)
+    ret_edges = np.linspace(rets.min(), rets.max(), 41)
+    expected_counts, _, _ = np.histogram2d(rets, vols, bins=[ret_edges, vol_edges])
+    sums, _, _ = np.histogram2d(rets, vols, bins=[ret_edges, vol_edges], weights=sharpes)
+    np.testing.assert_array_equal(counts, expected_counts)
+    with np.errstate(invalid='ignore'):
+        np.testing.assert_allclose(mean_sharpe, sums / expected_counts, rtol=1e-10)
+    np.testing.assert_allclose(vol_centers, (vol_edges[1:] + vol_edges[:-1]) / 2)
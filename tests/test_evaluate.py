@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+import metrics as mt
+
+def _panel(days=400, assets=5, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range('2022-01-03', periods=days)
+    bench = pd.Series(rng.normal(0.0003, 0.01, days), index=index)
+    returns = pd.DataFrame(
+        0.7 * bench.to_numpy()[:, np.newaxis] + rng.normal(0.0002, 0.012, (days, assets)),
+        index=index, columns=[f"A{i}" for i in range(assets)]
+    )
+    weights = rng.dirichlet(np.ones(assets), size=20)
+    return returns, bench, weights
+
+def _reference(weights, returns, bench, rf):
+    # One portfolio at a time with the app's scalar functions
+    rows = []
+    for w in weights:
+        ret, vol, sharpe = mt.calculate_portfolio_performance(w, returns.mean(), returns.cov(), rf)
+        port = returns @ w
+        beta = mt.calculate_beta(port, bench)
+        rows.append({
+            'return': ret, 'volatility': vol, 'sharpe': sharpe, 'beta': beta,
+            'alpha': mt.calculate_alpha(ret, bench.mean() * 252, beta, rf),
+            'tracking_error': (port - bench).std() * np.sqrt(252),
+        })
+    return pd.DataFrame(rows)
+
+def test_evaluate_portfolios_matches_per_portfolio_loop():
+    returns, bench, weights = _panel()
+    result = mt.evaluate_portfolios(weights, returns, bench, risk_free_rate=0.03)
+    pd.testing.assert_frame_equal(result, _reference(weights, returns, bench, 0.03), rtol=1e-10)
+
+def test_evaluate_portfolios_aligns_the_benchmark():
+    returns, bench, weights = _panel()
+    shifted = bench.iloc[30:]
+    # Stale precomputed statistics of the full panel are dropped after alignment
+    result = mt.evaluate_portfolios(weights, returns, shifted, 0.03, mean_returns=returns.mean(), cov_matrix=returns.cov())
+    expected = _reference(weights, returns.loc[shifted.index], shifted, 0.03)
+    pd.testing.assert_frame_equal(result, expected, rtol=1e-10)
+
+def test_evaluate_portfolios_on_arrays_and_single_weights():
+    returns, bench, weights = _panel()
+    result = mt.evaluate_portfolios(weights[0], returns.to_numpy(), bench.to_numpy(), 0.0)
+    pd.testing.assert_frame_equal(result, _reference(weights[:1], returns, bench, 0.0), rtol=1e-10)
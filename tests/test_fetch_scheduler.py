@@ -0,0 +1,76 @@
+import time
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import fetch_scheduler as fs
+
+class CountingProvider:
+    """
+    Serves a constant price for every ticker, failing the first calls for some tickers.
+    """
+
+    persist = False
+
+    def __init__(self, failures=None):
+        self.failures = dict(failures or {})
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def download(self, tickers, start_date, end_date=None):
+        with self._lock:
+            self.calls += 1
+            for ticker in tickers:
+                if self.failures.get(ticker, 0) > 0:
+                    self.failures[ticker] -= 1
+                    raise ConnectionError(f"{ticker} unavailable")
+        index = pd.bdate_range(start_date, end_date, inclusive='left')
+        return pd.DataFrame({t: np.full(len(index), 100.0) for t in tickers if t != 'MISSING'}, index=index)
+
+def test_batches_are_merged_and_failures_reported():
+    tickers = [f"T{i}" for i in range(7)] + ['MISSING']
+    data, failed = fs.fetch_prices(tickers, '2024-01-01', '2024-02-01', CountingProvider(),
+                                   batch_size=3, backoff=0.0, calls_per_second=None)
+    assert list(data.columns) == tickers
+    assert data.drop(columns='MISSING').notna().all().all()
+    assert set(failed) == {'MISSING'}
+
+def test_transient_errors_are_retried():
+    provider = CountingProvider(failures={'T1': 2})
+    data, failed = fs.fetch_prices(['T0', 'T1'], '2024-01-01', '2024-02-01', provider,
+                                   max_retries=2, backoff=0.0, calls_per_second=None)
+    assert not failed
+    assert provider.calls == 3
+
+def test_batches_failing_every_attempt_are_reported():
+    provider = CountingProvider(failures={'T1': 10})
+    data, failed = fs.fetch_prices(['T0', 'T1', 'T2'], '2024-01-01', '2024-02-01', provider,
+                                   batch_size=2, max_retries=1, backoff=0.0, calls_per_second=None)
+    assert set(failed) == {'T0', 'T1'}
+    assert data['T2'].notna().all()
+
+def test_yfinance_downloads_do_not_overlap(monkeypatch):
+    pytest.importorskip('yfinance')
+    import providers
+
+    active, overlaps = [0], []
+    lock = threading.Lock()
+
+    def download(tickers, start=None, end=None, **kwargs):
+        with lock:
+            active[0] += 1
+            overlaps.append(active[0] > 1)
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        index = pd.bdate_range(start, end, inclusive='left')
+        return pd.concat({'Close': pd.DataFrame({t: 1.0 for t in tickers}, index=index)}, axis=1)
+
+    monkeypatch.setattr(providers.yf, 'download', download)
+    tickers = [f"T{i}" for i in range(12)]
+    data, failed = fs.fetch_prices(tickers, '2024-01-01', '2024-02-01', providers.YFinanceProvider(),
+                                   batch_size=2, calls_per_second=None)
+    assert not failed
+    assert not any(overlaps)
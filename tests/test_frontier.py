@@ -0,0 +1,104 @@
+import numpy as np
+
+import metrics as mt
+
+def _inputs(num_assets=6, seed=0):
+    rng = np.random.default_rng(seed)
+    mean_returns = rng.normal(0.0004, 0.0003, num_assets)
+    factors = rng.normal(0, 0.01, (num_assets, num_assets))
+    cov_matrix = factors @ factors.T / num_assets + np.diag(rng.uniform(1e-5, 4e-5, num_assets))
+    return mean_returns, cov_matrix
+
+def _reference_simulation(mean_returns, cov_matrix, num_portfolios, risk_free_rate):
+    # The original loop: one np.random.random draw and one performance call per portfolio
+    results = np.zeros((3, num_portfolios))
+    weights_record = []
+    for i in range(num_portfolios):
+        weights = np.random.random(len(mean_returns))
+        weights /= np.sum(weights)
+        weights_record.append(weights)
+        results[:, i] = mt.calculate_portfolio_performance(weights, mean_returns, cov_matrix, risk_free_rate)
+    return results, np.array(weights_record)
+
+def test_simulated_frontier_matches_per_portfolio_loop():
+    mean_returns, cov_matrix = _inputs()
+    np.random.seed(7)
+    expected, expected_weights = _reference_simulation(mean_returns, cov_matrix, 500, 0.02)
+
+    for chunk_size in (64, 500, None):
+        np.random.seed(7)
+        results, weights = mt.simulate_efficient_frontier(
+            mean_returns, cov_matrix, 500, risk_free_rate=0.02, chunk_size=chunk_size
+        )
+        np.testing.assert_allclose(weights, expected_weights, rtol=1e-12)
+        np.testing.assert_allclose(results, expected, rtol=1e-10)
+
+def test_simulated_frontier_without_weights():
+    mean_returns, cov_matrix = _inputs()
+    np.random.seed(3)
+    results, weights = mt.simulate_efficient_frontier(mean_returns, cov_matrix, 50, return_weights=False)
+    assert weights is None
+    assert results.shape == (3, 50)
+
+def _reference_long_only_qp(cov, A, b):
+    # Exact solution by enumerating supports: solve the equality-constrained problem on
+    # every subset of assets and keep the best non-negative one
+    n = cov.shape[0]
+    best, best_value = None, np.inf
+    for mask in range(1, 2 ** n):
+        support = np.array([(mask >> i) & 1 for i in range(n)], dtype=bool)
+        k, m = support.sum(), A.shape[0]
+        kkt = np.zeros((k + m, k + m))
+        kkt[:k, :k] = cov[np.ix_(support, support)]
+        kkt[:k, k:] = -A[:, support].T
+        kkt[k:, :k] = A[:, support]
+        sol = np.linalg.lstsq(kkt, np.concatenate([np.zeros(k), b]), rcond=None)[0]
+        w = np.zeros(n)
+        w[support] = sol[:k]
+        if w.min() < -1e-12 or not np.allclose(A @ w, b, atol=1e-12):
+            continue
+        value = w @ cov @ w
+        if value < best_value - 1e-15:
+            best, best_value = w, value
+    return best
+
+def test_solved_frontier_matches_brute_force():
+    mean_returns, cov_matrix = _inputs(num_assets=5, seed=1)
+    rf = 0.02
+    frontier = mt.solve_efficient_frontier(mean_returns, cov_matrix, num_points=8, risk_free_rate=rf)
+    ones = np.ones((1, 5))
+
+    w_gmv = _reference_long_only_qp(cov_matrix, ones, np.array([1.0]))
+    np.testing.assert_allclose(frontier['min_variance']['weights'], w_gmv, atol=1e-8)
+
+    A = np.vstack([ones, mean_returns])
+    for weights in frontier['weights']:
+        assert weights.min() >= 0
+        assert np.isclose(weights.sum(), 1.0)
+        expected = _reference_long_only_qp(cov_matrix, A, np.array([1.0, mean_returns @ weights]))
+        np.testing.assert_allclose(weights, expected, atol=1e-8)
+
+    excess = mean_returns - rf / 252
+    y = _reference_long_only_qp(cov_matrix, excess[np.newaxis, :], np.array([1.0]))
+    np.testing.assert_allclose(frontier['max_sharpe']['weights'], y / y.sum(), atol=1e-8)
+
+def test_solved_frontier_dominates_random_portfolios():
+    mean_returns, cov_matrix = _inputs(num_assets=6, seed=2)
+    frontier = mt.solve_efficient_frontier(mean_returns, cov_matrix, num_points=40)
+    np.random.seed(0)
+    cloud, _ = mt.simulate_efficient_frontier(mean_returns, cov_matrix, 20000, return_weights=False)
+
+    assert cloud[1].min() >= frontier['min_variance']['volatility'] - 1e-12
+    assert cloud[2].max() <= frontier['max_sharpe']['sharpe'] + 1e-12
+    # Frontier volatility rises with return, so the curve point just below a portfolio's
+    # return bounds its volatility from below
+    curve_returns, curve_vols = frontier['results'][0], frontier['results'][1]
+    above = cloud[0] >= curve_returns[0]
+    below = np.searchsorted(curve_returns, cloud[0][above], side='right') - 1
+    assert np.all(cloud[1][above] >= curve_vols[below] - 1e-12)
+
+def test_closed_form_minimum_variance_when_unconstrained_is_long_only():
+    cov_matrix = np.diag([1.0, 2.0, 4.0]) * 1e-4
+    frontier = mt.solve_efficient_frontier(np.array([1e-4, 2e-4, 3e-4]), cov_matrix, num_points=5)
+    inverse = np.linalg.inv(cov_matrix).sum(axis=1)
+    np.testing.assert_allclose(frontier['min_variance']['weights'], inverse / inverse.sum(), atol=1e-12)
@@ -0,0 +1,56 @@
+import threading
+import tracemalloc
+
+import numpy as np
+
+import instrumentation as ins
+
+def test_stages_nest_and_record_shapes():
+    @ins.instrument('test.double')
+    def double(values):
+        return values * 2
+
+    with ins.recording() as records:
+        with ins.stage('outer'):
+            double(np.zeros((4, 3)))
+        ins.event('cache.test', cache='hit')
+
+    assert [r['stage'] for r in records] == ['test.double', 'outer', 'cache.test']
+    assert records[0]['depth'] == 1 and records[1]['depth'] == 0
+    assert records[0]['inputs'] == {'arg0': [4, 3]} and records[0]['output'] == [4, 3]
+    assert list(ins.summarize(records)['stage']) == ['  test.double', 'outer', 'cache.test']
+
+def test_nothing_is_recorded_outside_a_recording():
+    with ins.stage('ignored') as record:
+        assert record is None
+    assert ins.end_recording() == []
+
+def test_memory_tracing_stays_on_until_the_last_session_ends():
+    assert not tracemalloc.is_tracing()
+    first_started, second_started, first_done = threading.Event(), threading.Event(), threading.Event()
+    peaks = []
+
+    def first():
+        # Starts tracing, then ends while the second session is still recording
+        with ins.recording(memory=True):
+            first_started.set()
+            second_started.wait()
+        first_done.set()
+
+    def second():
+        first_started.wait()
+        with ins.recording(memory=True) as records:
+            second_started.set()
+            first_done.wait()
+            with ins.stage('allocate'):
+                np.ones(2**20)
+        peaks.extend(r.get('peak_mb') for r in records)
+
+    threads = [threading.Thread(target=first), threading.Thread(target=second)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert peaks and peaks[0] is not None and peaks[0] >= 7.5
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtest as bt
+import jobs
+import metrics as mt
+
+MEAN = np.array([0.0004, 0.0002, 0.0006])
+COV = np.array([[1.0, 0.3, 0.2], [0.3, 0.5, 0.1], [0.2, 0.1, 2.0]]) * 1e-4
+WEIGHTS = np.array([0.5, 0.3, 0.2])
+
+@pytest.fixture(scope='module')
+def manager():
+    manager = jobs.JobManager(max_workers=2)
+    yield manager
+    manager.shutdown()
+
+def test_frontier_job_matches_direct_chunks(manager):
+    job = manager.submit('frontier', MEAN, COV, 0.02, num_portfolios=250, chunk_size=100, seed=3)
+    cloud, frontier = job.result(timeout=120)
+
+    expected = np.hstack([jobs._frontier_chunk(MEAN, COV, size, 0.02, [3, i]) for i, size in enumerate([100, 100, 50])])
+    np.testing.assert_allclose(cloud, expected, rtol=1e-12)
+    reference = mt.solve_efficient_frontier(MEAN, COV, risk_free_rate=0.02)
+    np.testing.assert_allclose(frontier['max_sharpe']['weights'], reference['max_sharpe']['weights'], rtol=1e-12)
+    assert job.progress == 1.0 and job.partial() is not None
+
+def test_monte_carlo_job_bands_match_all_paths(manager):
+    job = manager.submit('monte_carlo', WEIGHTS, MEAN, COV, years=1, num_simulations=250, chunk_size=100, seed=5)
+    result = job.result(timeout=120)
+
+    paths = np.hstack([jobs._monte_carlo_chunk(WEIGHTS, MEAN, COV, 1, size, 10000, [5, i]) for i, size in enumerate([100, 100, 50])])
+    assert result['simulations'] == 250
+    np.testing.assert_allclose(result['bands'].to_numpy(), np.percentile(paths, (5, 50, 95), axis=1).T, rtol=1e-6)
+
+def test_backtest_job_matches_direct_run(manager):
+    index = pd.bdate_range('2023-01-02', periods=120)
+    prices = pd.DataFrame(100 * np.exp(np.random.default_rng(0).normal(0, 0.01, (120, 3)).cumsum(axis=0)), index=index)
+    result = manager.submit('backtest', prices, WEIGHTS, rebalance='monthly', cost_bps=10.0).result(timeout=120)
+    pd.testing.assert_frame_equal(result, bt.run_backtest(prices, WEIGHTS, rebalance='monthly', cost_bps=10.0))
+
+def test_identical_inputs_share_a_job_and_release_cancels(manager):
+    first = manager.submit('monte_carlo', WEIGHTS, MEAN, COV, years=1, num_simulations=20000, chunk_size=50, seed=9, owner='a')
+    again = manager.submit('monte_carlo', WEIGHTS, MEAN, COV, years=1, num_simulations=20000, chunk_size=50, seed=9, owner='b')
+    assert again is first and first.owners == {'a', 'b'}
+
+    manager.release(first.key, 'a')
+    assert first.status == jobs.RUNNING
+    manager.release(first.key, 'b')
+    assert first.status == jobs.CANCELLED
+    assert manager.get(first.key) is None
+    with pytest.raises(jobs.CancelledError):
+        first.result(timeout=1)
+    with pytest.raises(ValueError):
+        manager.submit('nope')
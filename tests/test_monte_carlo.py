@@ -0,0 +1,110 @@
+import tracemalloc
+
+import numpy as np
+
+import metrics as mt
+
+def _inputs():
+    mean_returns = np.array([0.0004, 0.0002, 0.0006])
+    vols = np.array([0.012, 0.008, 0.02])
+    corr = np.array([[1.0, 0.3, 0.5], [0.3, 1.0, 0.1], [0.5, 0.1, 1.0]])
+    return np.array([0.5, 0.3, 0.2]), mean_returns, corr * np.outer(vols, vols)
+
+def _reference_paths(weights, mean_returns, cov_matrix, years, num_simulations, initial_investment, seed):
+    # Path by path, day by day, consuming the normals in the same order as a single block
+    num_days, num_assets = years * 252, len(mean_returns)
+    chol = np.linalg.cholesky(cov_matrix)
+    shocks = np.random.default_rng(seed).standard_normal((num_simulations * (num_days - 1), num_assets))
+    shocks = shocks.reshape(num_simulations, num_days - 1, num_assets)
+    paths = np.empty((num_days, num_simulations))
+    for sim in range(num_simulations):
+        holdings = np.asarray(weights) * initial_investment
+        paths[0, sim] = holdings.sum()
+        for day in range(1, num_days):
+            holdings = holdings * np.exp(mean_returns + chol @ shocks[sim, day - 1])
+            paths[day, sim] = holdings.sum()
+    return paths
+
+def test_paths_match_day_by_day_reference():
+    weights, mean_returns, cov_matrix = _inputs()
+    paths = mt.run_multi_asset_monte_carlo(weights, mean_returns, cov_matrix, years=1, num_simulations=40,
+                                           initial_investment=1000, seed=5)
+    expected = _reference_paths(weights, mean_returns, cov_matrix, 1, 40, 1000, seed=5)
+    assert paths.shape == (252, 40)
+    np.testing.assert_allclose(paths.to_numpy(), expected, rtol=1e-10)
+
+def test_day_blocks_and_chunks_keep_the_distribution():
+    weights, mean_returns, cov_matrix = _inputs()
+    blocked = mt.run_multi_asset_monte_carlo(weights, mean_returns, cov_matrix, years=1, num_simulations=4000,
+                                             chunk_size=700, max_block_mb=0.01, seed=1).to_numpy()
+    single = mt.run_multi_asset_monte_carlo(weights, mean_returns, cov_matrix, years=1, num_simulations=4000,
+                                            seed=2).to_numpy()
+    np.testing.assert_allclose(np.log(blocked[-1]).mean(), np.log(single[-1]).mean(), atol=0.01)
+    np.testing.assert_allclose(np.log(blocked[-1]).std(), np.log(single[-1]).std(), rtol=0.05)
+
+def test_percentiles_output_reduces_the_paths():
+    weights, mean_returns, cov_matrix = _inputs()
+    kwargs = dict(years=1, num_simulations=300, chunk_size=100, seed=3)
+    paths = mt.run_multi_asset_monte_carlo(weights, mean_returns, cov_matrix, **kwargs)
+    bands = mt.run_multi_asset_monte_carlo(weights, mean_returns, cov_matrix, output='percentiles',
+                                           percentiles=(5, 50, 95), **kwargs)
+    expected = np.percentile(paths.to_numpy(dtype=np.float32), (5, 50, 95), axis=1).T
+    np.testing.assert_allclose(bands.to_numpy(), expected, rtol=1e-6)
+
+def test_terminal_values_match_the_analytic_mean():
+    weights, mean_returns, cov_matrix = _inputs()
+    n, steps = 200000, 5 * 252 - 1
+    terminal = mt.run_multi_asset_monte_carlo(weights, mean_returns, cov_matrix, years=5, num_simulations=n,
+                                              initial_investment=10000, output='terminal', seed=4)
+    # Each asset's holding is lognormal: E = h * exp(T mu + T var / 2)
+    expected = (weights * 10000 * np.exp(steps * mean_returns + steps * np.diag(cov_matrix) / 2)).sum()
+    assert abs(terminal.mean() - expected) < 4 * terminal.std() / np.sqrt(n)
+
+    paths = mt.run_multi_asset_monte_carlo(weights, mean_returns, cov_matrix, years=5, num_simulations=4000,
+                                           initial_investment=10000, seed=4)
+    np.testing.assert_allclose(np.median(paths.to_numpy()[-1]), np.median(terminal), rtol=0.03)
+
+def _lognormal_chunks(num_days=5, num_chunks=10, chunk=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    return [10000 * np.exp(rng.normal(0, 0.2, (num_days, chunk)).cumsum(axis=0)) for _ in range(num_chunks)]
+
+def test_percentile_reducer_exact_below_limit():
+    chunks = _lognormal_chunks(num_chunks=3, chunk=1000)
+    reducer = mt.PercentileReducer(5, (1, 5, 50, 95, 99))
+    for chunk in chunks:
+        reducer.update(chunk)
+    expected = np.percentile(np.hstack(chunks).astype(np.float32), (1, 5, 50, 95, 99), axis=1).T
+    assert reducer.count == 3000
+    np.testing.assert_allclose(reducer.result().to_numpy(), expected, rtol=1e-6)
+
+def test_percentile_reducer_sketch_within_relative_accuracy():
+    chunks = _lognormal_chunks()
+    reducer = mt.PercentileReducer(5, (5, 50, 95), exact_limit_mb=0.2, relative_accuracy=0.005)
+    for chunk in chunks:
+        reducer.update(chunk)
+    assert reducer.exact_limit == 10485 and reducer._counts is not None
+    expected = np.percentile(np.hstack(chunks), (5, 50, 95), axis=1).T
+    # Half a bucket of error, plus a little for the rank landing between order statistics
+    np.testing.assert_allclose(reducer.result().to_numpy(), expected, rtol=0.0075)
+
+def test_percentile_reducer_keeps_values_outside_the_first_range():
+    reducer = mt.PercentileReducer(1, (50,), exact_limit_mb=40 / 2**20)
+    reducer.update(np.full((1, 20), 100.0))
+    reducer.update(np.full((1, 1000), 1e6))
+    np.testing.assert_allclose(reducer.result().iloc[0, 0], 1e6, rtol=0.01)
+
+def test_percentile_reducer_memory_stays_within_its_budget():
+    # A year of paths with 1% daily moves, as simulated portfolios have
+    rng = np.random.default_rng(2)
+    chunks = [10000 * np.exp(rng.normal(0, 0.01, (252, 4000)).cumsum(axis=0)) for _ in range(4)]
+    reducer = mt.PercentileReducer(252, (5, 50, 95), exact_limit_mb=4)
+    tracemalloc.start()
+    try:
+        for chunk in chunks:
+            reducer.update(chunk)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert reducer._counts is not None
+    # The 4 MB exact buffer plus a few MB of per-slice temporaries, not whole-buffer index arrays
+    assert peak < 12 * 2**20
@@ -0,0 +1,77 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import price_store as ps
+
+def _prices(start, periods, seed=0, name='X'):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(start, periods=periods, name='Date')
+    return pd.Series(100 * np.exp(rng.normal(0, 0.01, periods).cumsum()), index=index, name=name)
+
+def test_write_and_read_round_trip(tmp_path):
+    prices = _prices('2024-01-01', 30)
+    prices.iloc[4] = np.nan
+    assert ps.write_prices('^GSPC', prices, pd.Timestamp('2024-01-01'), pd.Timestamp('2024-02-15'), str(tmp_path)) == prices.index[0]
+
+    stored = ps.read_prices('^GSPC', store_dir=str(tmp_path))
+    pd.testing.assert_series_equal(stored, prices.dropna().rename('^GSPC'), check_freq=False, check_index_type=False)
+    window = ps.read_prices('^GSPC', '2024-01-10', '2024-01-20', str(tmp_path))
+    pd.testing.assert_series_equal(window, stored.loc['2024-01-10':'2024-01-19'], check_freq=False, check_index_type=False)
+    assert ps.last_stored_date('^GSPC', str(tmp_path)) == prices.index[-1]
+
+def test_merge_prefers_fresh_values_and_extends_coverage(tmp_path):
+    store = str(tmp_path)
+    old = _prices('2024-01-01', 40, seed=1)
+    ps.write_prices('X', old, pd.Timestamp('2024-01-01'), pd.Timestamp('2024-02-26'), store)
+
+    fresh = _prices('2024-02-01', 40, seed=2)
+    changed_from = ps.write_prices('X', fresh, pd.Timestamp('2024-02-01'), pd.Timestamp('2024-03-28'), store)
+
+    expected = fresh.combine_first(old)
+    pd.testing.assert_series_equal(ps.read_prices('X', store_dir=store), expected, check_freq=False, check_index_type=False)
+    assert changed_from == fresh.index[0]
+    assert ps.read_coverage('X', store) == (pd.Timestamp('2024-01-01'), pd.Timestamp('2024-03-28'))
+
+def test_unchanged_rewrite_reports_nothing(tmp_path):
+    store = str(tmp_path)
+    prices = _prices('2024-01-01', 20)
+    ps.write_prices('X', prices, pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-29'), store)
+    assert ps.write_prices('X', prices.iloc[5:], pd.Timestamp('2024-01-08'), pd.Timestamp('2024-01-29'), store) is None
+
+    revised = prices.copy()
+    revised.iloc[12] *= 1.01
+    assert ps.write_prices('X', revised, pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-29'), store) == prices.index[12]
+
+def test_missing_ranges(tmp_path):
+    store = str(tmp_path)
+    start, end = pd.Timestamp('2024-02-01'), pd.Timestamp('2024-03-01')
+    assert ps.missing_ranges('X', start, end, store) == [(start, end)]
+
+    ps.write_prices('X', _prices('2024-02-01', 20), start, end, store)
+    assert ps.missing_ranges('X', start, end, store) == []
+    assert ps.missing_ranges('X', pd.Timestamp('2024-01-01'), pd.Timestamp('2024-04-01'), store) == [
+        (pd.Timestamp('2024-01-01'), start), (end, pd.Timestamp('2024-04-01'))
+    ]
+    # Coverage stays contiguous: a later request also fetches the gap
+    assert ps.missing_ranges('X', pd.Timestamp('2024-05-01'), pd.Timestamp('2024-06-01'), store) == [
+        (end, pd.Timestamp('2024-06-01'))
+    ]
+
+def test_concurrent_writers_of_one_ticker_keep_every_write(tmp_path):
+    store = str(tmp_path)
+    # Eight writers of adjacent four-week ranges of the same ticker
+    parts = [_prices(pd.Timestamp('2024-01-01') + pd.Timedelta(weeks=4 * i), 20, seed=i) for i in range(8)]
+
+    def write(part):
+        return ps.write_prices('X', part, part.index[0], part.index[-1] + pd.Timedelta(days=1), store)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(write, parts))
+
+    expected = pd.concat(parts).rename('X')
+    pd.testing.assert_series_equal(ps.read_prices('X', store_dir=store), expected, check_freq=False, check_index_type=False)
+    assert ps.read_coverage('X', store) == (parts[0].index[0], parts[-1].index[-1] + pd.Timedelta(days=1))
+    assert not [name for name in os.listdir(store) if name.endswith('.tmp')]
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('yfinance')
+
+from providers import FileProvider, SyntheticProvider
+
+def test_file_provider_reads_csv_in_range(tmp_path):
+    index = pd.bdate_range('2024-01-01', periods=30, name='Date')
+    frame = pd.DataFrame({'Close': np.arange(30.0) + 1, 'Adj Close': np.arange(30.0) + 0.5}, index=index)
+    frame.to_csv(tmp_path / '%5EGSPC.csv')
+    pd.Series(np.arange(30.0), index=index, name='Price').to_csv(tmp_path / 'ABC.csv')
+
+    data = FileProvider(str(tmp_path)).download(['^GSPC', 'ABC', 'NOPE'], '2024-01-05', '2024-01-20')
+    expected = frame.loc['2024-01-05':'2024-01-19', 'Adj Close']
+    assert list(data.columns) == ['^GSPC', 'ABC']
+    np.testing.assert_array_equal(data['^GSPC'].to_numpy(), expected.to_numpy())
+    np.testing.assert_array_equal(data.index.to_numpy(), expected.index.to_numpy())
+    np.testing.assert_array_equal(data['ABC'].to_numpy(), np.arange(30.0)[4:15])
+
+def test_synthetic_prices_do_not_depend_on_batch_or_window():
+    provider = SyntheticProvider(seed=4)
+    full = provider.download(['AAA', 'BBB', 'CCC'], '2020-01-01', '2024-01-01')
+    alone = provider.download(['BBB'], '2022-06-01', '2023-01-01')
+    pd.testing.assert_series_equal(alone['BBB'], full.loc['2022-06-01':'2022-12-31', 'BBB'])
+
+def test_synthetic_returns_follow_the_parameters():
+    provider = SyntheticProvider(seed=0, annual_return=0.1, annual_volatility=0.3, market_correlation=0.4)
+    prices = provider.download([f"T{i}" for i in range(40)], '1990-01-01', '2020-01-01')
+    returns = np.log(prices).diff().dropna()
+
+    np.testing.assert_allclose(returns.std().mean() * np.sqrt(252), 0.3, rtol=0.02)
+    corr = returns.corr().to_numpy()
+    np.testing.assert_allclose(corr[np.triu_indices(40, 1)].mean(), 0.4, atol=0.03)
+    drift = (0.1 - 0.5 * 0.3 ** 2) / 252
+    assert abs(returns.to_numpy().mean() - drift) < 4 * 0.3 / np.sqrt(252) / np.sqrt(len(returns))
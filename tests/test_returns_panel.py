@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+import metrics as mt
+
+def _prices(days=300, assets=6, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range('2022-01-03', periods=days)
+    prices = pd.DataFrame(100 * np.exp(rng.normal(0.0003, 0.01, (days, assets)).cumsum(axis=0)), index=index,
+                          columns=[f"T{i}" for i in range(assets)])
+    prices.iloc[[10, 11, 150], [2, 2, 5]] = np.nan
+    return prices
+
+def test_from_prices_matches_log_returns_frame():
+    prices = _prices()
+    expected = mt.calculate_log_returns(prices)
+    exact = mt.ReturnsPanel.from_prices(prices, dtype=np.float64, block_columns=4)
+    compact = mt.ReturnsPanel.from_prices(prices, block_columns=4)
+
+    pd.testing.assert_frame_equal(exact.to_frame(), expected, check_freq=False)
+    assert compact.dtype == np.float32 and compact.nbytes == expected.size * 4
+    np.testing.assert_allclose(compact.to_frame(), expected, rtol=1e-6, atol=1e-9)
+
+def test_statistics_match_float64_frame():
+    returns = mt.calculate_log_returns(_prices())
+    panel = mt.ReturnsPanel.from_returns(returns, dtype=np.float64)
+    weights = np.linspace(1, 2, 6) / np.linspace(1, 2, 6).sum()
+
+    pd.testing.assert_series_equal(panel.mean(), returns.mean(), rtol=1e-12)
+    pd.testing.assert_frame_equal(panel.cov(), returns.cov(), rtol=1e-10)
+    pd.testing.assert_frame_equal(panel.corr(), returns.corr(), rtol=1e-10)
+    pd.testing.assert_series_equal(panel.dot(weights), returns @ weights, rtol=1e-12, check_freq=False)
+    pd.testing.assert_series_equal(panel['T3'], returns['T3'], check_freq=False)
+    for method in ('ledoit_wolf', 'constant_correlation'):
+        np.testing.assert_allclose(np.asarray(mt.calculate_covariance_matrix(panel, method)),
+                                   np.asarray(mt.calculate_covariance_matrix(returns, method)), rtol=1e-10)
+
+    subset = panel.select(index=returns.index[50:100], columns=['T4', 'T1'])
+    pd.testing.assert_frame_equal(subset.to_frame(), returns.iloc[50:100][['T4', 'T1']], check_freq=False)
+
+def test_memory_mapped_panel_round_trip(tmp_path):
+    prices = _prices()
+    path = str(tmp_path / 'returns.npy')
+    written = mt.ReturnsPanel.from_prices(prices, path=path)
+    reopened = mt.ReturnsPanel.open(path)
+
+    assert isinstance(reopened.values, np.memmap)
+    np.testing.assert_array_equal(reopened.values, written.values)
+    assert list(reopened.columns) == list(prices.columns)
+    np.testing.assert_array_equal(pd.DatetimeIndex(reopened.index).to_numpy(), written.index.to_numpy())
+    np.testing.assert_allclose(reopened.cov(), written.to_frame().cov(), rtol=1e-10)
@@ -0,0 +1,73 @@
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+import risk
+
+def _returns(days=1000, assets=3, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range('2020-01-01', periods=days)
+    return pd.DataFrame(rng.standard_t(4, (days, assets)) * 0.01, index=index, columns=['A', 'B', 'C'])
+
+def _reference_tail(outcomes, q):
+    # VaR is the (1 - q) quantile loss, ES the mean of the worst ceil((1 - q) n) outcomes
+    worst = np.sort(outcomes)[:int(np.ceil((1 - q) * len(outcomes)))]
+    return -np.quantile(outcomes, 1 - q), -worst.mean()
+
+def test_historical_var_matches_per_portfolio_quantiles():
+    returns = _returns()
+    weights = np.array([[0.5, 0.3, 0.2], [0.0, 0.0, 1.0]])
+    for horizon in (1, 10):
+        result = risk.historical_var(returns, weights, (0.95, 0.99), horizon_days=horizon, portfolios=['mix', 'C'])
+        summed = returns.rolling(horizon).sum().dropna()
+        for name, w in zip(['mix', 'C'], weights):
+            outcomes = (np.expm1(summed) @ w).to_numpy()
+            for q in (0.95, 0.99):
+                row = result[(result['portfolio'] == name) & (result['confidence'] == q)].iloc[0]
+                np.testing.assert_allclose([row['var'], row['es']], _reference_tail(outcomes, q), rtol=1e-10)
+
+def test_parametric_var_matches_normal_distribution():
+    mu = np.array([0.0005, 0.0002, 0.0008])
+    cov = np.array([[1.0, 0.3, 0.2], [0.3, 0.5, 0.1], [0.2, 0.1, 2.0]]) * 1e-4
+    w = np.array([0.2, 0.5, 0.3])
+    result = risk.parametric_var(w, mu, cov, (0.95, 0.99), horizon_days=5)
+
+    dist = NormalDist(5 * w @ mu, np.sqrt(5 * w @ cov @ w))
+    for q, (_, row) in zip((0.95, 0.99), result.iterrows()):
+        threshold = dist.inv_cdf(1 - q)
+        # ES by integrating x over the tail of the density
+        x = np.linspace(dist.mean - 12 * dist.stdev, threshold, 4001)
+        weighted = x * np.array([dist.pdf(v) for v in x])
+        tail_mean = ((weighted[1:] + weighted[:-1]) / 2 * np.diff(x)).sum() / (1 - q)
+        np.testing.assert_allclose(row['var'], -threshold, rtol=1e-12)
+        np.testing.assert_allclose(row['es'], -tail_mean, rtol=1e-5)
+
+def test_monte_carlo_var_uses_terminal_returns():
+    rng = np.random.default_rng(1)
+    terminal = 10000 * np.exp(rng.normal(0.05, 0.2, (20000, 2)))
+    result = risk.monte_carlo_var(terminal, 10000, (0.95,))
+    for j in range(2):
+        np.testing.assert_allclose(result.loc[j, ['var', 'es']].to_numpy(float), _reference_tail(terminal[:, j] / 10000 - 1, 0.95))
+
+def _reference_drawdown(nav):
+    peak, max_dd, longest, since_peak = nav[0], 0.0, 0, 0
+    for value in nav:
+        if value >= peak:
+            peak, since_peak = value, 0
+        else:
+            since_peak += 1
+        max_dd = max(max_dd, 1 - value / peak)
+        longest = max(longest, since_peak)
+    return max_dd, longest, 1 - nav[-1] / peak
+
+def test_drawdown_statistics_match_a_loop():
+    rng = np.random.default_rng(2)
+    navs = pd.DataFrame(100 * np.exp(rng.normal(0, 0.02, (300, 4)).cumsum(axis=0)), columns=list('wxyz'))
+    navs['flat'] = 100.0
+    result = risk.drawdown_statistics(navs)
+    for name in navs.columns:
+        expected = _reference_drawdown(navs[name].to_numpy())
+        np.testing.assert_allclose(result.loc[name].to_numpy(float), expected, rtol=1e-12, atol=1e-15)
+    single = risk.drawdown_statistics(navs['w'].to_numpy())
+    np.testing.assert_allclose(single.iloc[0].to_numpy(float), _reference_drawdown(navs['w'].to_numpy()))
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+import metrics as mt
+
+def _returns(days=300, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range('2022-01-03', periods=days)
+    bench = pd.Series(rng.normal(0.0004, 0.01, days), index=index)
+    assets = pd.DataFrame(
+        0.8 * bench.to_numpy()[:, np.newaxis] + rng.normal(0.0002, 0.012, (days, 3)),
+        index=index, columns=['A', 'B', 'C']
+    )
+    return assets, bench
+
+def test_rolling_metrics_match_pandas_rolling():
+    assets, bench = _returns()
+    window, rf = 63, 0.02
+    result = mt.calculate_rolling_metrics(assets, bench, window=window, risk_free_rate=rf)
+
+    rolling = assets.rolling(window)
+    volatility = rolling.std() * np.sqrt(252)
+    sharpe = (rolling.mean() * 252 - rf) / volatility
+    beta = rolling.cov(bench).div(bench.rolling(window).var(), axis=0)
+    correlation = rolling.corr(bench)
+
+    for name, expected in [('volatility', volatility), ('sharpe', sharpe), ('beta', beta), ('correlation', correlation)]:
+        pd.testing.assert_frame_equal(result[name], expected, rtol=1e-8)
+
+def test_rolling_metrics_series_input():
+    assets, bench = _returns()
+    result = mt.calculate_rolling_metrics(assets['A'], bench, window=21)
+    expected = assets['A'].rolling(21).std() * np.sqrt(252)
+    np.testing.assert_allclose(result['volatility'].to_numpy(), expected.to_numpy(), rtol=1e-8)
+
+def test_rolling_metrics_shorter_than_window_are_nan():
+    assets, bench = _returns(days=40)
+    result = mt.calculate_rolling_metrics(assets, bench, window=63)
+    for values in result.values():
+        assert values.shape == (40, 3)
+        assert values.isna().all().all()
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import metrics as mt
+import stats_cache as sc
+
+def test_hits_reuse_computed_values():
+    cache = sc.StatsCache()
+    calls = []
+    compute = lambda: calls.append(1) or np.arange(3)
+    first = cache.get_or_compute('stat', 'k', compute)
+    second = cache.get_or_compute('stat', 'k', compute)
+    assert first is second
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_least_recently_used_entries_are_evicted():
+    cache = sc.StatsCache(max_bytes=2500)
+    for key in 'abc':
+        cache.get_or_compute('stat', key, lambda: np.zeros(100))
+    cache.get_or_compute('stat', 'a', lambda: None)
+    cache.get_or_compute('stat', 'd', lambda: np.zeros(100))
+    assert cache.current_bytes <= cache.max_bytes
+    assert isinstance(cache.get_or_compute('stat', 'a', lambda: 'recomputed'), np.ndarray)
+    assert cache.get_or_compute('stat', 'b', lambda: 'recomputed') == 'recomputed'
+
+def test_invalidate_drops_tagged_entries_only():
+    cache = sc.StatsCache()
+    cache.get_or_compute('fx_converted', 'k1', lambda: pd.Series([1.0]), tags=['ZARUSD=X'])
+    cache.get_or_compute('fx_converted', 'k2', lambda: pd.Series([2.0]), tags=['EURUSD=X'])
+    cache.get_or_compute('log_returns', 'k3', lambda: pd.Series([3.0]))
+    assert cache.invalidate(['ZARUSD=X', 'AAPL']) == 1
+    assert len(cache) == 2
+    assert cache.get_or_compute('fx_converted', 'k1', lambda: 'recomputed') == 'recomputed'
+    assert cache.current_bytes == sum(size for _, size, _ in cache._entries.values())
+
+def test_fingerprint_is_content_based():
+    index = pd.bdate_range('2024-01-01', periods=5)
+    df = pd.DataFrame({'A': np.arange(5.0)}, index=index)
+    assert sc.fingerprint(df, 0.02, ('AAA', 'BBB')) == sc.fingerprint(df.copy(), 0.02, ('AAA', 'BBB'))
+    assert sc.fingerprint(df) != sc.fingerprint(df.rename(columns={'A': 'B'}))
+    assert sc.fingerprint(df) != sc.fingerprint(df + 1e-12)
+    assert sc.fingerprint([1, 2]) != sc.fingerprint([[1, 2]])
+    assert sc.fingerprint({'a': 1, 'b': 2}) == sc.fingerprint({'b': 2, 'a': 1})
+
+def test_fingerprint_hashes_estimator_objects_by_contents():
+    rng = np.random.default_rng(0)
+    returns = pd.DataFrame(rng.normal(0, 0.01, (200, 8)))
+    first = mt.FactorCovariance.from_returns(returns, num_factors=2)
+    second = mt.FactorCovariance.from_returns(returns.copy(), num_factors=2)
+    other = mt.FactorCovariance.from_returns(returns, num_factors=3)
+    assert first is not second
+    assert sc.fingerprint(first) == sc.fingerprint(second)
+    assert sc.fingerprint(first) != sc.fingerprint(other)
+
+def test_fingerprint_rejects_unsupported_types():
+    with pytest.raises(TypeError):
+        sc.fingerprint(lambda: None)
+    with pytest.raises(TypeError):
+        sc.fingerprint(object())
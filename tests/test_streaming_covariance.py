@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+import metrics as mt
+
+def _returns(days=500, assets=4, seed=0):
+    rng = np.random.default_rng(seed)
+    mix = rng.normal(0, 1, (assets, assets))
+    index = pd.bdate_range('2022-01-03', periods=days)
+    return pd.DataFrame(rng.normal(0.001, 0.01, (days, assets)) @ mix + 0.002, index=index,
+                        columns=[f"A{i}" for i in range(assets)])
+
+def test_chunked_updates_match_pandas():
+    returns = _returns()
+    estimator = mt.StreamingCovariance(columns=returns.columns)
+    for start in range(0, len(returns), 37):
+        estimator.update(returns.iloc[start:start + 37])
+    estimator.update(returns.iloc[0].to_numpy() * np.nan)
+
+    pd.testing.assert_series_equal(estimator.mean, returns.mean(), rtol=1e-12)
+    pd.testing.assert_frame_equal(estimator.cov, returns.cov(), rtol=1e-10)
+    pd.testing.assert_frame_equal(estimator.corr, returns.corr(), rtol=1e-10)
+    assert estimator.count == len(returns)
+
+def test_single_rows_and_merge_match_one_batch():
+    returns = _returns(days=120)
+    rows = mt.StreamingCovariance(4)
+    for row in returns.to_numpy():
+        rows.update(row)
+    left = mt.StreamingCovariance.from_returns(returns.iloc[:50])
+    right = mt.StreamingCovariance.from_returns(returns.iloc[50:])
+    merged = left.merge(right)
+
+    for estimator in (rows, merged):
+        np.testing.assert_allclose(np.asarray(estimator.mean), returns.mean().to_numpy(), rtol=1e-12)
+        np.testing.assert_allclose(np.asarray(estimator.cov), returns.cov().to_numpy(), rtol=1e-10)
+
+def test_nan_rows_are_skipped_like_dropna():
+    returns = _returns(days=200)
+    returns.iloc[[3, 50, 120], [1, 2, 0]] = np.nan
+    estimator = mt.StreamingCovariance.from_returns(returns)
+    pd.testing.assert_frame_equal(estimator.cov, returns.dropna().cov(), rtol=1e-10)
+
+def test_decay_matches_weighted_covariance():
+    returns = _returns(days=300)
+    decay = 0.97
+    # Newest row weight 1, the one before decay, ...
+    weights = decay ** np.arange(len(returns) - 1, -1, -1)
+
+    streamed = mt.StreamingCovariance(columns=returns.columns, decay=decay)
+    for start in range(0, len(returns), 64):
+        streamed.update(returns.iloc[start:start + 64])
+    merged = mt.StreamingCovariance.from_returns(returns.iloc[:100], decay=decay).merge(
+        mt.StreamingCovariance.from_returns(returns.iloc[100:], decay=decay)
+    )
+
+    for estimator in (streamed, merged):
+        np.testing.assert_allclose(np.asarray(estimator.mean), np.average(returns, axis=0, weights=weights), rtol=1e-10)
+        np.testing.assert_allclose(np.asarray(estimator.cov), np.cov(returns, rowvar=False, aweights=weights), rtol=1e-10)
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+import backtest as bt
+import metrics as mt
+import walk_forward as wf
+
+def _prices(days=500, assets=4, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range('2021-01-04', periods=days)
+    drift = rng.normal(0.0004, 0.0003, assets)
+    returns = drift + rng.normal(0, 0.012, (days, assets))
+    return pd.DataFrame(100 * np.exp(returns.cumsum(axis=0)), index=index, columns=[f"A{i}" for i in range(assets)])
+
+def _reference_windows(num_rows, train_days, test_days, step):
+    windows, start = [], 0
+    while start + train_days + test_days < num_rows:
+        windows.append((start, start + train_days, start + train_days + test_days))
+        start += step
+    return windows
+
+def test_windows_tile_the_panel_without_lookahead():
+    for num_rows, train, test, step in [(500, 252, 63, 63), (316, 252, 63, 21), (315, 252, 63, 63), (100, 252, 63, 63)]:
+        windows = wf.walk_forward_windows(num_rows, train, test, step)
+        assert windows == _reference_windows(num_rows, train, test, step)
+        assert all(test_end <= num_rows - 1 for _, _, test_end in windows)
+
+def test_walk_forward_rows_match_a_manual_window():
+    prices = _prices()
+    grid = {'optimizer': ['max_sharpe', 'min_variance'], 'train_days': [200], 'rebalance': ['monthly'], 'cost_bps': [5.0]}
+    results = wf.run_walk_forward(prices, grid, test_days=50, risk_free_rate=0.02)
+    assert len(results) == 2 * len(wf.walk_forward_windows(len(prices), 200, 50))
+
+    row = results[results['optimizer'] == 'min_variance'].iloc[1]
+    train_start, train_end, test_end = wf.walk_forward_windows(len(prices), 200, 50)[1]
+    train_returns = mt.calculate_log_returns(prices.iloc[train_start:train_end + 1])
+    frontier = mt.solve_efficient_frontier(train_returns.mean(), train_returns.cov(), risk_free_rate=0.02)
+    weights = frontier['min_variance']['weights']
+    backtest = bt.run_backtest(prices.iloc[train_end:test_end + 1], weights, rebalance='monthly', cost_bps=5.0)
+
+    nav = backtest['nav']
+    oos = np.log(nav).diff().dropna()
+    assert row['test_start'] == prices.index[train_end]
+    np.testing.assert_allclose(row['period_return'], nav.iloc[-1] / nav.iloc[0] - 1, rtol=1e-8)
+    np.testing.assert_allclose(row['sharpe'], (oos.mean() * 252 - 0.02) / (oos.std() * np.sqrt(252)), rtol=1e-8)
+    np.testing.assert_allclose(row['max_drawdown'], (nav / nav.cummax() - 1).min(), rtol=1e-8)
+    np.testing.assert_allclose(row['max_weight'], weights.max(), rtol=1e-8)
+
+def test_workers_match_in_process_run_and_summary_compounds():
+    prices = _prices(days=400, seed=1)
+    grid = {'optimizer': ['equal_weight', 'max_sharpe'], 'train_days': [120]}
+    serial = wf.run_walk_forward(prices, grid, test_days=40)
+    parallel = wf.run_walk_forward(prices, grid, test_days=40, workers=2)
+    pd.testing.assert_frame_equal(parallel, serial)
+
+    summary = wf.summarize_walk_forward(serial).set_index('optimizer')
+    for optimizer, rows in serial.groupby('optimizer'):
+        np.testing.assert_allclose(summary.loc[optimizer, 'compounded_return'], (1 + rows['period_return']).prod() - 1)
+        assert summary.loc[optimizer, 'num_windows'] == len(rows)
@@ -1,14 +1,104 @@
 import plotly.graph_objects as go
 import plotly.express as px
+from plotly.subplots import make_subplots
+import numpy as np
 import pandas as pd
 
-def plot_cumulative_returns(portfolio_cum_returns, benchmark_cum_returns=None, benchmark_name="Benchmark"):
+try:
+    from . import instrumentation as ins
+    from . import metrics as mt
+except ImportError:
+    import instrumentation as ins
+    import metrics as mt
+
+# Payload bounds: line traces are downsampled to at most MAX_LINE_POINTS points and frontier
+# clouds above MAX_SCATTER_POINTS are binned. Pass max_points=None to plot every point.
+MAX_LINE_POINTS = 2000
+MAX_SCATTER_POINTS = 5000
+# Correlation heatmaps print cell values up to this many assets (n^2 text labels)
+MAX_ANNOTATED_ASSETS = 30
+
+def _numeric(values):
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[ns]').astype(np.int64).astype(float)
+    return values.astype(float)
+
+def lttb_indices(x, y, num_points):
+    """
+    Largest-Triangle-Three-Buckets: positions of num_points points (first and last always
+    included) that preserve the visual shape of the line through (x, y).
+    """
+    n = len(y)
+    if num_points >= n or num_points < 3:
+        return np.arange(n)
+    x = _numeric(x)
+    y = np.asarray(y, dtype=float)
+
+    # Interior points fall in num_points - 2 buckets; each picks the point forming the
+    # largest triangle with the previous pick and the average of the next bucket
+    edges = (np.arange(num_points - 1) * (n - 2) / (num_points - 2)).astype(int) + 1
+    edges[-1] = n - 1
+    selected = np.empty(num_points, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(num_points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+def minmax_indices(y, num_points):
+    """
+    Min-max decimation: the positions of the lowest and highest value in each of
+    num_points / 2 equal buckets (plus both end points), fully vectorized.
+    Keeps every peak and trough, e.g. drawdown lows.
+    """
+    n = len(y)
+    if num_points >= n or num_points < 4:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    size = int(np.ceil(n / (num_points // 2)))
+    num_buckets = int(np.ceil(n / size))
+    padded = np.full(num_buckets * size, np.nan)
+    padded[:n] = y
+    buckets = np.where(np.isnan(padded), np.inf, padded).reshape(num_buckets, size)
+    low = buckets.argmin(axis=1)
+    buckets = np.where(np.isnan(padded), -np.inf, padded).reshape(num_buckets, size)
+    high = buckets.argmax(axis=1)
+    offsets = np.arange(num_buckets) * size
+    return np.unique(np.concatenate([[0, n - 1], offsets + low, offsets + high]))
+
+def downsample(series, max_points=MAX_LINE_POINTS, method='lttb'):
+    """
+    Downsamples a Series for display to at most about max_points points ('lttb' or 'minmax').
+    Shorter series and max_points=None return the series unchanged.
+    """
+    if max_points is None or len(series) <= max_points:
+        return series
+    if method == 'lttb':
+        positions = lttb_indices(series.index, series.to_numpy(), max_points)
+    elif method == 'minmax':
+        positions = minmax_indices(series.to_numpy(), max_points)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    return series.iloc[positions]
+
+@ins.instrument()
+def plot_cumulative_returns(portfolio_cum_returns, benchmark_cum_returns=None, benchmark_name="Benchmark",
+                            max_points=MAX_LINE_POINTS, downsample_method='lttb'):
     """
     Plots the cumulative returns of the portfolio and an optional benchmark.
     
     Args:
         portfolio_cum_returns (pd.Series): Cumulative returns of the portfolio.
         benchmark_cum_returns (pd.Series, optional): Cumulative returns of the benchmark.
+        max_points (int, optional): Points per line after downsampling (None plots every day).
+        downsample_method (str): 'lttb' or 'minmax'.
         
     Returns:
         plotly.graph_objects.Figure
@@ -16,7 +106,7 @@ def plot_cumulative_returns(portfolio_cum_returns, benchmark_cum_returns=None, b
     fig = go.Figure()
     
     # Convert to percentage return (Growth of $1 -> % Gain/Loss)
-    portfolio_cum_returns = portfolio_cum_returns - 1
+    portfolio_cum_returns = downsample(portfolio_cum_returns, max_points, downsample_method) - 1
     
     # Portfolio Line
     fig.add_trace(go.Scatter(
@@ -29,7 +119,7 @@ def plot_cumulative_returns(portfolio_cum_returns, benchmark_cum_returns=None, b
     
     # Benchmark Line
     if benchmark_cum_returns is not None:
-        benchmark_cum_returns = benchmark_cum_returns - 1
+        benchmark_cum_returns = downsample(benchmark_cum_returns, max_points, downsample_method) - 1
         fig.add_trace(go.Scatter(
             x=benchmark_cum_returns.index, 
             y=benchmark_cum_returns,
@@ -53,45 +143,199 @@ def plot_cumulative_returns(portfolio_cum_returns, benchmark_cum_returns=None, b
     
     return fig
 
-def plot_correlation_heatmap(correlation_matrix):
+@ins.instrument()
+def plot_rolling_metrics(rolling_metrics, benchmark_name="Benchmark", window=None, max_points=MAX_LINE_POINTS):
+    """
+    Plots rolling volatility, Sharpe ratio, beta and correlation of the portfolio.
+    
+    Args:
+        rolling_metrics (dict): Output of metrics.calculate_rolling_metrics for a single portfolio (Series values).
+        benchmark_name (str): Name of the benchmark used for beta and correlation.
+        window (int, optional): Window length in trading days, shown in the title.
+        max_points (int, optional): Points per panel after LTTB downsampling (None plots every day).
+        
+    Returns:
+        plotly.graph_objects.Figure
+    """
+    panels = [
+        ('volatility', 'Volatility', '.0%'),
+        ('sharpe', 'Sharpe Ratio', '.1f'),
+        ('beta', f'Beta vs {benchmark_name}', '.2f'),
+        ('correlation', f'Correlation vs {benchmark_name}', '.2f'),
+    ]
+    fig = make_subplots(rows=len(panels), cols=1, shared_xaxes=True, vertical_spacing=0.04,
+                        subplot_titles=[label for _, label, _ in panels])
+    
+    for row, (key, label, fmt) in enumerate(panels, start=1):
+        series = downsample(rolling_metrics[key].dropna(), max_points)
+        fig.add_trace(go.Scatter(
+            x=series.index,
+            y=series,
+            mode='lines',
+            name=label,
+            line=dict(color='#00C9FF', width=2)
+        ), row=row, col=1)
+        fig.update_yaxes(tickformat=fmt, row=row, col=1)
+    
+    title = 'Rolling Risk Metrics' if window is None else f'Rolling Risk Metrics ({window}-Day Window)'
+    fig.update_layout(
+        title=title,
+        template='plotly_white',
+        hovermode="x unified",
+        showlegend=False,
+        height=800
+    )
+    
+    return fig
+
+@ins.instrument()
+def plot_correlation_heatmap(correlation_matrix, cluster=False, annotate=None, compact=False):
     """
     Plots a heatmap of the correlation matrix.
+
+    Args:
+        correlation_matrix (pd.DataFrame): e.g. metrics.correlation_from_covariance(cov_matrix).
+        cluster (bool): Reorder assets by hierarchical clustering so correlated groups form blocks.
+        annotate (bool, optional): Print values in the cells; by default only up to
+            MAX_ANNOTATED_ASSETS assets, since every cell adds a text label.
+        compact (bool): Send the matrix as float32 (a base64 typed array with plotly >= 6)
+            with values shown on hover, halving the payload of large heatmaps.
+
+    Returns:
+        plotly.graph_objects.Figure
     """
+    if cluster:
+        order = mt.cluster_order(correlation_matrix)
+        correlation_matrix = correlation_matrix.iloc[order, order]
+    if annotate is None:
+        annotate = len(correlation_matrix) <= MAX_ANNOTATED_ASSETS
+
+    if compact:
+        labels = [str(c) for c in correlation_matrix.columns]
+        fig = px.imshow(
+            correlation_matrix.to_numpy(dtype=np.float32),
+            x=labels,
+            y=labels,
+            text_auto='.2f' if annotate else False,
+            aspect="auto",
+            color_continuous_scale='RdBu_r',
+            title="Asset Correlation Matrix"
+        )
+        fig.update_traces(hovertemplate='%{y} / %{x}<br>Correlation %{z:.2f}<extra></extra>')
+        return fig
+
     fig = px.imshow(
         correlation_matrix, 
-        text_auto=True, 
+        text_auto=annotate, 
         aspect="auto",
         color_continuous_scale='RdBu_r',
         title="Asset Correlation Matrix"
     )
     return fig
 
-def plot_efficient_frontier_chart(results_array, portfolio_vol=None, portfolio_return=None):
+def _frontier_density(returns, volatilities, sharpes, bins):
+    """
+    Bins the frontier cloud on a bins x bins (volatility, return) grid.
+    Returns cell centers, the mean Sharpe ratio per cell (NaN where empty) and counts.
+    """
+    vol_edges = np.linspace(volatilities.min(), volatilities.max(), bins + 1)
+    ret_edges = np.linspace(returns.min(), returns.max(), bins + 1)
+    vol_bin = np.clip(np.searchsorted(vol_edges, volatilities, side='right') - 1, 0, bins - 1)
+    ret_bin = np.clip(np.searchsorted(ret_edges, returns, side='right') - 1, 0, bins - 1)
+    cell = ret_bin * bins + vol_bin
+
+    counts = np.bincount(cell, minlength=bins * bins)
+    sharpe_sums = np.bincount(cell, weights=sharpes, minlength=bins * bins)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_sharpe = np.where(counts > 0, sharpe_sums / counts, np.nan)
+    vol_centers = (vol_edges[:-1] + vol_edges[1:]) / 2
+    ret_centers = (ret_edges[:-1] + ret_edges[1:]) / 2
+    return vol_centers, ret_centers, mean_sharpe.reshape(bins, bins), counts.reshape(bins, bins)
+
+@ins.instrument()
+def plot_efficient_frontier_chart(results_array, portfolio_vol=None, portfolio_return=None, frontier=None,
+                                  cloud='auto', max_points=MAX_SCATTER_POINTS, density_bins=120):
     """
     Plots the efficient frontier simulation and optionally highlights the current portfolio.
     results_array: [returns, volatilities, sharpe_ratios]
     portfolio_vol: float, optional - Current portfolio volatility
     portfolio_return: float, optional - Current portfolio return
+    frontier: dict, optional - Output of metrics.solve_efficient_frontier, drawn as an overlay
+    cloud: how the simulated portfolios are drawn
+        'svg'     - every point as an SVG scatter
+        'webgl'   - a WebGL scatter of at most max_points evenly strided samples
+        'density' - a density_bins x density_bins heatmap of the mean Sharpe ratio per cell
+        'auto'    - 'svg' up to max_points portfolios, 'density' above
+    The payload of 'webgl' and 'density' does not grow with the number of simulations.
     """
-    df = pd.DataFrame({
-        'Return': results_array[0],
-        'Volatility': results_array[1],
-        'Sharpe': results_array[2]
-    })
-    
-    # Use render_mode='svg' to ensure consistent z-ordering (DOM order)
-    # This guarantees the star trace added later sits ON TOP of the points
-    fig = px.scatter(
-        df, x='Volatility', y='Return', color='Sharpe',
-        color_continuous_scale='Viridis',
-        title='Efficient Frontier Simulation',
-        labels={'Sharpe': 'Sharpe Ratio'},
-        render_mode='svg'
-    )
+    returns = np.asarray(results_array[0], dtype=float)
+    volatilities = np.asarray(results_array[1], dtype=float)
+    sharpes = np.asarray(results_array[2], dtype=float)
+    if cloud == 'auto':
+        cloud = 'svg' if max_points is None or len(returns) <= max_points else 'density'
+    if cloud not in ('svg', 'webgl', 'density'):
+        raise ValueError(f"Unknown frontier cloud mode: {cloud}")
+
+    # WebGL traces are drawn above all SVG traces, so with a WebGL cloud the overlays
+    # must be WebGL too for the star to stay on top
+    Scatter = go.Scattergl if cloud == 'webgl' else go.Scatter
+
+    if cloud == 'density':
+        vol_centers, ret_centers, mean_sharpe, counts = _frontier_density(returns, volatilities, sharpes, density_bins)
+        fig = go.Figure(go.Heatmap(
+            x=vol_centers,
+            y=ret_centers,
+            z=mean_sharpe,
+            customdata=counts,
+            colorscale='Viridis',
+            colorbar=dict(title='Sharpe Ratio'),
+            hovertemplate='Volatility %{x:.1%}<br>Return %{y:.1%}<br>Sharpe %{z:.2f}<br>%{customdata} portfolios<extra></extra>',
+            name='Simulated Portfolios'
+        ))
+        fig.update_layout(title='Efficient Frontier Simulation', template='plotly_white')
+    else:
+        if cloud == 'webgl' and max_points is not None and len(returns) > max_points:
+            # Portfolios are independent draws, so an even stride is an unbiased sample
+            keep = np.linspace(0, len(returns) - 1, max_points).astype(int)
+            returns, volatilities, sharpes = returns[keep], volatilities[keep], sharpes[keep]
+        df = pd.DataFrame({
+            'Return': returns,
+            'Volatility': volatilities,
+            'Sharpe': sharpes
+        })
+        
+        # render_mode='svg' keeps z-ordering consistent (DOM order), so the star trace
+        # added later sits ON TOP of the points
+        fig = px.scatter(
+            df, x='Volatility', y='Return', color='Sharpe',
+            color_continuous_scale='Viridis',
+            title='Efficient Frontier Simulation',
+            labels={'Sharpe': 'Sharpe Ratio'},
+            render_mode='webgl' if cloud == 'webgl' else 'svg'
+        )
 
-    # Add Current Portfolio Marker
+    # Exact Frontier Overlay
+    if frontier is not None:
+        fig.add_trace(Scatter(
+            x=frontier['results'][1],
+            y=frontier['results'][0],
+            mode='lines',
+            line=dict(color='white', width=2),
+            name='Efficient Frontier'
+        ))
+        for key, label, symbol in [('min_variance', 'Min Variance', 'diamond'), ('max_sharpe', 'Max Sharpe', 'circle')]:
+            point = frontier[key]
+            fig.add_trace(Scatter(
+                x=[point['volatility']],
+                y=[point['return']],
+                mode='markers',
+                marker=dict(color='white', size=11, symbol=symbol, line=dict(width=2, color='black')),
+                name=label
+            ))
+
+    # Add Current Portfolio Marker (added last, so it is drawn on top)
     if portfolio_vol is not None and portfolio_return is not None:
-        fig.add_trace(go.Scatter(
+        fig.add_trace(Scatter(
             x=[portfolio_vol],
             y=[portfolio_return],
             mode='markers',
@@ -115,23 +359,41 @@ def plot_efficient_frontier_chart(results_array, portfolio_vol=None, portfolio_r
             title='Annual Volatility'
         )
     )
+    if cloud == 'density':
+        # Keep the overlay legend clear of the heatmap colorbar
+        fig.update_layout(legend=dict(yanchor="top", y=0.99, xanchor="left", x=0.01))
 
     return fig
 
-def plot_monte_carlo_simulation(simulation_df):
+@ins.instrument()
+def plot_monte_carlo_simulation(simulation_df, max_points=MAX_LINE_POINTS):
     """
     Plots the Monte Carlo simulation results with median and confidence intervals.
     """
-    # Calculate percentiles
-    median_path = simulation_df.median(axis=1)
-    p05_path = simulation_df.quantile(0.05, axis=1)
-    p95_path = simulation_df.quantile(0.95, axis=1)
+    # Calculate percentiles (one pass over the paths matrix instead of three quantile calls)
+    p05, p50, p95 = np.percentile(simulation_df.to_numpy(dtype=float), [5, 50, 95], axis=1)
+    bands = pd.DataFrame({5: p05, 50: p50, 95: p95}, index=simulation_df.index)
+    return plot_monte_carlo_bands(bands, max_points)
+
+@ins.instrument()
+def plot_monte_carlo_bands(bands, max_points=MAX_LINE_POINTS):
+    """
+    Plots precomputed Monte Carlo percentile bands (e.g. from metrics.PercentileReducer).
+    bands: DataFrame indexed by day with columns 5, 50 and 95
+    max_points: days kept after downsampling (None plots every day); the days are chosen by
+    LTTB on the median and shared by all three bands so the filled interval stays aligned
+    """
+    if max_points is not None and len(bands) > max_points:
+        bands = bands.iloc[lttb_indices(bands.index, bands[50].to_numpy(), max_points)]
+    p05_path = bands[5]
+    median_path = bands[50]
+    p95_path = bands[95]
     
     fig = go.Figure()
     
     # 5th Percentile (Lower Bound) - Hidden line for fill
     fig.add_trace(go.Scatter(
-        x=simulation_df.index,
+        x=bands.index,
         y=p05_path,
         mode='lines',
         line=dict(width=0),
@@ -141,7 +403,7 @@ def plot_monte_carlo_simulation(simulation_df):
     
     # 95th Percentile (Upper Bound) - Fills to previous trace
     fig.add_trace(go.Scatter(
-        x=simulation_df.index,
+        x=bands.index,
         y=p95_path,
         mode='lines',
         line=dict(width=0),
@@ -152,7 +414,7 @@ def plot_monte_carlo_simulation(simulation_df):
     
     # Median Path
     fig.add_trace(go.Scatter(
-        x=simulation_df.index,
+        x=bands.index,
         y=median_path,
         mode='lines',
         line=dict(color='#00C9FF', width=3),
@@ -0,0 +1,165 @@
+"""
+Walk-forward optimization: re-estimate weights on a rolling training window, hold them
+over the following test window, and collect out-of-sample results for a parameter grid.
+
+Windows x parameter combinations fan out over a process pool. The price panel is placed
+in shared memory once, so workers read it in place instead of receiving a pickled copy
+per task.
+"""
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+try:
+    from . import metrics as mt
+    from . import backtest as bt
+except ImportError:
+    import metrics as mt
+    import backtest as bt
+
+OPTIMIZERS = ('max_sharpe', 'min_variance', 'equal_weight')
+
+DEFAULT_GRID = {
+    'optimizer': ['max_sharpe', 'min_variance', 'equal_weight'],
+    'train_days': [252],
+    'rebalance': ['none'],
+    'cost_bps': [10.0],
+}
+
+# Worker-side view of the shared price panel, set by _attach_panel
+_PANEL = {}
+
+def walk_forward_windows(num_rows, train_days=252, test_days=63, step=None):
+    """
+    Returns (train_start, train_end, test_end) row positions of each window.
+    Weights are estimated on prices[train_start:train_end + 1] and held over
+    prices[train_end:test_end + 1], i.e. bought at the close of the last training day.
+    """
+    step = step or test_days
+    return [
+        (start, start + train_days, start + train_days + test_days)
+        for start in range(0, num_rows - train_days - test_days, step)
+    ]
+
+def optimize_weights(mean_returns, cov_matrix, optimizer='max_sharpe', risk_free_rate=0.0):
+    """
+    Long-only weights for the given optimizer: 'max_sharpe', 'min_variance' or 'equal_weight'.
+    """
+    if optimizer == 'equal_weight':
+        return np.full(len(mean_returns), 1 / len(mean_returns))
+    if optimizer not in OPTIMIZERS:
+        raise ValueError(f"Unknown optimizer: {optimizer}")
+    # Two frontier points are enough: only the tangency / minimum-variance portfolios are used
+    frontier = mt.solve_efficient_frontier(mean_returns, cov_matrix, num_points=2, risk_free_rate=risk_free_rate)
+    return frontier[optimizer]['weights']
+
+def _attach_panel(shm_name, shape, dtype, index_values, columns, risk_free_rate):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _PANEL.update(
+        shm=shm,  # keep a reference so the buffer stays mapped
+        prices=np.ndarray(shape, dtype=dtype, buffer=shm.buf),
+        index=pd.DatetimeIndex(index_values),
+        columns=columns,
+        risk_free_rate=risk_free_rate,
+    )
+
+def _run_task(task):
+    """
+    Estimates weights on one training window and evaluates them out of sample.
+    """
+    (train_start, train_end, test_end), params = task
+    prices = _PANEL['prices']
+    rf = _PANEL['risk_free_rate']
+
+    train = prices[train_start:train_end + 1]
+    train_returns = np.log(train[1:] / train[:-1])
+    weights = optimize_weights(
+        train_returns.mean(axis=0), np.cov(train_returns, rowvar=False), params['optimizer'], rf
+    )
+
+    test = pd.DataFrame(prices[train_end:test_end + 1], index=_PANEL['index'][train_end:test_end + 1])
+    result = bt.run_backtest(test, weights, rebalance=params['rebalance'], cost_bps=params['cost_bps'])
+
+    nav = result['nav'].to_numpy()
+    oos_returns = np.diff(np.log(nav))
+    oos_return = oos_returns.mean() * 252
+    oos_vol = oos_returns.std(ddof=1) * np.sqrt(252)
+    oos_sharpe = (oos_return - rf) / oos_vol if oos_vol > 0 else 0
+    index = _PANEL['index']
+    return {
+        **params,
+        'train_start': index[train_start],
+        'test_start': index[train_end],
+        'test_end': index[test_end],
+        'period_return': nav[-1] / nav[0] - 1,
+        'annual_return': oos_return,
+        'annual_volatility': oos_vol,
+        'sharpe': oos_sharpe,
+        'max_drawdown': result['drawdown'].min(),
+        'turnover': result['turnover'].sum(),
+        'max_weight': weights.max(),
+        'num_holdings': int((weights > 1e-4).sum()),
+    }
+
+def run_walk_forward(prices, param_grid=None, test_days=63, step=None, risk_free_rate=0.0, workers=1):
+    """
+    Runs every window x parameter combination and returns one tidy row per pair.
+
+    Args:
+        prices (pd.DataFrame): Adjusted close prices (rows with NaNs are dropped).
+        param_grid (dict): Lists of values for 'optimizer', 'train_days', 'rebalance'
+            (within the test window, see backtest.run_backtest) and 'cost_bps'.
+        test_days (int): Out-of-sample window length, 63 trading days is one quarter.
+        step (int, optional): Rows between window starts, defaults to test_days.
+        risk_free_rate (float): Annual risk free rate used by max_sharpe and the Sharpe column.
+        workers (int): Worker processes; 1 runs everything in-process.
+
+    Returns:
+        pd.DataFrame
+    """
+    prices = prices.dropna()
+    grid = {**DEFAULT_GRID, **(param_grid or {})}
+    keys = list(grid)
+    tasks = []
+    for values in itertools.product(*(grid[k] for k in keys)):
+        params = dict(zip(keys, values))
+        for window in walk_forward_windows(len(prices), params['train_days'], test_days, step):
+            tasks.append((window, params))
+
+    values = np.ascontiguousarray(prices.to_numpy(dtype=float))
+    index_values = prices.index.values
+    columns = list(prices.columns)
+
+    if workers <= 1:
+        _PANEL.update(prices=values, index=prices.index, columns=columns, risk_free_rate=risk_free_rate)
+        rows = [_run_task(task) for task in tasks]
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=values.nbytes)
+        try:
+            np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+            initargs = (shm.name, values.shape, values.dtype, index_values, columns, risk_free_rate)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach_panel, initargs=initargs) as pool:
+                rows = list(pool.map(_run_task, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+        finally:
+            shm.close()
+            shm.unlink()
+
+    return pd.DataFrame(rows)
+
+def summarize_walk_forward(results):
+    """
+    Aggregates walk-forward rows per parameter combination: compounded out-of-sample
+    return, average window Sharpe, worst window drawdown and average turnover.
+    """
+    params = [k for k in DEFAULT_GRID if k in results.columns]
+    grouped = results.groupby(params)
+    return pd.DataFrame({
+        'num_windows': grouped.size(),
+        'compounded_return': grouped['period_return'].apply(lambda r: np.prod(1 + r) - 1),
+        'mean_sharpe': grouped['sharpe'].mean(),
+        'worst_drawdown': grouped['max_drawdown'].min(),
+        'mean_turnover': grouped['turnover'].mean(),
+    }).reset_index()